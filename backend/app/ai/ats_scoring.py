@@ -1,5 +1,10 @@
 import re
-from collections import Counter
+from functools import lru_cache
+
+try:
+    import ahocorasick
+except ImportError:  # pure-python fallback below
+    ahocorasick = None
 
 ACTION_VERBS = set([
     "achieved","built","designed","developed","implemented","led","managed","created",
@@ -13,67 +18,140 @@ SECTION_HEADERS = [
     "summary", "profile", "contact"
 ]
 
+_WORD_RE = re.compile(r'\w+')
+_SPACE_RE = re.compile(r'\s+')
+
+# One pass for all headers, run on the lowercased text. The lookahead lets
+# overlapping headers ("work experience:" also contains "experience:") both
+# register, exactly like searching for each header separately; the leading
+# class skips positions no header can start at.
+_SECTION_RE = re.compile(
+    r'\b(?=[' + "".join(sorted(set(h[0] for h in SECTION_HEADERS))) + r'])'
+    r'(?=(' + "|".join(re.escape(h) for h in sorted(SECTION_HEADERS, key=len, reverse=True)) + r')\b\s*[:\n])'
+)
+
 
 def normalize(text):
-    return re.sub(r'\s+', ' ', (text or '').strip().lower())
+    return _SPACE_RE.sub(' ', (text or '').strip().lower())
+
+
+class _KeywordMatcher:
+    """Finds which patterns occur as substrings of a text in a single scan."""
+
+    def __init__(self, patterns):
+        self.patterns = set(p for p in patterns if p)
+        self._automaton = None
+        if ahocorasick is not None and self.patterns:
+            self._automaton = ahocorasick.Automaton()
+            for p in self.patterns:
+                self._automaton.add_word(p, p)
+            self._automaton.make_automaton()
+
+    def found(self, text):
+        if self._automaton is not None:
+            return {p for _, p in self._automaton.iter(text)}
+        return {p for p in self.patterns if p in text}
+
+
+class ATSEngine:
+    """
+    Compiled ATS scorer for one keyword list. Tokenizes each resume once and
+    derives section, action-verb, keyword and length sub-scores from it.
+    """
+
+    def __init__(self, keywords, synonyms_map=None):
+        self.keywords = list(keywords or [])
+        self._groups = []
+        patterns = []
+        for k in self.keywords:
+            if not k:
+                self._groups.append(None)
+                continue
+            k_norm = k.lower().strip()
+            alts = []
+            if synonyms_map and k_norm in synonyms_map:
+                alts = [alt.lower() for alt in synonyms_map[k_norm]]
+            group = [k_norm] + alts
+            self._groups.append(group)
+            patterns.extend(group)
+        self._matcher = _KeywordMatcher(patterns)
+
+    def keyword_score(self, text_norm):
+        found = self._matcher.found(text_norm)
+        count = 0
+        for group in self._groups:
+            # an empty pattern is a substring of anything
+            if group and any((not p) or p in found for p in group):
+                count += 1
+        return count / max(len(self.keywords), 1)
 
-def count_action_verbs(text):
-    tokens = re.findall(r'\w+', text.lower())
-    return sum(1 for t in tokens if t in ACTION_VERBS)
+    def breakdown(self, resume_text):
+        lowered = (resume_text or "").lower()
+        tokens = _WORD_RE.findall(lowered)
+        wc = len(tokens)
 
-def detect_sections(text):
-    found = set()
-    for h in SECTION_HEADERS:
-        if re.search(rf'\b{re.escape(h)}\b\s*[:\n]', text, flags=re.IGNORECASE):
-            found.add(h)
-    return found
+        sections = {m.group(1) for m in _SECTION_RE.finditer(lowered)}
+        section_score = min(1.0, len(sections) / 3.0)
 
-def keyword_coverage(text, keywords, synonyms_map=None):
-    text_norm = normalize(text)
-    count = 0
+        av_count = sum(1 for t in tokens if t in ACTION_VERBS)
+        action_score = min(1.0, av_count / 4.0)
 
-    for k in keywords:
-        if not k:
-            continue
+        keyword_score = self.keyword_score(_SPACE_RE.sub(' ', lowered.strip()))
 
-        k_norm = k.lower().strip()
+        if wc < 80:
+            length_score = wc / 80.0
+        elif wc > 1200:
+            length_score = 0.8
+        else:
+            length_score = 1.0
 
-        if k_norm in text_norm:
-            count += 1
-            continue
+        final = (
+            section_score * 0.3
+            + action_score * 0.2
+            + keyword_score * 0.4
+            + length_score * 0.1
+        )
 
-        if synonyms_map and k_norm in synonyms_map:
-            alts = synonyms_map[k_norm]
-            if any(alt.lower() in text_norm for alt in alts):
-                count += 1
+        return {
+            "score": round(final * 100, 2),
+            "section_score": section_score,
+            "action_score": action_score,
+            "keyword_score": keyword_score,
+            "length_score": length_score,
+            "sections": sorted(sections),
+            "word_count": wc,
+        }
 
-    return count / max(len(keywords), 1)
+    def score(self, resume_text):
+        return self.breakdown(resume_text)["score"]
 
-def compute_ats_score(resume_text, jd_required_skills, synonyms_map=None):
-    t = normalize(resume_text)
-    words = re.findall(r'\w+', t)
-    wc = len(words)
+    def score_many(self, texts):
+        return [self.score(t) for t in texts]
 
-    sections = detect_sections(resume_text)
-    section_score = min(1.0, len(sections) / 3.0)
 
-    av_count = count_action_verbs(resume_text)
-    action_score = min(1.0, av_count / 4.0)
+@lru_cache(maxsize=256)
+def _cached_engine(keywords: tuple):
+    return ATSEngine(keywords)
 
-    keyword_score = keyword_coverage(resume_text, jd_required_skills, synonyms_map)
 
-    if wc < 80:
-        length_score = wc / 80.0
-    elif wc > 1200:
-        length_score = 0.8
-    else:
-        length_score = 1.0
+def get_ats_engine(keywords, synonyms_map=None):
+    if synonyms_map:
+        return ATSEngine(keywords, synonyms_map)
+    return _cached_engine(tuple(keywords or []))
 
-    final = (
-        section_score * 0.3
-        + action_score * 0.2
-        + keyword_score * 0.4
-        + length_score * 0.1
-    )
 
-    return round(final * 100, 2)
+def count_action_verbs(text):
+    tokens = _WORD_RE.findall(text.lower())
+    return sum(1 for t in tokens if t in ACTION_VERBS)
+
+def detect_sections(text):
+    return {m.group(1) for m in _SECTION_RE.finditer(text.lower())}
+
+def keyword_coverage(text, keywords, synonyms_map=None):
+    return ATSEngine(keywords, synonyms_map).keyword_score(normalize(text))
+
+def compute_ats_score(resume_text, jd_required_skills, synonyms_map=None):
+    return get_ats_engine(jd_required_skills, synonyms_map).score(resume_text)
+
+def score_many(texts, keywords, synonyms_map=None):
+    return get_ats_engine(keywords, synonyms_map).score_many(texts)
@@ -0,0 +1,217 @@
+import os
+import json
+import shutil
+import asyncio
+import tempfile
+
+from .resume_pipeline import run_pipeline, flush_shortlist, flush_process
+from .upload_spool import spool_upload
+from ..database.batch_job import BatchJobDB
+from ..database.jobrole import JobRoleDB
+
+SPOOL_DIR = os.getenv("BATCH_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "rolesync_batches"))
+LEASE_SECONDS = int(os.getenv("BATCH_JOB_LEASE_SECONDS", "120"))
+# a file whose results fail to write is retried on later claims this many times in all
+WRITE_ATTEMPTS = int(os.getenv("BATCH_JOB_WRITE_ATTEMPTS", "3"))
+RESULTS_POLL_SECONDS = 1.0
+
+_FLUSHERS = {
+    "shortlist": flush_shortlist,
+    "process": flush_process,
+}
+
+# keep strong refs so scheduled jobs are not garbage collected mid-run
+_tasks = set()
+
+
+def _schedule(coro):
+    task = asyncio.create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+
+# ---------------------------------------------------------
+# Submit: spool uploads to a durable dir, create job, schedule
+# ---------------------------------------------------------
+async def submit_job(kind: str, files, job_role_id: str = None, recruiter_id: str = None, max_in_flight: int = None):
+    if kind not in _FLUSHERS:
+        raise ValueError(f"Unknown batch job kind: {kind}")
+
+    spool_dir = tempfile.mkdtemp(prefix="job_", dir=_ensure_spool_root())
+    spooled = []
+    try:
+        for i, f in enumerate(files):
+            ext = os.path.splitext(f.filename or "")[1] or ".pdf"
+            up = await spool_upload(f, path=os.path.join(spool_dir, f"{i}{ext}"))
+            spooled.append({"index": i, "filename": f.filename, "path": up.path, "file_hash": up.file_hash})
+    except BaseException:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+        raise
+
+    job = BatchJobDB.create(kind, job_role_id, recruiter_id, spooled, spool_dir, max_in_flight)
+    _schedule(_run_when_claimable(job["_id"]))
+    return job
+
+
+def _ensure_spool_root():
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    return SPOOL_DIR
+
+
+# ---------------------------------------------------------
+# Worker: runs only the files not yet marked done
+# ---------------------------------------------------------
+async def _heartbeat(job_id: str, owner: str, lose_lease):
+    """Keep the lease alive while the pipeline runs (slow files outlast it otherwise)."""
+    while True:
+        await asyncio.sleep(LEASE_SECONDS / 3)
+        try:
+            renewed = await asyncio.to_thread(BatchJobDB.renew_lease, job_id, owner, LEASE_SECONDS)
+        except Exception as e:
+            print("Batch job lease renewal failed:", job_id, e)
+            continue
+        if not renewed:
+            lose_lease()
+            return
+
+
+async def run_job(job_id: str):
+    job = BatchJobDB.claim(job_id, LEASE_SECONDS)
+    if not job:
+        return False
+
+    owner = job["lease_owner"]
+    loop = asyncio.get_running_loop()
+    worker = asyncio.current_task()
+    lease = {"lost": False}
+
+    def lose_lease():
+        # another process claimed the job; stop and let it finish the files
+        if not lease["lost"]:
+            print("Batch job lease lost:", job_id)
+            lease["lost"] = True
+            worker.cancel()
+
+    heartbeat = asyncio.create_task(_heartbeat(job_id, owner, lose_lease))
+    try:
+        job_role = (JobRoleDB.get(job["job_role_id"]) if job.get("job_role_id") else None) or {}
+        if job["kind"] == "shortlist" and not job_role:
+            raise ValueError("Job role not found")
+
+        flusher = _FLUSHERS[job["kind"]]
+        sources = [
+            {"key": f["index"], "filename": f["filename"], "path": f["path"], "file_hash": f.get("file_hash")}
+            for f in job["files"] if f["status"] != "done"
+        ]
+
+        attempts = {f["index"]: f.get("write_attempts", 0) for f in job["files"]}
+        unwritten = set()
+
+        def on_flushed(batch, error=None):
+            # runs in a worker thread
+            if error:
+                # not written: keep the files pending (and spooled) for the next
+                # claim; only the last allowed attempt records the failed result
+                retry = [r["key"] for r in batch if attempts[r["key"]] + 1 < WRITE_ATTEMPTS]
+                if retry and not BatchJobDB.mark_write_failed(job_id, retry, error, LEASE_SECONDS, owner):
+                    loop.call_soon_threadsafe(lose_lease)
+                    return
+                unwritten.update(retry)
+                batch = [r for r in batch if r["key"] not in unwritten]
+                if not batch:
+                    return
+            if not BatchJobDB.mark_files_done(
+                job_id,
+                [(r["key"], r["result"]) for r in batch],
+                LEASE_SECONDS,
+                owner,
+            ):
+                loop.call_soon_threadsafe(lose_lease)
+
+        await run_pipeline(
+            sources,
+            job_role,
+            lambda batch: flusher(batch, job.get("job_role_id"), job.get("recruiter_id"), job_id),
+            require_email=job["kind"] == "shortlist",
+            max_in_flight=job.get("max_in_flight"),
+            on_flushed=on_flushed,
+        )
+    except asyncio.CancelledError:
+        if lease["lost"]:
+            return False
+        raise
+    except Exception as e:
+        print("Batch job failed:", job_id, e)
+        BatchJobDB.finish(job_id, "failed", owner, str(e))
+        return False
+    finally:
+        heartbeat.cancel()
+
+    if unwritten:
+        print("Batch job has unwritten files, retrying later:", job_id, sorted(unwritten))
+        BatchJobDB.release(job_id, owner)
+        return False
+    if not BatchJobDB.finish(job_id, "completed", owner):
+        return False
+    shutil.rmtree(job.get("spool_dir") or "", ignore_errors=True)
+    return True
+
+
+async def _run_when_claimable(job_id: str):
+    # another process may still hold the lease; retry until it lapses
+    while True:
+        if await run_job(job_id):
+            return
+        job = BatchJobDB.get(job_id, with_results=False)
+        if not job or job["status"] not in ("queued", "running"):
+            return
+        await asyncio.sleep(LEASE_SECONDS / 2)
+
+
+async def resume_unfinished_jobs():
+    for job_id in BatchJobDB.list_unfinished():
+        _schedule(_run_when_claimable(job_id))
+
+
+# ---------------------------------------------------------
+# Read side
+# ---------------------------------------------------------
+def job_progress(job: dict) -> dict:
+    return {
+        "job_id": job["_id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "total": job["total"],
+        "done": job["done"],
+        "error": job.get("error"),
+        "files": [
+            {"index": f["index"], "filename": f["filename"], "status": f["status"]}
+            for f in job["files"]
+        ],
+        "created_at": job.get("created_at"),
+        "updated_at": job.get("updated_at"),
+    }
+
+
+async def stream_results(job_id: str):
+    """Yield NDJSON lines, one per finished file, until the job ends."""
+    sent = set()
+    while True:
+        # poll statuses only; results are fetched once, for newly finished files
+        job = await asyncio.to_thread(BatchJobDB.get, job_id, False)
+        if not job:
+            return
+
+        fresh = [f for f in job["files"] if f["status"] == "done" and f["index"] not in sent]
+        results = await asyncio.to_thread(BatchJobDB.results, job_id, [f["index"] for f in fresh])
+        for f in fresh:
+            sent.add(f["index"])
+            line = {"index": f["index"], "filename": f["filename"], "result": results.get(f["index"])}
+            yield json.dumps(line, default=str) + "\n"
+
+        if job["status"] not in ("queued", "running"):
+            yield json.dumps({"end": True, "status": job["status"], "error": job.get("error")}) + "\n"
+            return
+
+        await asyncio.sleep(RESULTS_POLL_SECONDS)
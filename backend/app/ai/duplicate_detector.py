@@ -1,6 +1,12 @@
+import os
 import hashlib
 from difflib import SequenceMatcher
 from .resume_parser import extract_text
+from .minhash import minhash_signature, lsh_bands, estimate_jaccard
+
+# estimated Jaccard over word 3-shingles; ~0.6 is roughly "under 5% of the
+# words changed" on resume-length text
+DUP_JACCARD_THRESHOLD = float(os.getenv("DUP_JACCARD_THRESHOLD", "0.6"))
 
 def file_hash(file_path):
     h = hashlib.sha256()
@@ -12,15 +18,36 @@ def file_hash(file_path):
 def is_similar_text(a, b, threshold=0.85):
     return SequenceMatcher(None, a, b).ratio() >= threshold
 
-def check_duplicate(file_path, db_check_fn):
-    h = file_hash(file_path)
+def best_near_duplicate(signature, candidates, threshold=None):
+    """candidates: [{"_id", "minhash"}] sharing at least one LSH band."""
+    threshold = DUP_JACCARD_THRESHOLD if threshold is None else threshold
+    best, best_sim = None, 0.0
+    for rec in candidates:
+        sim = estimate_jaccard(signature, rec.get("minhash"))
+        if sim >= threshold and sim > best_sim:
+            best, best_sim = rec, sim
+    return best, best_sim
+
+def check_duplicate(source, db_check_fn, h=None, filename=None):
+    """
+    source: file path or file bytes (see extract_text)
+    db_check_fn(hash) -> existing record or None
+    db_check_fn(None, lsh_bands=[...]) -> [{"_id", "minhash"}] sharing a band
+    h: precomputed file hash (e.g. from reading the upload)
+    """
+    if not h:
+        h = file_hash(source) if isinstance(source, str) else hashlib.sha256(source).hexdigest()
     existing = db_check_fn(h)
     if existing:
         return {"duplicate": True, "reason": "hash", "existing_id": existing.get("_id")}
-    
-    text = extract_text(file_path)
-    text_candidates = db_check_fn(None, return_texts=True)
-    for rec in text_candidates:
-        if is_similar_text(text, rec.get("text", "")):
-            return {"duplicate": True, "reason": "text", "existing_id": rec.get("_id")}
+
+    text = extract_text(source, filename)
+    sig = minhash_signature(text)
+    if sig is None:
+        return {"duplicate": False}
+
+    text_candidates = db_check_fn(None, lsh_bands=lsh_bands(sig)) or []
+    best, sim = best_near_duplicate(sig, text_candidates)
+    if best:
+        return {"duplicate": True, "reason": "text", "existing_id": best.get("_id"), "similarity": round(sim, 3)}
     return {"duplicate": False}
@@ -0,0 +1,199 @@
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+# Service knobs (SHORTLIST_EXTRACT_WORKERS kept as a fallback name)
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", os.getenv("SHORTLIST_EXTRACT_WORKERS", str(os.cpu_count() or 2))))
+EXTRACT_TIMEOUT_SECONDS = float(os.getenv("EXTRACT_TIMEOUT_SECONDS", "30"))
+# workers are replaced after this many tasks (0 = never) to cap leaks from odd files
+EXTRACT_MAX_TASKS_PER_CHILD = int(os.getenv("EXTRACT_MAX_TASKS_PER_CHILD", "200"))
+
+
+class ExtractionTimeout(Exception):
+    pass
+
+
+class ExtractionService:
+    """
+    Long-lived process pool for CPU-bound document work. A task that runs
+    past its timeout or kills its worker gets the pool recycled; tasks that
+    only failed because the pool was recycled under them are retried once.
+    """
+
+    def __init__(self, workers: int = None, timeout: float = None, max_tasks_per_child: int = None, initializer=None):
+        self.workers = max(1, workers or EXTRACT_WORKERS)
+        self.timeout = timeout or EXTRACT_TIMEOUT_SECONDS
+        self.max_tasks_per_child = EXTRACT_MAX_TASKS_PER_CHILD if max_tasks_per_child is None else max_tasks_per_child
+        self.initializer = initializer
+        self._lock = threading.Lock()
+        self._pool = self._new_pool()
+        self._generation = 0
+        self._in_flight = 0
+        self._stats = {
+            "submitted": 0, "completed": 0, "failed": 0,
+            "timeouts": 0, "crashes": 0, "recycles": 0, "retries": 0,
+            "task_seconds": 0.0,
+        }
+
+    def _new_pool(self):
+        kwargs = {"max_workers": self.workers, "initializer": self.initializer}
+        if self.max_tasks_per_child:
+            # needs a spawn/forkserver start method; Python picks spawn
+            kwargs["max_tasks_per_child"] = self.max_tasks_per_child
+        return ProcessPoolExecutor(**kwargs)
+
+    # ---------------------------------------------------------
+    # Submission + bookkeeping
+    # ---------------------------------------------------------
+    def submit(self, fn, *args):
+        """concurrent.futures.Future for fn(*args); prefer run / run_async."""
+        for attempt in (0, 1):
+            with self._lock:
+                gen = self._generation
+                try:
+                    fut = self._pool.submit(fn, *args)
+                    break
+                except (BrokenProcessPool, RuntimeError):
+                    # pool died between tasks (or is mid-recycle)
+                    if attempt:
+                        raise
+            self.recycle(gen, "broken before submit")
+
+        with self._lock:
+            self._in_flight += 1
+            self._stats["submitted"] += 1
+        started = time.perf_counter()
+        fut.generation = gen
+
+        def done(f):
+            with self._lock:
+                self._in_flight -= 1
+                self._stats["task_seconds"] += time.perf_counter() - started
+                if f.cancelled() or f.exception() is not None:
+                    self._stats["failed"] += 1
+                else:
+                    self._stats["completed"] += 1
+
+        fut.add_done_callback(done)
+        return fut
+
+    def recycle(self, generation: int = None, reason: str = "manual"):
+        """Replace the pool and kill its workers (hung ones ignore shutdown)."""
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False   # someone already replaced this pool
+            old = self._pool
+            self._pool = self._new_pool()
+            self._generation += 1
+            self._stats["recycles"] += 1
+
+        print(f"Extraction pool recycled ({reason})")
+        procs = list((getattr(old, "_processes", None) or {}).values())
+        old.shutdown(wait=False, cancel_futures=True)
+        for p in procs:
+            try:
+                p.terminate()
+            except Exception:
+                pass
+        return True
+
+    def _on_timeout(self, fut):
+        with self._lock:
+            self._stats["timeouts"] += 1
+        # a task still queued just gets dropped; one that is running is
+        # stuck in a worker, which only a recycle frees
+        if not fut.cancel() and not fut.done():
+            self.recycle(fut.generation, "timeout")
+
+    def _on_broken(self, fut, attempt: int):
+        """Recycle after a crash; True if the caller should retry once."""
+        with self._lock:
+            self._stats["crashes"] += 1
+        self.recycle(fut.generation, "worker crashed")
+        if attempt == 0:
+            with self._lock:
+                self._stats["retries"] += 1
+            return True
+        return False
+
+    # ---------------------------------------------------------
+    # Sync (threads) and async (event loop) entry points
+    # ---------------------------------------------------------
+    def result(self, fut, timeout: float = None):
+        try:
+            return fut.result(timeout=timeout or self.timeout)
+        except FuturesTimeout:
+            self._on_timeout(fut)
+            raise ExtractionTimeout(f"extraction exceeded {timeout or self.timeout}s")
+
+    async def result_async(self, fut, timeout: float = None):
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(fut), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self._on_timeout(fut)
+            raise ExtractionTimeout(f"extraction exceeded {timeout or self.timeout}s")
+
+    def run(self, fn, *args, timeout: float = None):
+        for attempt in (0, 1):
+            fut = self.submit(fn, *args)
+            try:
+                return self.result(fut, timeout)
+            except BrokenProcessPool:
+                if not self._on_broken(fut, attempt):
+                    raise
+
+    async def run_async(self, fn, *args, timeout: float = None):
+        for attempt in (0, 1):
+            fut = self.submit(fn, *args)
+            try:
+                return await self.result_async(fut, timeout)
+            except BrokenProcessPool:
+                if not self._on_broken(fut, attempt):
+                    raise
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            s["workers"] = self.workers
+            s["in_flight"] = self._in_flight
+            s["queue_depth"] = max(0, self._in_flight - self.workers)
+            s["generation"] = self._generation
+        finished = s["completed"] + s["failed"]
+        s["avg_latency_ms"] = round(s.pop("task_seconds") * 1000 / finished, 2) if finished else 0.0
+        return s
+
+    def shutdown(self):
+        with self._lock:
+            pool = self._pool
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+_service = None
+
+
+def start_extraction_service(**kwargs):
+    """Called once at app startup; ingest code runs inline until then."""
+    global _service
+    if _service is None:
+        from .resume_parser import mark_extract_worker
+        kwargs.setdefault("initializer", mark_extract_worker)
+        _service = ExtractionService(**kwargs)
+    return _service
+
+
+def stop_extraction_service():
+    global _service
+    if _service is not None:
+        _service.shutdown()
+        _service = None
+
+
+def get_extraction_service():
+    return _service
+
+
+def extraction_stats() -> dict:
+    return _service.stats() if _service else {"running": False}
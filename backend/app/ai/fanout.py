@@ -0,0 +1,47 @@
+import os
+import time
+import asyncio
+import inspect
+from contextlib import contextmanager
+
+# Default per-branch timeout; a branch past it gets its fallback value
+BRANCH_TIMEOUT_SECONDS = float(os.getenv("ANALYSIS_BRANCH_TIMEOUT_SECONDS", "60"))
+
+
+class Timings:
+    """Wall-clock latency per branch plus the total since creation."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.branches = {}
+
+    @contextmanager
+    def track(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.branches[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    def report(self) -> dict:
+        return {
+            "total": round((time.perf_counter() - self.started) * 1000, 1),
+            "branches": dict(self.branches),
+        }
+
+
+async def run_branch(timings: Timings, name: str, call, *args, timeout: float = None, fallback=None):
+    """
+    Run one branch of an analysis graph: `call` is a coroutine, or a sync
+    function run in a thread with `args`. Errors and timeouts are logged
+    and replaced by `fallback` (called if callable), so sibling branches
+    are never lost to one slow or failing call.
+    """
+    with timings.track(name):
+        try:
+            aw = call if inspect.isawaitable(call) else asyncio.to_thread(call, *args)
+            return await asyncio.wait_for(aw, timeout or BRANCH_TIMEOUT_SECONDS)
+        except Exception as e:
+            kind = "timed out" if isinstance(e, asyncio.TimeoutError) else f"failed ({e})"
+            print(f"Analysis branch {name} {kind}, using fallback")
+            return fallback() if callable(fallback) else fallback
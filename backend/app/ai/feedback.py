@@ -1,51 +1,77 @@
-import json
-import os
 import logging
-from dotenv import load_dotenv
-load_dotenv()
 
-import google.generativeai as genai
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+from .llm_gateway import generate_json, generate_json_sync
+from .llm_json import LLMJSONError, object_schema, STRING, NUMBER, STRING_LIST
+from .prompt_builder import fit_prompt, project, compact
+
+FEEDBACK_MODEL = "gemini-2.5-flash"
+RESUME_FIELDS = ("name", "skills", "education", "experience_years", "projects")
+JD_FIELDS = ("title", "required_skills", "preferred_skills", "responsibilities", "experience_level")
+FEEDBACK_SCHEMA = object_schema(
+    {"summary": STRING, "match_score": NUMBER, "missing_skills": STRING_LIST, "recommendations": STRING_LIST},
+    required=["summary", "recommendations"],
+)
 
 logger = logging.getLogger("rolesync.ai.feedback")
 logger.setLevel(logging.INFO)
 
 
-def generate_feedback(parsed_resume: dict, jd_obj: dict):
-    prompt = (
-        "You are an expert recruitment evaluator. "
-        "Analyze the candidate resume and job description.\n\n"
-
-        "Resume (JSON):\n"
-        f"{json.dumps(parsed_resume)}\n\n"
-
-        "Job Description (JSON):\n"
-        f"{json.dumps(jd_obj)}\n\n"
-
-        "Return ONLY valid JSON with the following keys:\n"
-        "{\n"
-        "  \"summary\": \"string\",\n"
-        "  \"match_score\": number (0-100),\n"
-        "  \"missing_skills\": [list of strings],\n"
-        "  \"recommendations\": [list of strings]\n"
-        "}\n"
+def _feedback_prompt(parsed_resume: dict, jd_obj: dict) -> str:
+    resume_json = compact(project(parsed_resume, RESUME_FIELDS))
+    jd_json = compact(project(jd_obj, JD_FIELDS, max_items=20))
+
+    def render(resume_text):
+        return (
+            "You are an expert recruitment evaluator. "
+            "Analyze the candidate resume and job description.\n\n"
+
+            "Resume (JSON):\n"
+            f"{resume_json}\n\n"
+
+            "Resume excerpt:\n"
+            f"{resume_text}\n\n"
+
+            "Job Description (JSON):\n"
+            f"{jd_json}\n\n"
+
+            "Return ONLY valid JSON with the following keys:\n"
+            "{\n"
+            "  \"summary\": \"string\",\n"
+            "  \"match_score\": number (0-100),\n"
+            "  \"missing_skills\": [list of strings],\n"
+            "  \"recommendations\": [list of strings]\n"
+            "}\n"
+        )
+
+    return fit_prompt(
+        "feedback",
+        render,
+        {"resume_text": parsed_resume.get("raw_text") or parsed_resume.get("parsed_text") or ""},
+        parts=(resume_json, jd_json),
+        baseline=(parsed_resume, jd_obj),
     )
 
-    model = genai.GenerativeModel("gemini-2.5-flash")
 
+def generate_feedback(parsed_resume: dict, jd_obj: dict):
+    prompt = _feedback_prompt(parsed_resume, jd_obj)
     try:
-        response = model.generate_content(
-            prompt,
-            generation_config={
-                "response_mime_type": "application/json"
-            }
-        )
+        return generate_json_sync(prompt, FEEDBACK_MODEL, schema=FEEDBACK_SCHEMA, site="feedback")
+    except LLMJSONError as e:
+        logger.error("Gemini returned non-JSON even in JSON mode: %r", e.text)
+        return {"raw_text": e.text}
     except Exception as e:
         logger.exception("LLM call failed")
         raise RuntimeError(f"LLM call failed: {e}")
 
+
+async def generate_feedback_async(parsed_resume: dict, jd_obj: dict):
+    """generate_feedback for async callers: awaits the gateway instead of holding a thread."""
+    prompt = _feedback_prompt(parsed_resume, jd_obj)
     try:
-        return json.loads(response.text)
-    except Exception:
-        logger.error("Gemini returned non-JSON even in JSON mode: %r", response.text)
-        return {"raw_text": response.text}
+        return await generate_json(prompt, FEEDBACK_MODEL, schema=FEEDBACK_SCHEMA, site="feedback")
+    except LLMJSONError as e:
+        logger.error("Gemini returned non-JSON even in JSON mode: %r", e.text)
+        return {"raw_text": e.text}
+    except Exception as e:
+        logger.exception("LLM call failed")
+        raise RuntimeError(f"LLM call failed: {e}")
@@ -0,0 +1,226 @@
+import os
+import json
+import asyncio
+from typing import Dict, Any
+
+from .llm_gateway import LLM_ENABLED, generate_json
+from .llm_json import object_schema, STRING, NUMBER, STRING_LIST
+from .llm_cache import get_cache, content_key
+from .prompt_builder import fit_prompt, project, compact
+from .match_score import SCORE_SCHEMA, WEIGHTS, _candidate_brief, _job_brief, score_cache_tags
+from .resume_parser import remember_parse
+
+FUSED_MODEL = os.getenv("FUSED_ANALYZE_MODEL", "gemini-2.5-pro")
+# bump when the fused prompts change so stale cache entries are not reused
+FUSED_PROMPT_VERSION = "v2"
+
+# "multi" = the separate parse / role / score / semantic / feedback calls,
+# "fused" = one LLM call per analysis (different prompt, model and scores,
+# so opt-in). ANALYZE_MODE_<ENDPOINT> picks per endpoint.
+ANALYZE_MODE = os.getenv("ANALYZE_MODE", "multi")
+ANALYZE_MODES = {
+    endpoint: os.getenv(f"ANALYZE_MODE_{endpoint.upper()}", ANALYZE_MODE).lower()
+    for endpoint in ("self_analysis", "score_single")
+}
+
+_fused_cache = get_cache(
+    "fused_analysis",
+    ttl_seconds=int(os.getenv("SCORE_CACHE_TTL_DAYS", "7")) * 86400,
+    lru_size=int(os.getenv("SCORE_CACHE_LRU_SIZE", "1024")),
+)
+
+PARSED_SCHEMA = object_schema(
+    {
+        "name": STRING,
+        "email": STRING,
+        "phone": STRING,
+        "skills": STRING_LIST,
+        "education": STRING_LIST,
+        "experience_years": NUMBER,
+        "projects": STRING_LIST,
+    },
+    required=["name", "email", "skills", "experience_years"],
+)
+SEMANTIC_SCHEMA = object_schema(
+    {"fit_summary": STRING, "strengths": STRING_LIST, "weaknesses": STRING_LIST, "reasoning_score": NUMBER},
+    required=["fit_summary", "strengths", "weaknesses", "reasoning_score"],
+)
+FEEDBACK_SCHEMA = object_schema(
+    {"summary": STRING, "missing_skills": STRING_LIST, "recommendations": STRING_LIST},
+    required=["summary", "recommendations"],
+)
+
+SELF_FIELDS = ("name", "skills", "education", "experience_years", "projects")
+SCORE_INSTRUCTIONS = """- "score": overall match 0..100
+- "components": each 0..100: required_coverage, preferred_coverage, semantic_fit, project_relevance, experience_fit
+- "explanations": short bullet sentences on the score"""
+
+
+def analyze_mode(endpoint: str) -> str:
+    mode = ANALYZE_MODES.get(endpoint, ANALYZE_MODE)
+    return "fused" if mode == "fused" and LLM_ENABLED else "multi"
+
+
+def _schema(extra: Dict[str, Any], required) -> dict:
+    props = dict(SCORE_SCHEMA["properties"])
+    props.update(extra)
+    return object_schema(props, required=list(SCORE_SCHEMA["required"]) + list(required))
+
+
+def _match_result(payload: dict) -> dict:
+    if "score" not in payload or "components" not in payload:
+        raise ValueError("Fused response missing score fields")
+    return {
+        "score": payload["score"],
+        "components": payload["components"],
+        "explanations": payload.get("explanations", []),
+        "method": "gemini_fused",
+    }
+
+
+async def _cached_call(prompt: str, schema: dict, site: str, tags) -> dict:
+    key = content_key(prompt, FUSED_MODEL, json.dumps(WEIGHTS, sort_keys=True), FUSED_PROMPT_VERSION)
+    payload = _fused_cache.get(key)
+    if payload is None:
+        payload = await generate_json(prompt, FUSED_MODEL, schema=schema, site=site)
+        _match_result(payload)
+        _fused_cache.set(key, payload, tags=tags)
+    return payload
+
+
+# ---------------------------------------------------------
+# score_single: parse + role + score + semantic fit
+# ---------------------------------------------------------
+async def analyze_resume_for_job(resume_text: str, job_role: Dict[str, Any], parsed: Dict[str, Any] = None) -> dict:
+    """
+    One call in place of parse_resume + gemini_score + explain_semantic_fit.
+    With `parsed` (a known file) the parse section is skipped.
+    """
+    extra = {"detected_role": STRING, "semantic": SEMANTIC_SCHEMA}
+    required = ["semantic"]
+    if parsed is None:
+        extra["parsed"] = PARSED_SCHEMA
+        required.append("parsed")
+        parse_step = (
+            '- "parsed": name, email, phone, skills (list of strings), education (list of strings), '
+            "projects (list of short strings), experience_years (number)\n"
+        )
+        texts, resume_label = {"resume": resume_text}, "Resume Text:\n"
+    else:
+        # the brief already carries a resume snippet
+        parse_step = ""
+        texts, resume_label = {"resume": compact(_candidate_brief(parsed))}, "Candidate: "
+    job_json = compact(_job_brief(job_role))
+
+    def render(resume):
+        return f"""
+You are a resume parsing engine and an expert hiring evaluator. In ONE pass, read the
+resume and the job role and return STRICT JSON with:
+{parse_step}- "detected_role": the job title the resume best fits (2-4 words)
+{SCORE_INSTRUCTIONS}
+- "semantic": {{"fit_summary": "2-3 sentences", "strengths": [], "weaknesses": [], "reasoning_score": 0..100}}
+
+JobRole: {job_json}
+
+{resume_label}{resume}
+"""
+    prompt = fit_prompt("fused_score_single", render, texts, parts=(job_json,))
+    payload = await _cached_call(
+        prompt, _schema(extra, required), "fused_score_single", score_cache_tags(parsed or {}, job_role)
+    )
+
+    out = {
+        "parsed": None,
+        "detected_role": payload.get("detected_role"),
+        "match": _match_result(payload),
+        "semantic": payload["semantic"],
+    }
+    if parsed is None:
+        fields = dict(payload.get("parsed") or {})
+        if fields:
+            # later parses of this resume (shortlists, profile upload) reuse it
+            await asyncio.to_thread(remember_parse, resume_text, fields)
+        fields["raw_text"] = resume_text
+        fields.setdefault("skills", [])
+        fields.setdefault("education", [])
+        fields.setdefault("projects", [])
+        fields.setdefault("experience_years", 0)
+        out["parsed"] = fields
+    return out
+
+
+# ---------------------------------------------------------
+# self_analysis: role + skills + score + feedback
+# ---------------------------------------------------------
+async def analyze_self(resume_text: str, parsed: Dict[str, Any], jd_text: str = None,
+                       target_role: str = None, role_skills: dict = None, candidate_id: str = None) -> dict:
+    """
+    One call in place of auto_detect_role, extract_skills_from_jd/_role,
+    gemini_score and generate_feedback. `role_skills` (from the role map)
+    are used as given instead of being asked for.
+    """
+    extra = {"detected_role": STRING, "feedback": FEEDBACK_SCHEMA}
+    required = ["detected_role", "feedback"]
+    if role_skills is None:
+        extra["required_skills"] = STRING_LIST
+        extra["preferred_skills"] = STRING_LIST
+        required += ["required_skills", "preferred_skills"]
+
+    if jd_text:
+        target = "Job Description:\n"
+        skills_step = '- "required_skills" / "preferred_skills": HARD SKILLS ONLY from the job description (at least 5 required)\n'
+    elif target_role:
+        target = f'Target role: "{target_role}"'
+        skills_step = '- "required_skills" / "preferred_skills": HARD SKILLS for the target role (at least 5 required, 3 preferred)\n'
+    else:
+        target = "Target role: the role the resume best fits"
+        skills_step = '- "required_skills" / "preferred_skills": HARD SKILLS for that role (at least 5 required, 3 preferred)\n'
+    if role_skills is not None:
+        skills_step = ""
+        target += (
+            f"\nRequired skills: {json.dumps(role_skills.get('required_skills', []))}"
+            f"\nPreferred skills: {json.dumps(role_skills.get('preferred_skills', []))}"
+        )
+
+    if target_role:
+        role_step = f'- "detected_role": "{target_role}"'
+    else:
+        role_step = '- "detected_role": the job role the resume best fits (2-4 words)'
+    candidate_json = compact(project(parsed, SELF_FIELDS))
+
+    def render(resume_text, jd_text):
+        return f"""
+You are an ATS skill extraction engine, an expert hiring evaluator and a career coach.
+In ONE pass, compare the candidate to the target below and return STRICT JSON with:
+{role_step}
+{skills_step}{SCORE_INSTRUCTIONS}
+- "feedback": {{"summary": "string", "missing_skills": [], "recommendations": []}}
+
+{target}{jd_text}
+
+Candidate: {candidate_json}
+
+Resume Text:
+{resume_text}
+"""
+    prompt = fit_prompt(
+        "fused_self_analysis",
+        render,
+        {"resume_text": resume_text, "jd_text": jd_text or ""},
+        parts=(candidate_json,),
+        baseline=({k: v for k, v in parsed.items() if k != "raw_text"}, resume_text, jd_text or ""),
+    )
+    payload = await _cached_call(
+        prompt, _schema(extra, required), "fused_self_analysis", score_cache_tags({"_id": candidate_id}, {})
+    )
+
+    skills = role_skills or {
+        "required_skills": payload.get("required_skills", []),
+        "preferred_skills": payload.get("preferred_skills", []),
+    }
+    return {
+        "detected_role": target_role or payload.get("detected_role") or "General Profile",
+        "skill_info": skills,
+        "match": _match_result(payload),
+        "feedback": payload["feedback"],
+    }
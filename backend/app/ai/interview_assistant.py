@@ -1,10 +1,11 @@
-import json
-import google.generativeai as genai
-import os
+from .llm_gateway import generate_json_sync
+from .llm_json import object_schema, STRING, BOOLEAN
 
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-
-model = genai.GenerativeModel("gemini-2.5-flash")
+INTERVIEW_MODEL = "gemini-2.5-flash"
+INTERVIEW_SCHEMA = object_schema(
+    {"reply": STRING, "should_continue": BOOLEAN, "evaluation": STRING, "next_question": STRING},
+    required=["reply", "should_continue", "evaluation", "next_question"],
+)
 
 def interview_ai(query, history, role):
     history_text = ""
@@ -37,10 +38,7 @@ Respond ONLY in JSON format:
 """
 
     try:
-        response = model.generate_content(prompt)
-        text = response.text.strip()
-        obj = json.loads(text[text.find("{"):text.rfind("}")+1])
-        return obj
+        return generate_json_sync(prompt, INTERVIEW_MODEL, schema=INTERVIEW_SCHEMA, site="interview_ai")
     except Exception as e:
         return {
             "reply": "Sorry, I couldn’t process that.",
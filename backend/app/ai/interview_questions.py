@@ -1,10 +1,6 @@
-import json
-import google.generativeai as genai
-import os
-from dotenv import load_dotenv
+from .llm_gateway import generate_json_sync
 
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+QUESTIONS_MODEL = "gemini-2.5-pro"
 
 def generate_interview_questions(candidate, job_role):
     prompt = f"""
@@ -27,6 +23,4 @@ def generate_interview_questions(candidate, job_role):
     Return JSON only.
     """
 
-    model = genai.GenerativeModel("gemini-2.5-pro")
-    response = model.generate_content(prompt)
-    return json.loads(response.text)
+    return generate_json_sync(prompt, QUESTIONS_MODEL, site="interview_questions")
@@ -1,14 +1,36 @@
 import os
-import json
-from dotenv import load_dotenv
-import google.generativeai as genai
+import asyncio
 
-from .resume_parser import extract_text  
-
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+from .resume_parser import extract_text, extract_text_async
+from .llm_gateway import generate_json, generate_json_sync
+from .llm_json import object_schema, STRING, STRING_LIST
+from .llm_cache import get_cache, content_key
+from .prompt_builder import fit_prompt
 
 MODEL_NAME = "gemini-2.5-flash"
+# bump when the JD prompt changes so stale cache entries are not reused
+JD_PROMPT_VERSION = "v1"
+
+# Parsed JDs keyed by normalized JD text, shared by the recruiter JD parser
+# and candidate self-analysis (the same JDs get pasted over and over)
+_jd_cache = get_cache(
+    "jd_parse",
+    ttl_seconds=int(os.getenv("JD_CACHE_TTL_DAYS", "30")) * 86400,
+    lru_size=int(os.getenv("JD_CACHE_LRU_SIZE", "512")),
+)
+JD_SCHEMA = object_schema(
+    {
+        "job_title": STRING,
+        "role_summary": STRING,
+        "required_skills": STRING_LIST,
+        "preferred_skills": STRING_LIST,
+        "responsibilities": STRING_LIST,
+        "experience_level": STRING,
+        "seniority": STRING,
+        "tech_stack": STRING_LIST,
+    },
+    required=["job_title", "required_skills", "preferred_skills", "responsibilities"],
+)
 
 
 def _fallback_parse(jd_text: str) -> dict:
@@ -57,7 +79,11 @@ def _fallback_parse(jd_text: str) -> dict:
         "raw_text": jd_text,
     }
 
-def _load_jd_text(source: str) -> str:
+def _load_jd_text(source) -> str:
+    # uploaded file contents (bytes or a binary stream)
+    if isinstance(source, (bytes, bytearray)) or hasattr(source, "read"):
+        return extract_text(source)
+
     if os.path.exists(source) and os.path.isfile(source):
         return extract_text(source)
 
@@ -67,23 +93,16 @@ def _load_jd_text(source: str) -> str:
 
     return source
 
-def parse_jd(source: str) -> dict:
-    jd_text = _load_jd_text(source)
 
-    if not jd_text or not jd_text.strip():
-        return {
-            "job_title": "",
-            "role_summary": "",
-            "required_skills": [],
-            "preferred_skills": [],
-            "responsibilities": [],
-            "experience_level": "",
-            "seniority": "",
-            "tech_stack": [],
-            "raw_text": "",
-        }
-
-    prompt = f"""
+async def _load_jd_text_async(source) -> str:
+    if isinstance(source, (bytes, bytearray)) or hasattr(source, "read"):
+        return await extract_text_async(source)
+    return await asyncio.to_thread(_load_jd_text, source)
+
+
+def _jd_prompt(jd_text: str) -> str:
+    def render(jd_text):
+        return f"""
 You are an ATS job description parsing engine.
 
 Read the following Job Description and extract structured information.
@@ -112,38 +131,107 @@ IMPORTANT RULES:
 - tech_stack = tools / platforms / frameworks.
 - Return ONLY valid JSON with NO extra text.
     """
+    return fit_prompt("parse_jd", render, {"jd_text": jd_text})
+
+
+def _complete_jd(data: dict) -> dict:
+    required_keys = [
+        "job_title", "role_summary",
+        "required_skills", "preferred_skills",
+        "responsibilities", "experience_level",
+        "seniority", "tech_stack"
+    ]
+    for key in required_keys:
+        data.setdefault(
+            key,
+            [] if key in ("required_skills", "preferred_skills", "responsibilities", "tech_stack") else ""
+        )
+    data.pop("raw_text", None)
+    return data
+
+
+def _parse_jd_llm(jd_text: str) -> dict:
+    return _complete_jd(generate_json_sync(_jd_prompt(jd_text), MODEL_NAME, schema=JD_SCHEMA, site="parse_jd"))
+
+
+async def _parse_jd_llm_async(jd_text: str) -> dict:
+    return _complete_jd(await generate_json(_jd_prompt(jd_text), MODEL_NAME, schema=JD_SCHEMA, site="parse_jd"))
+
+
+def cached_jd(jd_text: str):
+    """The stored parse of jd_text, or None; never calls the LLM."""
+    if not jd_text or not jd_text.strip():
+        return None
+    return _jd_cache.get(content_key(jd_text, JD_PROMPT_VERSION, MODEL_NAME))
+
+
+def parse_jd_text(jd_text: str) -> dict:
+    """
+    LLM parse of jd_text through the JD parse store, so each distinct JD
+    (after whitespace normalization) is parsed once. Raises if the LLM
+    call fails; failures are not cached.
+    """
+    key = content_key(jd_text, JD_PROMPT_VERSION, MODEL_NAME)
+    data = _jd_cache.get(key)
+    if data is None:
+        data = _parse_jd_llm(jd_text)
+        _jd_cache.set(key, data)
+    return data
+
+
+async def parse_jd_text_async(jd_text: str) -> dict:
+    """parse_jd_text for async callers: awaits the gateway instead of holding a thread."""
+    key = content_key(jd_text, JD_PROMPT_VERSION, MODEL_NAME)
+    # the cache's Mongo tier is blocking I/O
+    data = await asyncio.to_thread(_jd_cache.get, key)
+    if data is None:
+        data = await _parse_jd_llm_async(jd_text)
+        await asyncio.to_thread(_jd_cache.set, key, data)
+    return data
+
+
+def _empty_jd() -> dict:
+    return {
+        "job_title": "",
+        "role_summary": "",
+        "required_skills": [],
+        "preferred_skills": [],
+        "responsibilities": [],
+        "experience_level": "",
+        "seniority": "",
+        "tech_stack": [],
+        "raw_text": "",
+    }
+
+
+def parse_jd(source) -> dict:
+    jd_text = _load_jd_text(source)
+
+    if not jd_text or not jd_text.strip():
+        return _empty_jd()
 
     try:
-        model = genai.GenerativeModel(MODEL_NAME)
-        response = model.generate_content(prompt)
-        text = response.text.strip()
-
-        try:
-            data = json.loads(text)
-        except:
-            start = text.find("{")
-            end = text.rfind("}")
-            if start == -1 or end == -1:
-                raise ValueError("No JSON object found in LLM output")
-            data = json.loads(text[start:end + 1])
-
-        required_keys = [
-            "job_title", "role_summary",
-            "required_skills", "preferred_skills",
-            "responsibilities", "experience_level",
-            "seniority", "tech_stack"
-        ]
-        for key in required_keys:
-            data.setdefault(
-                key,
-                [] if key in ("required_skills", "preferred_skills", "responsibilities", "tech_stack") else ""
-            )
-
-        data["raw_text"] = jd_text
-        return data
+        data = parse_jd_text(jd_text)
+    except Exception as e:
+        print("JD LLM Parsing Error:", e)
+        data = _fallback_parse(jd_text)
+
+    data["raw_text"] = jd_text
+    return data
+
 
+async def parse_jd_async(source) -> dict:
+    """parse_jd for async callers."""
+    jd_text = await _load_jd_text_async(source)
+
+    if not jd_text or not jd_text.strip():
+        return _empty_jd()
+
+    try:
+        data = await parse_jd_text_async(jd_text)
     except Exception as e:
         print("JD LLM Parsing Error:", e)
-        fallback = _fallback_parse(jd_text)
-        fallback["raw_text"] = jd_text
-        return fallback
+        data = _fallback_parse(jd_text)
+
+    data["raw_text"] = jd_text
+    return data
@@ -1,10 +1,6 @@
-import json
-import os
-from dotenv import load_dotenv
-import google.generativeai as genai
+from .llm_gateway import generate_json, generate_json_sync
 
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+LEARNING_PATH_MODEL = "gemini-2.5-pro"
 
 CURATED_RESOURCES = {
     "python": ["Intro to Python (freecodecamp)", "Automate the Boring Stuff (book)"],
@@ -29,14 +25,8 @@ def _fallback_learning_path(skill_gaps, candidate_skills, target_role):
         "estimated_time_weeks": max(2, len(priority) * 2)
     }
 
-def generate_learning_path(skill_gaps, candidate_skills, target_role=None, use_llm=True):
-    if not skill_gaps:
-        return {"priority": [], "resources": {}, "projects": [], "estimated_time_weeks": 0}
-
-    if not use_llm:
-        return _fallback_learning_path(skill_gaps, candidate_skills, target_role)
-
-    prompt = f"""
+def _learning_path_prompt(skill_gaps, candidate_skills, target_role):
+    return f"""
 You are an experienced career coach and curriculum designer.
 
 Input:
@@ -51,13 +41,41 @@ Give 2-3 prioritized skills, 2 resources per skill (short title only), 2-3 small
 
 Return JSON only.
 """
+
+
+def _checked_learning_path(out, skill_gaps, candidate_skills, target_role):
+    for k in ("priority", "resources", "projects", "estimated_time_weeks"):
+        if k not in out:
+            return _fallback_learning_path(skill_gaps, candidate_skills, target_role)
+    return out
+
+
+def generate_learning_path(skill_gaps, candidate_skills, target_role=None, use_llm=True):
+    if not skill_gaps:
+        return {"priority": [], "resources": {}, "projects": [], "estimated_time_weeks": 0}
+
+    if not use_llm:
+        return _fallback_learning_path(skill_gaps, candidate_skills, target_role)
+
+    prompt = _learning_path_prompt(skill_gaps, candidate_skills, target_role)
     try:
-        model = genai.GenerativeModel("gemini-2.5-pro")
-        resp = model.generate_content(prompt)
-        out = json.loads(resp.text)
-        for k in ("priority", "resources", "projects", "estimated_time_weeks"):
-            if k not in out:
-                return _fallback_learning_path(skill_gaps, candidate_skills, target_role)
-        return out
+        out = generate_json_sync(prompt, LEARNING_PATH_MODEL, site="learning_path")
+        return _checked_learning_path(out, skill_gaps, candidate_skills, target_role)
     except Exception as e:
         return _fallback_learning_path(skill_gaps, candidate_skills, target_role)
+
+
+async def generate_learning_path_async(skill_gaps, candidate_skills, target_role=None, use_llm=True):
+    """generate_learning_path for async callers: awaits the gateway instead of holding a thread."""
+    if not skill_gaps:
+        return {"priority": [], "resources": {}, "projects": [], "estimated_time_weeks": 0}
+
+    if not use_llm:
+        return _fallback_learning_path(skill_gaps, candidate_skills, target_role)
+
+    prompt = _learning_path_prompt(skill_gaps, candidate_skills, target_role)
+    try:
+        out = await generate_json(prompt, LEARNING_PATH_MODEL, site="learning_path")
+        return _checked_learning_path(out, skill_gaps, candidate_skills, target_role)
+    except Exception:
+        return _fallback_learning_path(skill_gaps, candidate_skills, target_role)
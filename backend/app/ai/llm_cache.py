@@ -0,0 +1,98 @@
+import re
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+
+from ..database.llm_cache import LLMCacheDB
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", (text or "").strip())
+
+
+def content_key(text: str, *versions) -> str:
+    """SHA-256 of the normalized text plus whatever versions the output depends on."""
+    h = hashlib.sha256(normalize_text(text).encode("utf-8"))
+    for v in versions:
+        h.update(b"\x00")
+        h.update(str(v).encode("utf-8"))
+    return h.hexdigest()
+
+
+class TieredCache:
+    """In-process LRU in front of the Mongo llm_cache collection."""
+
+    def __init__(self, namespace: str, ttl_seconds: int, lru_size: int = 512):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.lru_size = lru_size
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "mongo_hits": 0, "misses": 0, "writes": 0}
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def get(self, key: str):
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return copy.deepcopy(self._lru[key])
+
+        try:
+            value = LLMCacheDB.get(self.namespace, key)
+        except Exception as e:
+            print(f"{self.namespace} cache read failed:", e)
+            value = None
+
+        with self._lock:
+            self._stats["mongo_hits" if value is not None else "misses"] += 1
+
+        if value is None:
+            return None
+        self._remember(key, value)
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value, tags: list = None):
+        self._remember(key, copy.deepcopy(value))
+        with self._lock:
+            self._stats["writes"] += 1
+        try:
+            LLMCacheDB.put(self.namespace, key, value, self.ttl_seconds, tags)
+        except Exception as e:
+            print(f"{self.namespace} cache write failed:", e)
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._lru.pop(key, None)
+        try:
+            LLMCacheDB.delete(self.namespace, key)
+        except Exception as e:
+            print(f"{self.namespace} cache delete failed:", e)
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            s["memory_entries"] = len(self._lru)
+        lookups = s["memory_hits"] + s["mongo_hits"] + s["misses"]
+        s["hit_rate"] = round((s["memory_hits"] + s["mongo_hits"]) / lookups, 4) if lookups else 0.0
+        return s
+
+
+_registry = {}
+
+
+def get_cache(namespace: str, ttl_seconds: int, lru_size: int = 512) -> TieredCache:
+    if namespace not in _registry:
+        _registry[namespace] = TieredCache(namespace, ttl_seconds, lru_size)
+    return _registry[namespace]
+
+
+def cache_stats() -> dict:
+    return {name: c.stats() for name, c in _registry.items()}
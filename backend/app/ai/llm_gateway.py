@@ -0,0 +1,239 @@
+import os
+import time
+import random
+import asyncio
+import threading
+from dotenv import load_dotenv
+import google.generativeai as genai
+
+from .llm_json import json_config, load_json, record_outcome, json_site_stats
+from .prompt_builder import prompt_stats
+
+try:
+    from google.api_core import exceptions as _gexc
+    # 429 (quota / rate limit) and 503 (model overloaded) are worth waiting out
+    RETRYABLE_ERRORS = (_gexc.ResourceExhausted, _gexc.TooManyRequests, _gexc.ServiceUnavailable)
+except ImportError:
+    RETRYABLE_ERRORS = ()
+
+load_dotenv()
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+if GEMINI_API_KEY:
+    try:
+        genai.configure(api_key=GEMINI_API_KEY)
+    except Exception:
+        GEMINI_API_KEY = None
+LLM_ENABLED = bool(GEMINI_API_KEY)
+
+# Gateway knobs
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+# per-model overrides, e.g. "gemini-2.5-pro=2,gemini-2.5-flash=16"
+LLM_CONCURRENCY_BY_MODEL = {
+    name.strip(): int(n)
+    for name, _, n in (
+        item.partition("=") for item in os.getenv("LLM_CONCURRENCY_BY_MODEL", "").split(",") if "=" in item
+    )
+}
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "1"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "30"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+
+
+class LLMGateway:
+    """
+    Every Gemini call goes through one event loop on a background thread,
+    so the async gRPC client behind each cached GenerativeModel is created
+    once and reused, and the per-model semaphores bound concurrency across
+    request handlers, worker threads and batch jobs alike.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._models = {}
+        self._semaphores = {}
+        self._stats = {}
+
+    # ---------------------------------------------------------
+    # Loop thread + per-model state
+    # ---------------------------------------------------------
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name="llm-gateway", daemon=True)
+                self._thread.start()
+                self._loop = loop
+            return self._loop
+
+    def model(self, name: str):
+        with self._lock:
+            if name not in self._models:
+                self._models[name] = genai.GenerativeModel(name)
+            return self._models[name]
+
+    def _model_stats(self, name: str) -> dict:
+        with self._lock:
+            if name not in self._stats:
+                self._stats[name] = {
+                    "calls": 0, "succeeded": 0, "failed": 0, "timeouts": 0,
+                    "rate_limited": 0, "retries": 0, "in_flight": 0, "waiting": 0,
+                    "call_seconds": 0.0,
+                }
+            return self._stats[name]
+
+    def _semaphore(self, name: str):
+        # only touched from the gateway loop, so no lock needed
+        if name not in self._semaphores:
+            self._semaphores[name] = asyncio.Semaphore(LLM_CONCURRENCY_BY_MODEL.get(name, LLM_CONCURRENCY))
+        return self._semaphores[name]
+
+    # ---------------------------------------------------------
+    # Calls (run on the gateway loop)
+    # ---------------------------------------------------------
+    async def _generate(self, prompt, model_name: str, generation_config=None, timeout: float = None) -> str:
+        model = self.model(model_name)
+        stats = self._model_stats(model_name)
+        stats["calls"] += 1
+        sem = self._semaphore(model_name)
+        stats["waiting"] += 1
+        try:
+            await sem.acquire()
+        finally:
+            stats["waiting"] -= 1
+        try:
+            stats["in_flight"] += 1
+            started = time.perf_counter()
+            try:
+                for attempt in range(LLM_MAX_RETRIES + 1):
+                    try:
+                        resp = await asyncio.wait_for(
+                            model.generate_content_async(prompt, generation_config=generation_config),
+                            timeout or LLM_TIMEOUT_SECONDS,
+                        )
+                        text = resp.text.strip()
+                        stats["succeeded"] += 1
+                        return text
+                    except RETRYABLE_ERRORS as e:
+                        stats["rate_limited"] += 1
+                        if attempt == LLM_MAX_RETRIES:
+                            raise
+                        delay = min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * 2 ** attempt)
+                        delay *= random.uniform(0.5, 1.0)
+                        stats["retries"] += 1
+                        print(f"LLM {model_name} rate limited ({type(e).__name__}), retrying in {delay:.1f}s")
+                        await asyncio.sleep(delay)
+            except asyncio.TimeoutError:
+                stats["timeouts"] += 1
+                stats["failed"] += 1
+                raise TimeoutError(f"LLM call to {model_name} exceeded {timeout or LLM_TIMEOUT_SECONDS}s")
+            except BaseException:
+                stats["failed"] += 1
+                raise
+            finally:
+                stats["in_flight"] -= 1
+                stats["call_seconds"] += time.perf_counter() - started
+        finally:
+            sem.release()
+
+    def _submit(self, prompt, model_name, generation_config=None, timeout=None):
+        if not LLM_ENABLED:
+            raise RuntimeError("Gemini key not configured")
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(
+            self._generate(prompt, model_name, generation_config, timeout), loop
+        )
+
+    # ---------------------------------------------------------
+    # Public entry points: async for handlers, sync for threads
+    # ---------------------------------------------------------
+    async def generate_text(self, prompt, model: str, generation_config=None, timeout: float = None) -> str:
+        return await asyncio.wrap_future(self._submit(prompt, model, generation_config, timeout))
+
+    async def generate_json(self, prompt, model: str, schema: dict = None, site: str = None,
+                            generation_config=None, timeout: float = None):
+        """
+        JSON-mode call (plus response schema if given), repaired locally when
+        the reply is still malformed; outcomes are counted under `site`.
+        """
+        site = site or model
+        try:
+            text = await self.generate_text(prompt, model, json_config(schema, generation_config), timeout)
+        except Exception:
+            record_outcome(site, "call_failed")
+            raise
+        return load_json(text, site)
+
+    def generate_text_sync(self, prompt, model: str, generation_config=None, timeout: float = None) -> str:
+        return self._submit(prompt, model, generation_config, timeout).result()
+
+    def generate_json_sync(self, prompt, model: str, schema: dict = None, site: str = None,
+                           generation_config=None, timeout: float = None):
+        site = site or model
+        try:
+            text = self.generate_text_sync(prompt, model, json_config(schema, generation_config), timeout)
+        except Exception:
+            record_outcome(site, "call_failed")
+            raise
+        return load_json(text, site)
+
+    def stats(self) -> dict:
+        out = {}
+        with self._lock:
+            items = [(name, dict(s)) for name, s in self._stats.items()]
+        for name, s in items:
+            finished = s["succeeded"] + s["failed"]
+            s["avg_latency_ms"] = round(s.pop("call_seconds") * 1000 / finished, 2) if finished else 0.0
+            s["concurrency_limit"] = LLM_CONCURRENCY_BY_MODEL.get(name, LLM_CONCURRENCY)
+            out[name] = s
+        return out
+
+    def shutdown(self):
+        with self._lock:
+            loop, self._loop = self._loop, None
+            # async clients and semaphores belong to the old loop
+            self._models = {}
+            self._semaphores = {}
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+
+
+_gateway = LLMGateway()
+
+
+def get_llm_gateway() -> LLMGateway:
+    return _gateway
+
+
+async def generate_text(prompt, model: str, generation_config=None, timeout: float = None) -> str:
+    return await _gateway.generate_text(prompt, model, generation_config, timeout)
+
+
+async def generate_json(prompt, model: str, schema: dict = None, site: str = None,
+                        generation_config=None, timeout: float = None):
+    return await _gateway.generate_json(prompt, model, schema, site, generation_config, timeout)
+
+
+def generate_text_sync(prompt, model: str, generation_config=None, timeout: float = None) -> str:
+    return _gateway.generate_text_sync(prompt, model, generation_config, timeout)
+
+
+def generate_json_sync(prompt, model: str, schema: dict = None, site: str = None,
+                       generation_config=None, timeout: float = None):
+    return _gateway.generate_json_sync(prompt, model, schema, site, generation_config, timeout)
+
+
+def llm_stats() -> dict:
+    return {
+        "enabled": LLM_ENABLED,
+        "models": _gateway.stats(),
+        "json_sites": json_site_stats(),
+        "prompt_sites": prompt_stats(),
+    }
+
+
+def stop_llm_gateway():
+    _gateway.shutdown()
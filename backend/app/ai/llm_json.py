@@ -0,0 +1,175 @@
+import json
+import threading
+
+# Response-schema building blocks (Gemini's OpenAPI subset). Gemini rejects
+# objects without properties, so free-form maps get no schema, only JSON mode.
+STRING = {"type": "string"}
+NUMBER = {"type": "number"}
+INTEGER = {"type": "integer"}
+BOOLEAN = {"type": "boolean"}
+STRING_LIST = {"type": "array", "items": STRING}
+
+
+def object_schema(properties: dict, required=None) -> dict:
+    schema = {"type": "object", "properties": properties}
+    if required:
+        schema["required"] = list(required)
+    return schema
+
+
+def json_config(schema: dict = None, generation_config: dict = None) -> dict:
+    config = dict(generation_config or {})
+    config["response_mime_type"] = "application/json"
+    if schema:
+        config["response_schema"] = schema
+    return config
+
+
+class LLMJSONError(ValueError):
+    def __init__(self, message: str, text: str = ""):
+        super().__init__(message)
+        self.text = text
+
+
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+def _drop_trailing_comma(out):
+    k = len(out) - 1
+    while k >= 0 and out[k].isspace():
+        k -= 1
+    if k >= 0 and out[k] == ",":
+        del out[k]
+
+
+def _repair(text: str) -> str:
+    """
+    Rewrite the first JSON-ish object in `text` into strict JSON: single
+    quotes, comments, trailing commas, Python literals, bare keys, trailing
+    prose and truncated output (unclosed strings / brackets) are handled.
+    """
+    out = []
+    stack = []
+    quote = None
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+        if quote:
+            if c == "\\" and i + 1 < n:
+                out.append("'" if quote == "'" and text[i + 1] == "'" else text[i:i + 2])
+                i += 2
+                continue
+            if c == quote:
+                out.append('"')
+                quote = None
+            elif c == '"':
+                out.append('\\"')
+            else:
+                out.append(c)
+            i += 1
+            continue
+
+        if c in "\"'":
+            quote = c
+            out.append('"')
+        elif text.startswith("//", i):
+            j = text.find("\n", i)
+            i = n if j == -1 else j
+            continue
+        elif text.startswith("/*", i):
+            j = text.find("*/", i + 2)
+            i = n if j == -1 else j + 2
+            continue
+        elif c in "{[":
+            stack.append("}" if c == "{" else "]")
+            out.append(c)
+        elif c in "}]":
+            _drop_trailing_comma(out)
+            out.append(stack.pop() if stack else c)
+            if not stack:
+                return "".join(out)
+        elif c.isalpha() or c == "_":
+            j = i
+            while j < n and (text[j].isalnum() or text[j] == "_"):
+                j += 1
+            word = text[i:j]
+            if word in _LITERALS:
+                word = _LITERALS[word]
+            elif text[j:].lstrip().startswith(":"):
+                word = f'"{word}"'
+            out.append(word)
+            i = j
+            continue
+        else:
+            out.append(c)
+        i += 1
+
+    # output was cut off: close what is still open
+    if quote:
+        out.append('"')
+    _drop_trailing_comma(out)
+    if out and out[-1].rstrip().endswith(":"):
+        out.append("null")
+    while stack:
+        _drop_trailing_comma(out)
+        out.append(stack.pop())
+    return "".join(out)
+
+
+def parse_llm_json(text: str):
+    """(object, repaired) for a model reply; LLMJSONError if nothing usable."""
+    text = (text or "").strip()
+    try:
+        obj = json.loads(text, strict=False)
+        if isinstance(obj, dict):
+            return obj, False
+    except ValueError:
+        pass
+
+    start = text.find("{")
+    if start == -1:
+        raise LLMJSONError("No JSON object found in LLM output", text)
+    try:
+        obj = json.loads(_repair(text[start:]), strict=False)
+    except ValueError as e:
+        raise LLMJSONError(f"Unrepairable JSON in LLM output: {e}", text)
+    if not isinstance(obj, dict):
+        raise LLMJSONError("LLM output is not a JSON object", text)
+    return obj, True
+
+
+# ---------------------------------------------------------
+# Per-call-site outcome counters
+# ---------------------------------------------------------
+_OUTCOMES = ("ok", "repaired", "unparseable", "call_failed")
+_lock = threading.Lock()
+_sites = {}
+
+
+def record_outcome(site: str, outcome: str):
+    with _lock:
+        counts = _sites.setdefault(site, dict.fromkeys(_OUTCOMES, 0))
+        counts[outcome] += 1
+
+
+def load_json(text: str, site: str):
+    """parse_llm_json plus bookkeeping for `site`."""
+    try:
+        obj, repaired = parse_llm_json(text)
+    except LLMJSONError:
+        record_outcome(site, "unparseable")
+        raise
+    record_outcome(site, "repaired" if repaired else "ok")
+    return obj
+
+
+def json_site_stats() -> dict:
+    with _lock:
+        sites = {name: dict(c) for name, c in _sites.items()}
+    for c in sites.values():
+        calls = sum(c.values())
+        # callers fall back to defaults when the call fails or nothing parses
+        c["calls"] = calls
+        c["fallback_rate"] = round((c["unparseable"] + c["call_failed"]) / calls, 4) if calls else 0.0
+        c["repair_rate"] = round(c["repaired"] / calls, 4) if calls else 0.0
+    return sites
@@ -1,17 +1,45 @@
 import os
 import re
 import json
+import asyncio
 import datetime
-from typing import Dict, Any
-import google.generativeai as genai
-from .project_relevance import project_relevance_score
-
-_GENAI_KEY = os.getenv("GEMINI_API_KEY")
-if _GENAI_KEY:
-    try:
-        genai.configure(api_key=_GENAI_KEY)
-    except Exception:
-        _GENAI_KEY = None
+from typing import Dict, Any, List
+import numpy as np
+from scipy import sparse
+from .project_relevance import project_relevance_score, get_responsibility_index
+from .ats_scoring import _KeywordMatcher
+from .llm_cache import get_cache, content_key
+from .llm_gateway import LLM_ENABLED, generate_json, generate_json_sync
+from .llm_json import object_schema, NUMBER, STRING_LIST
+from .prompt_builder import fit_prompt, compact
+
+SCORE_MODEL = "gemini-2.5-pro"
+# bump when the scoring prompt changes so stale cache entries are not reused
+SCORE_PROMPT_VERSION = "v2"
+SCORE_SCHEMA = object_schema(
+    {
+        "score": NUMBER,
+        "components": object_schema(
+            {
+                "required_coverage": NUMBER,
+                "preferred_coverage": NUMBER,
+                "semantic_fit": NUMBER,
+                "project_relevance": NUMBER,
+                "experience_fit": NUMBER,
+            },
+            required=["required_coverage", "preferred_coverage", "semantic_fit", "project_relevance", "experience_fit"],
+        ),
+        "explanations": STRING_LIST,
+    },
+    required=["score", "components", "explanations"],
+)
+WEIGHTS = {"required": 0.35, "preferred": 0.15, "semantic": 0.15, "projects": 0.2, "experience": 0.15}
+
+_score_cache = get_cache(
+    "match_score",
+    ttl_seconds=int(os.getenv("SCORE_CACHE_TTL_DAYS", "7")) * 86400,
+    lru_size=int(os.getenv("SCORE_CACHE_LRU_SIZE", "1024")),
+)
 
 def parse_experience_to_int(exp):
     if exp is None:
@@ -58,38 +86,20 @@ def _safe_text(t, max_chars=2200):
     return s[:max_chars]
 
 
-def deterministic_score(candidate: Dict[str, Any], job_role: Dict[str, Any]):
-    cand_sk = set(s.lower() for s in _normalize_list(candidate.get("skills")))
-    req = [s.lower() for s in _normalize_list(job_role.get("required_skills"))]
-    pref = [s.lower() for s in _normalize_list(job_role.get("preferred_skills"))]
-    projects = _normalize_list(candidate.get("projects"))
-    raw_text = (candidate.get("parsed_text") or candidate.get("raw_text") or "").lower()
-
-    req_cov = round(100 * (sum(1 for r in req if r in cand_sk) / len(req)), 2) if req else 100.0
-    pref_cov = round(100 * (sum(1 for p in pref if p in cand_sk) / len(pref)), 2) if pref else 100.0
+def _experience_fit(cand_exp, ideal):
+    if ideal is None or ideal <= 0:
+        return 50.0
+    return 100.0 if cand_exp >= ideal else round((cand_exp / ideal) * 100.0, 2)
 
-    try:
-        proj_score = round(project_relevance_score(projects, job_role.get("responsibilities", [])) * 100, 2)
-    except Exception:
-        proj_score = 0.0
 
-    ideal = parse_experience_to_int(
+def _job_experience_ideal(job_role: Dict[str, Any]):
+    return parse_experience_to_int(
         job_role.get("experience_level") or job_role.get("parsed", {}).get("experience_level")
     )
-    cand_exp = candidate.get("experience_years") or 0
-    if ideal is None or ideal <= 0:
-        exp_score = 50.0
-    else:
-        exp_score = 100.0 if cand_exp >= ideal else round((cand_exp / ideal) * 100.0, 2)
 
-    keys = req + pref
-    if keys:
-        semantic_hits = sum(1 for k in keys if k and k.lower() in raw_text)
-        semantic_score = round(100 * (semantic_hits / len(keys)), 2)
-    else:
-        semantic_score = 50.0
 
-    weights = {"required": 0.35, "preferred": 0.15, "semantic": 0.15, "projects": 0.2, "experience": 0.15}
+def _assemble(req_cov, pref_cov, semantic_score, proj_score, exp_score):
+    weights = WEIGHTS
     total = (
         req_cov * weights["required"]
         + pref_cov * weights["preferred"]
@@ -117,18 +127,144 @@ def deterministic_score(candidate: Dict[str, Any], job_role: Dict[str, Any]):
     }
 
 
-def gemini_score(candidate: Dict[str, Any], job_role: Dict[str, Any], model_name="gemini-2.5-pro"):
-    if not _GENAI_KEY:
-        raise RuntimeError("Gemini key not configured")
+def deterministic_score(candidate: Dict[str, Any], job_role: Dict[str, Any]):
+    cand_sk = set(s.lower() for s in _normalize_list(candidate.get("skills")))
+    req = [s.lower() for s in _normalize_list(job_role.get("required_skills"))]
+    pref = [s.lower() for s in _normalize_list(job_role.get("preferred_skills"))]
+    projects = _normalize_list(candidate.get("projects"))
+    raw_text = (candidate.get("parsed_text") or candidate.get("raw_text") or "").lower()
+
+    req_cov = round(100 * (sum(1 for r in req if r in cand_sk) / len(req)), 2) if req else 100.0
+    pref_cov = round(100 * (sum(1 for p in pref if p in cand_sk) / len(pref)), 2) if pref else 100.0
+
+    try:
+        proj_score = round(project_relevance_score(projects, job_role.get("responsibilities", [])) * 100, 2)
+    except Exception:
+        proj_score = 0.0
+
+    ideal = _job_experience_ideal(job_role)
+    cand_exp = candidate.get("experience_years") or 0
+    exp_score = _experience_fit(cand_exp, ideal)
+
+    keys = req + pref
+    if keys:
+        semantic_hits = sum(1 for k in keys if k and k.lower() in raw_text)
+        semantic_score = round(100 * (semantic_hits / len(keys)), 2)
+    else:
+        semantic_score = 50.0
+
+    return _assemble(req_cov, pref_cov, semantic_score, proj_score, exp_score)
 
-    cand_brief = {
+
+def deterministic_score_batch(candidates: List[Dict[str, Any]], job_role: Dict[str, Any]):
+    """
+    Score many candidates against one job role. Returns the same dicts as
+    calling deterministic_score on each candidate, in input order.
+
+    The job's skill vocabulary and responsibility vectors are built once;
+    skill coverage and raw-text keyword hits come from sparse
+    candidate x skill incidence matrices. Each text is scanned once for all
+    job skills (Aho-Corasick).
+    """
+    n = len(candidates)
+    if n == 0:
+        return []
+
+    req = [s.lower() for s in _normalize_list(job_role.get("required_skills"))]
+    pref = [s.lower() for s in _normalize_list(job_role.get("preferred_skills"))]
+    responsibilities = job_role.get("responsibilities", [])
+    ideal = _job_experience_ideal(job_role)
+
+    # vocabulary of distinct job skills; duplicates in req/pref still count
+    # once per occurrence, exactly like the per-candidate loops
+    vocab = {}
+    for k in req + pref:
+        vocab.setdefault(k, len(vocab))
+    req_w = np.zeros(len(vocab))
+    pref_w = np.zeros(len(vocab))
+    for k in req:
+        req_w[vocab[k]] += 1
+    for k in pref:
+        pref_w[vocab[k]] += 1
+    vocab_keys = set(vocab)
+    text_matcher = _KeywordMatcher(vocab)
+
+    skill_rows, skill_cols = [], []
+    text_rows, text_cols = [], []
+    for i, c in enumerate(candidates):
+        for s in vocab_keys.intersection(s.lower() for s in _normalize_list(c.get("skills"))):
+            skill_rows.append(i)
+            skill_cols.append(vocab[s])
+        raw_text = (c.get("parsed_text") or c.get("raw_text") or "").lower()
+        if raw_text:
+            for k in text_matcher.found(raw_text):
+                text_rows.append(i)
+                text_cols.append(vocab[k])
+
+    shape = (n, max(len(vocab), 1))
+    skill_m = sparse.csr_matrix((np.ones(len(skill_rows)), (skill_rows, skill_cols)), shape=shape)
+    text_m = sparse.csr_matrix((np.ones(len(text_rows)), (text_rows, text_cols)), shape=shape)
+
+    if vocab:
+        req_hits = skill_m @ req_w
+        pref_hits = skill_m @ pref_w
+        key_hits = text_m @ (req_w + pref_w)
+    else:
+        req_hits = pref_hits = key_hits = np.zeros(n)
+
+    # experience: vectorised for numeric values, scalar path otherwise
+    exp_raw = [c.get("experience_years") or 0 for c in candidates]
+    numeric = np.array([isinstance(e, (int, float)) and not isinstance(e, bool) for e in exp_raw])
+    if ideal is None or ideal <= 0:
+        exp_scores = [50.0] * n
+    else:
+        exp_arr = np.array([float(e) if ok else 0.0 for e, ok in zip(exp_raw, numeric)])
+        ratio = (exp_arr / ideal) * 100.0
+        meets = exp_arr >= ideal
+        exp_scores = [
+            (100.0 if m else round(float(r), 2)) if ok else _experience_fit(e, ideal)
+            for e, ok, m, r in zip(exp_raw, numeric, meets, ratio)
+        ]
+
+    # responsibility vectors are built once; all project lists scored together
+    try:
+        index = get_responsibility_index(responsibilities)
+        proj_scores = [
+            round(p * 100, 2)
+            for p in index.score_many([_normalize_list(c.get("projects")) for c in candidates])
+        ]
+    except Exception:
+        proj_scores = []
+        for c in candidates:
+            try:
+                proj_scores.append(round(project_relevance_score(_normalize_list(c.get("projects")), responsibilities) * 100, 2))
+            except Exception:
+                proj_scores.append(0.0)
+
+    n_req, n_pref, n_keys = len(req), len(pref), len(req) + len(pref)
+    results = []
+    for i, c in enumerate(candidates):
+        req_cov = round(100 * (int(req_hits[i]) / n_req), 2) if n_req else 100.0
+        pref_cov = round(100 * (int(pref_hits[i]) / n_pref), 2) if n_pref else 100.0
+        semantic_score = round(100 * (int(key_hits[i]) / n_keys), 2) if n_keys else 50.0
+
+        results.append(_assemble(req_cov, pref_cov, semantic_score, proj_scores[i], exp_scores[i]))
+
+    return results
+
+
+def _candidate_brief(candidate: Dict[str, Any]) -> Dict[str, Any]:
+    return {
         "name": candidate.get("name"),
         "skills": _normalize_list(candidate.get("skills")),
         "projects": _normalize_list(candidate.get("projects"))[:6],
         "experience_years": candidate.get("experience_years", 0),
         "resume_snippet": _safe_text(candidate.get("parsed_text", "") or candidate.get("raw_text", ""), 2000),
     }
-    job_brief = {
+
+
+def _job_brief(job_role: Dict[str, Any]) -> Dict[str, Any]:
+    return {
         "title": job_role.get("title"),
         "required_skills": _normalize_list(job_role.get("required_skills")),
         "preferred_skills": _normalize_list(job_role.get("preferred_skills")),
@@ -137,11 +273,46 @@ def gemini_score(candidate: Dict[str, Any], job_role: Dict[str, Any], model_name
         "jd_snippet": _safe_text(job_role.get("raw_text") or job_role.get("parsed", {}).get("raw_text", ""), 2000),
     }
 
-    prompt = f"""
+
+def score_fingerprint(candidate: Dict[str, Any], job_role: Dict[str, Any], model_name=SCORE_MODEL) -> str:
+    """
+    Cache key over exactly the fields gemini_score sends to the model, so
+    any edit to those fields (JobRoleDB.update, CandidateDB.update_resume)
+    produces a new key.
+    """
+    payload = json.dumps(
+        {"candidate": _candidate_brief(candidate), "job_role": _job_brief(job_role)},
+        sort_keys=True,
+        default=str,
+    )
+    return content_key(payload, model_name, json.dumps(WEIGHTS, sort_keys=True), SCORE_PROMPT_VERSION)
+
+
+def score_cache_tags(candidate: Dict[str, Any], job_role: Dict[str, Any]):
+    tags = []
+    if candidate.get("_id"):
+        tags.append(f"candidate:{candidate['_id']}")
+    if job_role.get("_id"):
+        tags.append(f"job_role:{job_role['_id']}")
+    return tags
+
+
+def _score_prompt(candidate: Dict[str, Any], job_role: Dict[str, Any]) -> str:
+    cand_brief = _candidate_brief(candidate)
+    job_brief = _job_brief(job_role)
+    baseline = (json.dumps(cand_brief), json.dumps(job_brief))
+    resume_snippet = cand_brief.pop("resume_snippet")
+    jd_snippet = job_brief.pop("jd_snippet")
+    cand_json, job_json = compact(cand_brief), compact(job_brief)
+
+    def render(resume_snippet, jd_snippet):
+        return f"""
 You are an expert hiring evaluator. Compare the candidate and the job role and return STRICT JSON only.
 
-Candidate: {json.dumps(cand_brief)}
-JobRole: {json.dumps(job_brief)}
+Candidate: {cand_json}
+Resume snippet: {resume_snippet}
+JobRole: {job_json}
+JD snippet: {jd_snippet}
 
 Return JSON exactly with keys:
 {{
@@ -156,16 +327,17 @@ Return JSON exactly with keys:
   "explanations": ["short bullet sentences only"]
 }}
 """
-    model = genai.GenerativeModel(model_name)
-    resp = model.generate_content(prompt)
-    text = resp.text.strip()
+    return fit_prompt(
+        "match_score",
+        render,
+        {"resume_snippet": resume_snippet, "jd_snippet": jd_snippet},
+        parts=(cand_json, job_json),
+        baseline=baseline,
+    )
 
-    s = text.find("{")
-    e = text.rfind("}")
-    if s == -1 or e == -1:
-        raise ValueError("No JSON object in Gemini response")
 
-    payload = json.loads(text[s:e+1])
+def _score_result(payload: dict) -> dict:
+    text = json.dumps(payload)
     if "score" not in payload or "components" not in payload:
         raise ValueError("Gemini response missing required fields")
 
@@ -174,13 +346,63 @@ Return JSON exactly with keys:
     return payload
 
 
-def compute_match_score(candidate: Dict[str, Any], job_role: Dict[str, Any], use_llm: bool = True) -> Dict[str, Any]:
+def gemini_score(candidate: Dict[str, Any], job_role: Dict[str, Any], model_name=SCORE_MODEL):
+    if not LLM_ENABLED:
+        raise RuntimeError("Gemini key not configured")
+
+    payload = generate_json_sync(_score_prompt(candidate, job_role), model_name, schema=SCORE_SCHEMA, site="match_score")
+    return _score_result(payload)
+
+
+async def gemini_score_async(candidate: Dict[str, Any], job_role: Dict[str, Any], model_name=SCORE_MODEL):
+    if not LLM_ENABLED:
+        raise RuntimeError("Gemini key not configured")
+
+    payload = await generate_json(_score_prompt(candidate, job_role), model_name, schema=SCORE_SCHEMA, site="match_score")
+    return _score_result(payload)
+
+
+def _fill_experience_level(job_role: Dict[str, Any]):
     if not job_role.get("experience_level") and job_role.get("parsed", {}).get("experience_level"):
         job_role["experience_level"] = job_role["parsed"]["experience_level"]
 
-    if use_llm and _GENAI_KEY:
+
+def compute_match_score(candidate: Dict[str, Any], job_role: Dict[str, Any], use_llm: bool = True) -> Dict[str, Any]:
+    _fill_experience_level(job_role)
+
+    if use_llm and LLM_ENABLED:
+        key = score_fingerprint(candidate, job_role)
+        cached = _score_cache.get(key)
+        if cached is not None:
+            cached["method"] = "gemini_cached"
+            return cached
+
+        try:
+            result = gemini_score(candidate, job_role)
+            _score_cache.set(key, result, tags=score_cache_tags(candidate, job_role))
+            return result
+        except Exception as e:
+            print("Gemini scoring failed, falling back:", str(e))
+
+    return deterministic_score(candidate, job_role)
+
+
+async def compute_match_score_async(candidate: Dict[str, Any], job_role: Dict[str, Any], use_llm: bool = True) -> Dict[str, Any]:
+    """compute_match_score for async callers: awaits the gateway instead of holding a thread."""
+    _fill_experience_level(job_role)
+
+    if use_llm and LLM_ENABLED:
+        key = score_fingerprint(candidate, job_role)
+        # the cache's Mongo tier is blocking I/O
+        cached = await asyncio.to_thread(_score_cache.get, key)
+        if cached is not None:
+            cached["method"] = "gemini_cached"
+            return cached
+
         try:
-            return gemini_score(candidate, job_role)
+            result = await gemini_score_async(candidate, job_role)
+            await asyncio.to_thread(_score_cache.set, key, result, score_cache_tags(candidate, job_role))
+            return result
         except Exception as e:
             print("Gemini scoring failed, falling back:", str(e))
 
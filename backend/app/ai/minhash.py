@@ -0,0 +1,63 @@
+import re
+import zlib
+import hashlib
+
+import numpy as np
+
+NUM_PERM = 128
+LSH_BANDS = 32
+LSH_ROWS = NUM_PERM // LSH_BANDS
+SHINGLE_SIZE = 3
+
+# multiply-shift hashing: (a * x + b) mod 2**64, top 32 bits. uint64
+# arithmetic wraps, so there is no modulo in the hot loop.
+# Fixed seed: signatures are persisted, so the hash family must never change.
+_rng = np.random.RandomState(20240501)
+_A = (_rng.randint(0, 1 << 62, size=NUM_PERM, dtype=np.int64).astype(np.uint64) << np.uint64(1)) | np.uint64(1)
+_B = _rng.randint(0, 1 << 62, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+_SHIFT = np.uint64(32)
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _shingles(text: str):
+    tokens = _WORD_RE.findall((text or "").lower())
+    if len(tokens) < SHINGLE_SIZE:
+        return set(tokens)
+    return {" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(text: str):
+    """128 x uint32 MinHash over word 3-shingles, or None for empty text."""
+    shingles = _shingles(text)
+    if not shingles:
+        return None
+    hv = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    perm = np.multiply.outer(hv, _A)
+    perm += _B
+    # shifting is monotonic, so take the min first and shift 128 values
+    return (perm.min(axis=0) >> _SHIFT).astype(np.int64).tolist()
+
+
+def lsh_bands(signature):
+    """One key per band; documents sharing any key are near-duplicate candidates."""
+    sig = np.asarray(signature, dtype=np.uint32)
+    keys = []
+    for b in range(LSH_BANDS):
+        chunk = sig[b * LSH_ROWS:(b + 1) * LSH_ROWS].tobytes()
+        keys.append(f"{b}:{hashlib.blake2b(chunk, digest_size=8).hexdigest()}")
+    return keys
+
+
+def estimate_jaccard(sig_a, sig_b) -> float:
+    if not sig_a or not sig_b or len(sig_a) != len(sig_b):
+        return 0.0
+    return float(np.mean(np.asarray(sig_a) == np.asarray(sig_b)))
+
+
+def text_fingerprint(text: str) -> dict:
+    """Fields stored on the candidate document at ingest."""
+    sig = minhash_signature(text)
+    if sig is None:
+        return {}
+    return {"minhash": sig, "lsh_bands": lsh_bands(sig)}
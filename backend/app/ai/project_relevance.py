@@ -1,5 +1,20 @@
-from difflib import SequenceMatcher
+import os
 import re
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+
+# "sequence" (default, SequenceMatcher), "tfidf" or "embedding"; the last two
+# are opt-in until their thresholds are calibrated against sequence scores
+SIMILARITY_BACKEND = os.getenv("PROJECT_SIM_BACKEND", "sequence")
+# "backend" uses each backend's own threshold; "legacy" keeps the original
+# 0.35 cut-off whatever the backend
+SIMILARITY_CALIBRATION = os.getenv("PROJECT_SIM_CALIBRATION", "backend")
+LEGACY_THRESHOLD = 0.35
+EMBED_MODEL = os.getenv("PROJECT_SIM_EMBED_MODEL", "all-MiniLM-L6-v2")
+
 
 def _clean(s: str):
     return re.sub(r'\s+', ' ', (s or "").strip().lower())
@@ -7,33 +22,178 @@ def _clean(s: str):
 def _similarity(a: str, b: str):
     return SequenceMatcher(None, _clean(a), _clean(b)).ratio()
 
-def project_relevance_score(projects, responsibilities, threshold=0.35):
-    if not responsibilities:
-        return 1.0
 
-    if not projects:
+def _reduce(best_per_resp, threshold):
+    scores = [b if b >= threshold else 0.0 for b in best_per_resp]
+    if not scores:
         return 0.0
+    avg = sum(scores) / len(scores)
+    return round(avg, 3)
 
-    scores = []
 
-    for r in responsibilities:
-        r_clean = _clean(r)
-        if not r_clean:
-            continue
+# ---------------------------------------------------------
+# Backends: index(responsibilities) -> ResponsibilityIndex
+# ---------------------------------------------------------
+class SequenceBackend:
+    name = "sequence"
+    default_threshold = LEGACY_THRESHOLD
 
-        best = 0.0
-        for p in projects:
-            p_clean = _clean(p)
-            if not p_clean:
-                continue
-            sim = _similarity(p_clean, r_clean)
-            if sim > best:
-                best = sim
+    def index(self, responsibilities):
+        return _SequenceIndex(responsibilities)
 
-        scores.append(best if best >= threshold else 0.0)
 
-    if not scores:
-        return 0.0
+class TfidfBackend:
+    """Char n-gram TF-IDF; IDF is fitted on the job's responsibilities."""
+    name = "tfidf"
+    default_threshold = 0.2
 
-    avg = sum(scores) / len(scores)
-    return round(avg, 3)
+    def __init__(self):
+        # hashing keeps project terms unseen in the JD in the vector norm
+        self._hasher = HashingVectorizer(
+            analyzer="char_wb", ngram_range=(3, 5), alternate_sign=False, norm=None
+        )
+
+    def index(self, responsibilities):
+        counts = self._hasher.transform(responsibilities)
+        tfidf = TfidfTransformer(sublinear_tf=True).fit(counts)
+
+        def encode(texts):
+            return tfidf.transform(self._hasher.transform(texts))
+
+        return _VectorIndex(encode, encode(responsibilities))
+
+
+class EmbeddingBackend:
+    """Local sentence-transformers model (optional dependency)."""
+    name = "embedding"
+    default_threshold = 0.45
+
+    def __init__(self):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise RuntimeError("sentence-transformers is not installed")
+        self._model = SentenceTransformer(EMBED_MODEL)
+
+    def index(self, responsibilities):
+        def encode(texts):
+            return self._model.encode(list(texts), normalize_embeddings=True)
+
+        return _VectorIndex(encode, encode(responsibilities))
+
+
+_BACKENDS = {
+    "sequence": SequenceBackend,
+    "tfidf": TfidfBackend,
+    "embedding": EmbeddingBackend,
+}
+
+
+@lru_cache(maxsize=None)
+def get_backend(name: str = None):
+    name = name or SIMILARITY_BACKEND
+    try:
+        return _BACKENDS[name]()
+    except Exception as e:
+        print(f"Similarity backend '{name}' unavailable, using sequence:", e)
+        return SequenceBackend()
+
+
+# ---------------------------------------------------------
+# Indexes: built once per job role, reused across candidates
+# ---------------------------------------------------------
+class _SequenceIndex:
+
+    def __init__(self, responsibilities):
+        self.responsibilities = responsibilities
+
+    def best_matches(self, projects):
+        out = []
+        for r in self.responsibilities:
+            best = 0.0
+            for p in projects:
+                sim = _similarity(p, r)
+                if sim > best:
+                    best = sim
+            out.append(best)
+        return out
+
+    def score_many(self, project_lists, threshold):
+        return [_reduce(self.best_matches(ps), threshold) for ps in project_lists]
+
+
+class _VectorIndex:
+
+    def __init__(self, encode, resp_vectors):
+        self.encode = encode
+        self.resp_vectors = resp_vectors
+
+    def score_many(self, project_lists, threshold):
+        flat = [p for ps in project_lists for p in ps]
+        if not flat:
+            return [_reduce([0.0] * self.resp_vectors.shape[0], threshold) for _ in project_lists]
+
+        sims = self.encode(flat) @ self.resp_vectors.T
+        sims = sims.toarray() if hasattr(sims, "toarray") else np.asarray(sims)
+
+        out = []
+        start = 0
+        for ps in project_lists:
+            end = start + len(ps)
+            if end == start:
+                best = [0.0] * sims.shape[1]
+            else:
+                best = sims[start:end].max(axis=0).tolist()
+            out.append(_reduce(best, threshold))
+            start = end
+        return out
+
+
+class ResponsibilityIndex:
+
+    def __init__(self, responsibilities, backend: str = None, calibration: str = None):
+        self.backend = get_backend(backend)
+        calibration = calibration or SIMILARITY_CALIBRATION
+        self.threshold = LEGACY_THRESHOLD if calibration == "legacy" else self.backend.default_threshold
+
+        self.empty = not responsibilities
+        cleaned = [c for c in (_clean(r) for r in (responsibilities or [])) if c]
+        self._index = self.backend.index(cleaned) if cleaned else None
+
+    def score_many(self, project_lists, threshold=None):
+        """One score per project list, same semantics as project_relevance_score."""
+        threshold = self.threshold if threshold is None else threshold
+        out = [None] * len(project_lists)
+        todo = []
+        for i, projects in enumerate(project_lists):
+            if self.empty:
+                out[i] = 1.0
+            elif not projects:
+                out[i] = 0.0
+            elif self._index is None:
+                out[i] = 0.0
+            else:
+                todo.append(i)
+
+        if todo:
+            cleaned = [[c for c in (_clean(p) for p in project_lists[i]) if c] for i in todo]
+            for i, score in zip(todo, self._index.score_many(cleaned, threshold)):
+                out[i] = score
+        return out
+
+    def score(self, projects, threshold=None):
+        return self.score_many([projects], threshold)[0]
+
+
+@lru_cache(maxsize=256)
+def _cached_index(responsibilities: tuple, backend: str, calibration: str):
+    return ResponsibilityIndex(list(responsibilities), backend, calibration)
+
+
+def get_responsibility_index(responsibilities, backend: str = None, calibration: str = None):
+    key = tuple(r if isinstance(r, str) else "" for r in (responsibilities or []))
+    return _cached_index(key, backend or SIMILARITY_BACKEND, calibration or SIMILARITY_CALIBRATION)
+
+
+def project_relevance_score(projects, responsibilities, threshold=None, backend=None):
+    return get_responsibility_index(responsibilities, backend).score(projects, threshold)
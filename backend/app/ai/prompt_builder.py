@@ -0,0 +1,134 @@
+import os
+import json
+import math
+import threading
+
+# Local estimate: Gemini averages ~4 characters per token on English text
+CHARS_PER_TOKEN = float(os.getenv("PROMPT_CHARS_PER_TOKEN", "4"))
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+# print the per-call size / tokens-saved line (prompt_stats() keeps the totals either way)
+PROMPT_LOG = os.getenv("PROMPT_LOG", "1") == "1"
+# per-call-site defaults; PROMPT_BUDGET_<SITE> overrides any of them
+_SITE_BUDGETS = {
+    "parse_resume": 12000,
+    "parse_jd": 8000,
+    "fused_score_single": 12000,
+    "fused_self_analysis": 12000,
+    "contextual_chat": 12000,
+    "match_score": 3000,
+    "semantic_fit": 3000,
+    "feedback": 3000,
+    "detect_role": 2000,
+}
+
+
+def budget_for(site: str) -> int:
+    return int(os.getenv(f"PROMPT_BUDGET_{site.upper()}", _SITE_BUDGETS.get(site, PROMPT_TOKEN_BUDGET)))
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def compact(obj) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def trim_text(text: str, max_chars: int, keep_tail: bool = False) -> str:
+    """Cut at a word boundary near max_chars (keeping the end if keep_tail)."""
+    text = text or ""
+    if len(text) <= max_chars:
+        return text
+    if keep_tail:
+        start = len(text) - max_chars
+        cut = text.find(" ", start)
+        return text[cut + 1 if -1 < cut < start + max_chars // 2 else start:]
+    cut = text.rfind(" ", 0, max_chars)
+    return text[:cut if cut > max_chars // 2 else max_chars]
+
+
+def project(doc: dict, fields, max_items: int = 12, max_chars: int = 400) -> dict:
+    """
+    Only `fields` of doc, skipping empty ones; lists keep their first
+    max_items entries and strings (also inside lists) max_chars characters.
+    """
+    out = {}
+    for f in fields:
+        v = (doc or {}).get(f)
+        if v in (None, "", [], {}):
+            continue
+        if isinstance(v, str):
+            v = trim_text(v, max_chars)
+        elif isinstance(v, (list, tuple)):
+            v = [trim_text(x, max_chars) if isinstance(x, str) else x for x in list(v)[:max_items]]
+        out[f] = v
+    return out
+
+
+def _baseline_tokens(baseline) -> int:
+    # plain json.dumps; call sites that used indent=2 sent more than this
+    total = 0
+    for obj in baseline:
+        total += estimate_tokens(obj if isinstance(obj, str) else json.dumps(obj, default=str))
+    return total
+
+
+_lock = threading.Lock()
+_sites = {}
+
+
+def fit_prompt(site: str, render, texts: dict = None, parts=(), baseline=(), output_saved: int = 0,
+               budget: int = None, keep_tail=()) -> str:
+    """
+    render(**texts) -> prompt. While the prompt is over the site's token
+    budget the longest of `texts` (resume / JD text) is trimmed, from the
+    front for names in keep_tail (chat history). `parts` are the other
+    payload strings in the prompt and `baseline` what the call used to
+    send in their place (default: the untrimmed texts), for the
+    tokens-saved log.
+    """
+    texts = dict(texts or {})
+    if not baseline:
+        baseline = tuple(parts) + tuple(t or "" for t in texts.values())
+    budget = budget or budget_for(site)
+    prompt = render(**texts)
+    tokens = estimate_tokens(prompt)
+    trimmed = False
+    for _ in range(8):
+        if tokens <= budget:
+            break
+        name = max(texts, key=lambda k: len(texts[k] or ""), default=None)
+        if not name or not texts[name]:
+            break
+        over_chars = int((tokens - budget) * CHARS_PER_TOKEN) + 32
+        texts[name] = trim_text(texts[name], max(0, len(texts[name]) - over_chars), name in keep_tail)
+        prompt = render(**texts)
+        tokens = estimate_tokens(prompt)
+        trimmed = True
+
+    payload = sum(estimate_tokens(p) for p in parts) + sum(estimate_tokens(t) for t in texts.values())
+    saved = max(0, _baseline_tokens(baseline) - payload)
+    with _lock:
+        s = _sites.setdefault(site, {
+            "calls": 0, "prompt_tokens": 0, "input_tokens_saved": 0,
+            "output_tokens_saved": 0, "trimmed": 0,
+        })
+        s["calls"] += 1
+        s["prompt_tokens"] += tokens
+        s["input_tokens_saved"] += saved
+        s["output_tokens_saved"] += output_saved
+        s["trimmed"] += int(trimmed)
+    if PROMPT_LOG:
+        print(
+            f"{site} prompt ~{tokens} tokens (budget {budget}{', trimmed' if trimmed else ''}), "
+            f"saved ~{saved} input / ~{output_saved} output tokens"
+        )
+    return prompt
+
+
+def prompt_stats() -> dict:
+    with _lock:
+        sites = {name: dict(s) for name, s in _sites.items()}
+    for s in sites.values():
+        s["avg_prompt_tokens"] = round(s["prompt_tokens"] / s["calls"], 1) if s["calls"] else 0.0
+    return sites
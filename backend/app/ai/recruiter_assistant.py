@@ -1,10 +1,11 @@
-import json
-import os
-from dotenv import load_dotenv
-import google.generativeai as genai
+from .llm_gateway import generate_json_sync
+from .llm_json import object_schema, STRING, STRING_LIST
+from .prompt_builder import fit_prompt, project, compact
 
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+ASSISTANT_MODEL = "gemini-2.5-flash"
+ASSISTANT_SCHEMA = object_schema({"reply": STRING, "suggested_actions": STRING_LIST}, required=["reply"])
+JOB_FIELDS = ("title", "required_skills", "preferred_skills", "responsibilities", "experience_min", "location")
+CANDIDATE_FIELDS = ("_id", "candidate_id", "name", "skills", "experience_years", "match_score", "score", "status")
 
 
 def answer_recruiter_query(query, history, job_role, candidates):
@@ -30,10 +31,11 @@ def answer_recruiter_query(query, history, job_role, candidates):
         role = "Recruiter" if msg.get("sender") == "recruiter" else "Assistant"
         history_text += f"{role}: {msg.get('text', '')}\n"
 
-    job_role_txt = json.dumps(job_role or {}, indent=2)
-    cand_txt = json.dumps(candidates or [], indent=2)
+    job_role_txt = compact(project(job_role or {}, JOB_FIELDS))
+    cand_txt = compact([project(c, CANDIDATE_FIELDS) for c in candidates or []])
 
-    prompt = f"""
+    def render(history_text):
+        return f"""
 You are an AI recruitment assistant helping a recruiter evaluate candidates and make decisions.
 
 Job Role (if provided):
@@ -64,21 +66,17 @@ Return ONLY valid JSON in this exact format:
   "suggested_actions": ["action1", "action2"]
 }}
 """
-
-    model = genai.GenerativeModel("gemini-2.5-flash")
+    prompt = fit_prompt(
+        "recruiter_assistant",
+        render,
+        {"history_text": history_text},
+        parts=(job_role_txt, cand_txt),
+        baseline=(job_role or {}, candidates or [], history_text),
+        keep_tail=("history_text",),
+    )
 
     try:
-        response = model.generate_content(prompt)
-        text = response.text.strip()
-
-        if text.startswith("{"):
-            return json.loads(text)
-
-        start, end = text.find("{"), text.rfind("}")
-        if start != -1 and end != -1:
-            return json.loads(text[start : end + 1])
-
-        raise ValueError("Invalid JSON from model")
+        return generate_json_sync(prompt, ASSISTANT_MODEL, schema=ASSISTANT_SCHEMA, site="recruiter_assistant")
 
     except Exception as e:
         print("LLM Parsing Error in recruiter_assistant:", e)
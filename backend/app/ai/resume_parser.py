@@ -1,48 +1,275 @@
+import io
 import fitz
 import docx
-import json
-import google.generativeai as genai
 from dotenv import load_dotenv
 import os
 from typing import Dict
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .llm_cache import get_cache, content_key
+from .extraction_service import get_extraction_service, ExtractionTimeout
+from .llm_gateway import generate_json, generate_json_sync
+from .llm_json import object_schema, STRING, NUMBER, STRING_LIST
+from .prompt_builder import fit_prompt, estimate_tokens, budget_for
 
 load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 
-def extract_text_from_pdf(file_path: str) -> str:
-    text = ""
+PARSE_MODEL = "gemini-2.5-flash"
+# bump when the parse prompt changes so stale cache entries are not reused
+PARSE_PROMPT_VERSION = "v2"
+PARSE_SCHEMA = object_schema(
+    {
+        "name": STRING,
+        "email": STRING,
+        "phone": STRING,
+        "skills": STRING_LIST,
+        "education": STRING_LIST,
+        "experience_years": NUMBER,
+        "projects": STRING_LIST,
+    },
+    required=["name", "email", "skills", "experience_years"],
+)
+
+_parse_cache = get_cache(
+    "resume_parse",
+    ttl_seconds=int(os.getenv("PARSE_CACHE_TTL_DAYS", "30")) * 86400,
+    lru_size=int(os.getenv("PARSE_CACHE_LRU_SIZE", "512")),
+)
+
+# Extraction knobs. Match-score prompts keep ~2000 chars of text, so files
+# far past any real resume stop early instead of being read to the end.
+EXTRACT_CHAR_BUDGET = int(os.getenv("EXTRACT_CHAR_BUDGET", "100000"))  # 0 = no limit
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "40"))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "10"))
+PDF_PAGE_WORKERS = int(os.getenv("PDF_PAGE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_page_pool = None
+# set in extraction pool workers so they never start a page pool of their own
+_in_extract_worker = False
+
+
+def mark_extract_worker():
+    """ProcessPoolExecutor initializer for pools that run extract_text."""
+    global _in_extract_worker
+    _in_extract_worker = True
+
+
+def _get_page_pool():
+    global _page_pool
+    if _page_pool is None:
+        _page_pool = ProcessPoolExecutor(max_workers=PDF_PAGE_WORKERS, initializer=mark_extract_worker)
+    return _page_pool
+
+
+def _open_pdf(source):
+    if isinstance(source, str):
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype="pdf")
+
+
+def _collect(texts, max_chars: int) -> str:
+    """Join page/paragraph texts once, stopping at the char budget."""
+    parts = []
+    total = 0
+    for t in texts:
+        parts.append(t)
+        total += len(t)
+        if max_chars and total >= max_chars:
+            break
+    text = "".join(parts)
+    return text[:max_chars] if max_chars else text
+
+
+def _pdf_pages_text(source, start: int, stop: int, max_chars: int = 0) -> str:
+    with _open_pdf(source) as doc:
+        return _collect((doc[i].get_text("text") for i in range(start, stop)), max_chars)
+
+
+def _pdf_text_parallel(source, page_count: int, max_chars: int) -> str:
+    pool = _get_page_pool()
+    futures = [
+        pool.submit(_pdf_pages_text, source, start, min(start + PDF_PAGES_PER_TASK, page_count), max_chars)
+        for start in range(0, page_count, PDF_PAGES_PER_TASK)
+    ]
+
+    parts = []
+    total = 0
+    for i, f in enumerate(futures):
+        t = f.result()
+        parts.append(t)
+        total += len(t)
+        if max_chars and total >= max_chars:
+            for rest in futures[i + 1:]:
+                rest.cancel()
+            break
+    return _collect(parts, max_chars)
+
+
+def extract_text_from_pdf(source, max_chars: int = None) -> str:
+    """source: file path or PDF bytes."""
+    max_chars = EXTRACT_CHAR_BUDGET if max_chars is None else max_chars
+    pages = []
     try:
-        doc = fitz.open(file_path)
-        for page in doc:
-            text += page.get_text("text")
+        with _open_pdf(source) as doc:
+            n = doc.page_count
+            if n >= PDF_PARALLEL_MIN_PAGES and PDF_PAGE_WORKERS > 1 and not _in_extract_worker:
+                return _pdf_text_parallel(source, n, max_chars)
+
+            total = 0
+            for page in doc:
+                t = page.get_text("text")
+                pages.append(t)
+                total += len(t)
+                if max_chars and total >= max_chars:
+                    break
     except Exception as e:
         print("PDF extraction error:", e)
-    return text
+    return _collect(pages, max_chars)
 
 
-def extract_text_from_docx(file_path: str) -> str:
+def extract_text_from_docx(source, max_chars: int = None) -> str:
+    """source: file path or DOCX bytes."""
+    max_chars = EXTRACT_CHAR_BUDGET if max_chars is None else max_chars
     text = ""
     try:
-        doc = docx.Document(file_path)
-        for para in doc.paragraphs:
-            text += para.text + "\n"
+        doc = docx.Document(source if isinstance(source, str) else io.BytesIO(source))
+        text = _collect((para.text + "\n" for para in doc.paragraphs), max_chars)
     except Exception as e:
         print("DOCX extraction error:", e)
     return text
 
 
-def extract_text(file_path: str) -> str:
-    file_ext = file_path.lower()
+def _file_ext(source, filename: str = None) -> str:
+    file_ext = (source if isinstance(source, str) else (filename or "")).lower()
+    if not isinstance(source, str) and not file_ext.endswith((".pdf", ".docx")):
+        if bytes(source[:4]) == b"%PDF":
+            file_ext = ".pdf"
+        elif bytes(source[:2]) == b"PK":
+            file_ext = ".docx"
+
     if file_ext.endswith(".pdf"):
-        return extract_text_from_pdf(file_path)
+        return ".pdf"
     elif file_ext.endswith(".docx"):
-        return extract_text_from_docx(file_path)
-    else:
-        raise ValueError("Unsupported file format. Only PDF and DOCX allowed.")
+        return ".docx"
+    raise ValueError("Unsupported file format. Only PDF and DOCX allowed.")
 
 
-def parse_resume_with_ai(text: str) -> Dict:
-    prompt = f"""
+def _extract_local(source, filename: str = None, max_chars: int = None) -> str:
+    if _file_ext(source, filename) == ".pdf":
+        return extract_text_from_pdf(source, max_chars)
+    return extract_text_from_docx(source, max_chars)
+
+
+def _extract_or_count(source, filename: str = None, max_chars: int = None):
+    """Service task: ("text", text), or ("pages", n) for a PDF worth fanning out."""
+    if _file_ext(source, filename) == ".pdf" and PDF_PAGE_WORKERS > 1:
+        try:
+            with _open_pdf(source) as doc:
+                n = doc.page_count
+        except Exception as e:
+            print("PDF extraction error:", e)
+            return "text", ""
+        if n >= PDF_PARALLEL_MIN_PAGES:
+            return "pages", n
+    return "text", _extract_local(source, filename, max_chars)
+
+
+def _page_tasks(svc, source, page_count: int, max_chars: int):
+    return [
+        svc.submit(_pdf_pages_text, source, start, min(start + PDF_PAGES_PER_TASK, page_count), max_chars)
+        for start in range(0, page_count, PDF_PAGES_PER_TASK)
+    ]
+
+
+def extract_text(source, filename: str = None, max_chars: int = None) -> str:
+    """
+    source: file path, bytes or a binary stream. For bytes/streams the format
+    comes from `filename`'s extension, else from the file signature.
+    max_chars: stop after this many chars (default EXTRACT_CHAR_BUDGET, 0 = all).
+
+    Runs on the extraction service's process pool once the app has started
+    it (inline before that, e.g. in scripts). A timeout or worker crash
+    counts as no text, like any other unreadable file.
+    """
+    if hasattr(source, "read"):
+        source = source.read()
+    max_chars = EXTRACT_CHAR_BUDGET if max_chars is None else max_chars
+
+    svc = get_extraction_service()
+    if svc is None or _in_extract_worker:
+        return _extract_local(source, filename, max_chars)
+
+    try:
+        kind, value = svc.run(_extract_or_count, source, filename, max_chars)
+        if kind == "text":
+            return value
+
+        futures = _page_tasks(svc, source, value, max_chars)
+        parts, total = [], 0
+        for i, f in enumerate(futures):
+            t = svc.result(f)
+            parts.append(t)
+            total += len(t)
+            if max_chars and total >= max_chars:
+                for rest in futures[i + 1:]:
+                    rest.cancel()
+                break
+        return _collect(parts, max_chars)
+    except (ExtractionTimeout, BrokenProcessPool) as e:
+        print("Extraction service error:", e)
+        return ""
+
+
+async def extract_text_async(source, filename: str = None, max_chars: int = None) -> str:
+    """extract_text for async callers: awaits the pool instead of blocking a thread."""
+    svc = get_extraction_service()
+    if svc is None:
+        return await asyncio.to_thread(extract_text, source, filename, max_chars)
+
+    if hasattr(source, "read"):
+        source = source.read()
+    max_chars = EXTRACT_CHAR_BUDGET if max_chars is None else max_chars
+
+    try:
+        kind, value = await svc.run_async(_extract_or_count, source, filename, max_chars)
+        if kind == "text":
+            return value
+
+        futures = _page_tasks(svc, source, value, max_chars)
+        parts, total = [], 0
+        for i, f in enumerate(futures):
+            t = await svc.result_async(f)
+            parts.append(t)
+            total += len(t)
+            if max_chars and total >= max_chars:
+                for rest in futures[i + 1:]:
+                    rest.cancel()
+                break
+        return _collect(parts, max_chars)
+    except (ExtractionTimeout, BrokenProcessPool) as e:
+        print("Extraction service error:", e)
+        return ""
+
+
+def _empty_parse(text: str) -> Dict:
+    return {
+        "name": "",
+        "email": "",
+        "phone": "",
+        "skills": [],
+        "education": [],
+        "experience_years": 0,
+        "projects": [],
+        "raw_text": text,
+    }
+
+
+def _parse_prompt(text: str) -> str:
+    # the text is not echoed back; parse_resume_with_ai re-attaches it
+    def render(text):
+        return f"""
 You are a resume parsing assistant. Convert the following resume text into STRICT JSON with EXACT fields:
 
 {{
@@ -52,8 +279,7 @@ You are a resume parsing assistant. Convert the following resume text into STRIC
   "skills": [],
   "education": [],
   "experience_years": 0,
-  "projects": [],
-  "raw_text": ""
+  "projects": []
 }}
 
 Rules:
@@ -62,60 +288,117 @@ Rules:
 - education: list of strings.
 - projects: list of short strings.
 - experience_years must be a number.
-- raw_text must contain the full resume text.
 
 Resume Text:
 {text}
 """
+    # the reply used to echo the resume back as raw_text (at most what fits the prompt)
+    echoed = min(estimate_tokens(text), budget_for("parse_resume"))
+    return fit_prompt("parse_resume", render, {"text": text}, output_saved=echoed)
 
-    model = genai.GenerativeModel("gemini-2.5-flash")
 
+def _parse_resume_llm(text: str):
     try:
-        response = model.generate_content(prompt)
-        output = ""
-        if hasattr(response, "text") and response.text:
-            output = response.text.strip()
-        elif hasattr(response, "candidates") and response.candidates:
-            first = response.candidates[0]
-            output = getattr(first, "content", getattr(first, "text", str(first))).strip()
-
-        if output.startswith("{"):
-            parsed = json.loads(output)
-            parsed["raw_text"] = text
-            parsed.setdefault("skills", [])
-            parsed.setdefault("education", [])
-            parsed.setdefault("projects", [])
-            parsed.setdefault("experience_years", 0)
-            return parsed
-
-        start = output.find("{")
-        end = output.rfind("}")
-        if start != -1 and end != -1:
-            parsed = json.loads(output[start:end+1])
-            parsed["raw_text"] = text
-            parsed.setdefault("skills", [])
-            parsed.setdefault("education", [])
-            parsed.setdefault("projects", [])
-            parsed.setdefault("experience_years", 0)
-            return parsed
+        return generate_json_sync(_parse_prompt(text), PARSE_MODEL, schema=PARSE_SCHEMA, site="parse_resume")
+    except Exception as e:
+        print("LLM Parsing Error:", e)
+
+    return None
+
 
+async def _parse_resume_llm_async(text: str):
+    try:
+        return await generate_json(_parse_prompt(text), PARSE_MODEL, schema=PARSE_SCHEMA, site="parse_resume")
     except Exception as e:
         print("LLM Parsing Error:", e)
 
-    return {
-        "name": "",
-        "email": "",
-        "phone": "",
-        "skills": [],
-        "education": [],
-        "experience_years": 0,
-        "projects": [],
-        "raw_text": text,
-    }
+    return None
 
 
-def parse_resume(file_path: str) -> Dict:
-    text = extract_text(file_path)
+def _parse_key(text: str) -> str:
+    return content_key(text, PARSE_PROMPT_VERSION, PARSE_MODEL)
+
+
+def parse_resume_with_ai(text: str) -> Dict:
+    key = _parse_key(text)
+
+    parsed = _parse_cache.get(key)
+    if parsed is None:
+        parsed = _parse_resume_llm(text)
+        if not isinstance(parsed, dict):
+            return _empty_parse(text)
+        parsed.pop("raw_text", None)
+        _parse_cache.set(key, parsed)
+
+    return _complete_parse(parsed, text)
+
+
+async def parse_resume_with_ai_async(text: str) -> Dict:
+    """parse_resume_with_ai for async callers: awaits the gateway instead of holding a thread."""
+    key = _parse_key(text)
+
+    # the cache's Mongo tier is blocking I/O
+    parsed = await asyncio.to_thread(_parse_cache.get, key)
+    if parsed is None:
+        parsed = await _parse_resume_llm_async(text)
+        if not isinstance(parsed, dict):
+            return _empty_parse(text)
+        parsed.pop("raw_text", None)
+        await asyncio.to_thread(_parse_cache.set, key, parsed)
+
+    return _complete_parse(parsed, text)
+
+
+def remember_parse(text: str, parsed: Dict):
+    """Cache a parse produced elsewhere (the fused analysis) for later parses of the same text."""
+    if not text or not parsed:
+        return
+    _parse_cache.set(_parse_key(text), {k: v for k, v in parsed.items() if k != "raw_text"})
+
+
+def _complete_parse(parsed: Dict, text: str) -> Dict:
+    parsed["raw_text"] = text
+    parsed.setdefault("skills", [])
+    parsed.setdefault("education", [])
+    parsed.setdefault("projects", [])
+    parsed.setdefault("experience_years", 0)
+    return parsed
+
+
+def parsed_from_candidate(candidate: dict) -> Dict:
+    """
+    Parse for a resume file already on record (matched by file hash): the
+    cached LLM parse of its text if still cached, else the stored fields.
+    """
+    stored = candidate.get("parsed") or candidate
+    text = candidate.get("parsed_text") or stored.get("raw_text") or ""
+
+    parsed = _parse_cache.get(_parse_key(text)) if text else None
+    if parsed is None:
+        parsed = {
+            k: stored.get(k)
+            for k in ("name", "email", "phone", "skills", "education", "experience_years", "projects")
+            if stored.get(k) is not None
+        }
+
+    parsed["raw_text"] = text
+    parsed.setdefault("skills", [])
+    parsed.setdefault("education", [])
+    parsed.setdefault("projects", [])
+    parsed.setdefault("experience_years", 0)
+    return parsed
+
+
+def parse_resume(source, filename: str = None) -> Dict:
+    text = extract_text(source, filename)
     if len(text.strip()) == 0:
         return {"error": "Could not extract text from file.", "raw_text": ""}
     return parse_resume_with_ai(text)
+
+
+async def parse_resume_async(source, filename: str = None) -> Dict:
+    """parse_resume for request handlers: extraction and the LLM call run off the event loop."""
+    text = await extract_text_async(source, filename)
+    if len(text.strip()) == 0:
+        return {"error": "Could not extract text from file.", "raw_text": ""}
+    return await parse_resume_with_ai_async(text)
@@ -0,0 +1,331 @@
+import os
+import asyncio
+
+from .resume_parser import extract_text_async, parse_resume_with_ai_async, parsed_from_candidate
+from .duplicate_detector import file_hash as path_hash
+from .upload_spool import read_upload
+from .match_score import compute_match_score_async, deterministic_score_batch
+from .llm_gateway import LLM_ENABLED
+from .ats_scoring import compute_ats_score
+from .skill_gap import get_skill_gap
+from ..database.candidate import CandidateDB
+from ..database.feedback import FeedbackDB
+
+# Pipeline knobs (max_in_flight is also overridable per request)
+MAX_IN_FLIGHT = int(os.getenv("SHORTLIST_MAX_IN_FLIGHT", "8"))
+LLM_CONCURRENCY = int(os.getenv("SHORTLIST_LLM_CONCURRENCY", "4"))
+WRITE_BATCH_SIZE = int(os.getenv("SHORTLIST_WRITE_BATCH_SIZE", "50"))
+
+SHORTLIST_THRESHOLD = 45
+REJECTION_FEEDBACK = "We could not progress your application further for this role."
+NO_EMAIL_FEEDBACK = "Email not detected in resume. Unable to process candidate."
+FAILED_FEEDBACK = "Resume could not be processed."
+
+def new_candidate_doc(email: str, parsed: dict, file_hash: str = None) -> dict:
+    doc = {
+        "email": email,
+        "name": parsed.get("name"),
+        "skills": parsed.get("skills", []),
+        "projects": parsed.get("projects", []),
+        "parsed_text": parsed.get("raw_text", "") or parsed.get("parsed_text", ""),
+        "experience_years": parsed.get("experience_years", 0),
+        "linked_user_id": None
+    }
+    if file_hash:
+        doc["file_hash"] = file_hash
+    return doc
+
+
+def known_file(file_hash: str):
+    """(candidate_id, parsed) when this exact file was ingested before, else None."""
+    if not file_hash:
+        return None
+    existing = CandidateDB.find_by_hash(file_hash)
+    if not existing:
+        return None
+    return existing["_id"], parsed_from_candidate(existing)
+
+
+def _required_skills(job: dict):
+    return job.get("required_skills", []) or job.get("parsed", {}).get("required_skills", [])
+
+
+# ---------------------------------------------------------
+# Stage 1: read + hash, known-file lookup, text extraction (extraction service)
+# ---------------------------------------------------------
+async def _load(source: dict):
+    """(extract_text args, file_hash): bytes for uploads, the path for spooled files."""
+    if source.get("path"):
+        h = source.get("file_hash") or await asyncio.to_thread(path_hash, source["path"])
+        return (source["path"],), h
+
+    up = await read_upload(source["file"])
+    return (up.data, source.get("filename")), up.file_hash
+
+
+async def _extract(*args) -> str:
+    try:
+        return await extract_text_async(*args)
+    except Exception as e:
+        print("Extraction failed for", args[-1] if len(args) > 1 else args[0], ":", e)
+        return ""
+
+
+# ---------------------------------------------------------
+# Stage 2: LLM parse + scoring (async, capped)
+# ---------------------------------------------------------
+async def score_resume(source: dict, job: dict, llm_sem: asyncio.Semaphore, require_email: bool = True) -> dict:
+    extract_args, fhash = await _load(source)
+    # a file seen before skips extraction and the parse LLM call
+    known = await asyncio.to_thread(known_file, fhash)
+
+    if known:
+        candidate_id, parsed = known
+    else:
+        text = await _extract(*extract_args)
+        if not text.strip():
+            return {"parsed": {"error": "Could not extract text from file.", "raw_text": ""}, "file_hash": fhash}
+
+        async with llm_sem:
+            parsed = await parse_resume_with_ai_async(text)
+        candidate_id = None
+
+    email = (parsed.get("email") or "").lower()
+    if require_email and not email:
+        return {"parsed": parsed, "file_hash": fhash}
+
+    rec = _scored_record(parsed, email, fhash, candidate_id, job)
+    if not LLM_ENABLED:
+        # no scoring model: the writer scores each write batch together
+        return rec
+
+    async with llm_sem:
+        match_result = await compute_match_score_async(parsed, job)
+    rec["match_score"] = match_result.get("score", 0)
+    rec["match_components"] = match_result.get("components")
+    return rec
+
+
+def _scored_record(parsed: dict, email: str, fhash: str, candidate_id, job: dict) -> dict:
+    required = _required_skills(job)
+    return {
+        "parsed": parsed,
+        "email": email,
+        "match_score": None,  # set by the caller, or by _score_batch at write time
+        "match_components": None,
+        "skill_gap": get_skill_gap(parsed.get("skills", []), required),
+        "ats_score": compute_ats_score(parsed.get("parsed_text") or parsed.get("raw_text", ""), required),
+        "file_hash": fhash,
+        "candidate_id": candidate_id,
+    }
+
+
+def _score_batch(batch, job: dict):
+    """Deterministic scores for the records left unscored, one batch call per write batch."""
+    pending = [r for r in batch if "match_score" in r and r["match_score"] is None]
+    if not pending:
+        return
+    for r, res in zip(pending, deterministic_score_batch([r["parsed"] for r in pending], job)):
+        r["match_score"] = res.get("score", 0)
+        r["match_components"] = res.get("components")
+
+
+# ---------------------------------------------------------
+# Stage 3: Mongo writes (batched). Each flush sets rec["result"].
+# ---------------------------------------------------------
+def flush_shortlist(batch, job_role_id: str, recruiter_id: str, batch_job_id: str = None):
+    """batch_job_id keys the history and draft writes, so a batch job's retried flush is a no-op."""
+    scored = [r for r in batch if r.get("email")]
+
+    known = CandidateDB.find_ids_by_emails([r["email"] for r in scored if not r.get("candidate_id")])
+    new_docs = {}
+    for r in scored:
+        if r.get("candidate_id"):
+            continue
+        if r["email"] not in known and r["email"] not in new_docs:
+            new_docs[r["email"]] = new_candidate_doc(r["email"], r["parsed"], r.get("file_hash"))
+    for doc in CandidateDB.insert_candidate_docs(list(new_docs.values())):
+        known[doc["email"]] = doc["_id"]
+    for r in scored:
+        r["candidate_id"] = r.get("candidate_id") or known[r["email"]]
+
+    CandidateDB.add_submissions([
+        (r["candidate_id"], job_role_id, recruiter_id) for r in scored
+    ], batch_job_id)
+
+    FeedbackDB.create_drafts([
+        {
+            "candidate_id": r["candidate_id"],
+            "recruiter_id": recruiter_id,
+            "job_role_id": job_role_id,
+            "feedback_text": REJECTION_FEEDBACK,
+        }
+        for r in scored if r["match_score"] < SHORTLIST_THRESHOLD
+    ], batch_job_id)
+
+    for r in batch:
+        parsed = r.get("parsed") or {}
+        if r.get("error") or not r.get("email"):
+            r["result"] = {
+                "status": "rejected",
+                "candidate_id": None,
+                "email": None,
+                "name": parsed.get("name"),
+                "match_score": 0,
+                "ats_score": 0,
+                "feedback": FAILED_FEEDBACK if r.get("error") else NO_EMAIL_FEEDBACK
+            }
+            continue
+
+        entry = {
+            "status": "shortlisted",
+            "candidate_id": r["candidate_id"],
+            "email": r["email"],
+            "name": parsed.get("name"),
+            "match_score": r["match_score"],
+            "ats_score": r["ats_score"]
+        }
+        if r["match_score"] < SHORTLIST_THRESHOLD:
+            entry["status"] = "rejected"
+            entry["feedback"] = REJECTION_FEEDBACK
+        r["result"] = entry
+
+
+def flush_process(batch, job_role_id: str, recruiter_id: str, batch_job_id: str = None):
+    # candidate inserts dedupe on file_hash, so a retried flush is already a no-op
+    scored = [r for r in batch if not r.get("error") and not r["parsed"].get("error")]
+    # known files keep their existing candidate; no second document
+    new = [r for r in scored if not r.get("candidate_id")]
+
+    docs = [
+        {
+            "parsed": r["parsed"],
+            "job_role_id": job_role_id,
+            "match_score": r["match_score"],
+            "match_components": r["match_components"],
+            "skill_gap": r["skill_gap"],
+            "ats_score": r["ats_score"],
+            "uploaded_by": recruiter_id,
+            **({"file_hash": r["file_hash"]} if r.get("file_hash") else {})
+        }
+        for r in new
+    ]
+    CandidateDB.insert_candidate_docs(docs)
+
+    for r, doc in zip(new, docs):
+        r["candidate_id"] = doc["_id"]
+    for r in scored:
+        r["result"] = {"candidate_id": r["candidate_id"], "match_score": r["match_score"]}
+    for r in batch:
+        r.setdefault("result", {
+            "candidate_id": None,
+            "match_score": 0,
+            "error": r.get("error") or r["parsed"].get("error"),
+        })
+
+
+def _failed_result(rec: dict, error: str) -> dict:
+    """Result for a record whose batch could not be written (fits both flush shapes)."""
+    return {
+        "status": "rejected",
+        "candidate_id": None,
+        "email": rec.get("email"),
+        "name": (rec.get("parsed") or {}).get("name"),
+        "match_score": 0,
+        "ats_score": 0,
+        "feedback": FAILED_FEEDBACK,
+        "error": error,
+    }
+
+
+async def _writer(queue: asyncio.Queue, job: dict, flush, on_flushed=None):
+    done = False
+    while not done:
+        batch = [await queue.get()]
+        while len(batch) < WRITE_BATCH_SIZE and not queue.empty():
+            batch.append(queue.get_nowait())
+
+        if None in batch:
+            done = True
+            batch = [r for r in batch if r is not None]
+
+        if batch:
+            error = None
+            try:
+                await asyncio.to_thread(_score_batch, batch, job)
+                await asyncio.to_thread(flush, batch)
+            except Exception as e:
+                # keep draining the queue: earlier batches are written and the
+                # rest of the request still gets its results
+                print("Resume pipeline write failed for", len(batch), "records:", e)
+                error = str(e)
+                for r in batch:
+                    if "result" not in r:
+                        r["result"] = _failed_result(r, error)
+            if on_flushed:
+                await asyncio.to_thread(on_flushed, batch, error)
+
+
+# ---------------------------------------------------------
+# Generic driver: shared by /match/shortlist_batch, process_batch
+# and the background batch jobs
+# ---------------------------------------------------------
+async def run_pipeline(sources, job: dict, flush, require_email: bool = True, max_in_flight: int = None, on_flushed=None):
+    """
+    sources: [{"key", "filename", "file" (UploadFile) or "path"}, ...]
+    flush(batch): persists scored records (runs in a thread).
+    on_flushed(batch, error): optional hook called after each flush, e.g. job
+    progress; error is None, or the message when the batch was not written.
+    Returns records in source order, each with "key" and "result".
+    """
+    if not job.get("experience_level") and job.get("parsed", {}).get("experience_level"):
+        job["experience_level"] = job["parsed"]["experience_level"]
+
+    in_flight = asyncio.Semaphore(max(1, max_in_flight or MAX_IN_FLIGHT))
+    llm_sem = asyncio.Semaphore(LLM_CONCURRENCY)
+    queue = asyncio.Queue()
+    records = [None] * len(sources)
+
+    writer = asyncio.create_task(_writer(queue, job, flush, on_flushed))
+
+    async def run(i, source):
+        async with in_flight:
+            try:
+                rec = await score_resume(source, job, llm_sem, require_email)
+            except Exception as e:
+                print("Resume pipeline failed for", source.get("filename"), ":", e)
+                rec = {"parsed": {}, "error": str(e)}
+        rec["key"] = source.get("key", i)
+        records[i] = rec
+        await queue.put(rec)
+
+    try:
+        await asyncio.gather(*(run(i, s) for i, s in enumerate(sources)))
+    finally:
+        await queue.put(None)
+        await writer
+
+    return records
+
+
+def split_shortlist(results):
+    shortlisted = []
+    rejected = []
+    for res in results:
+        entry = {k: v for k, v in res.items() if k != "status"}
+        if res.get("status") == "shortlisted":
+            shortlisted.append(entry)
+        else:
+            rejected.append(entry)
+    return shortlisted, rejected
+
+
+async def run_shortlist_pipeline(files, job: dict, job_role_id: str, recruiter_id: str, max_in_flight: int = None):
+    sources = [{"key": i, "filename": f.filename, "file": f} for i, f in enumerate(files)]
+    records = await run_pipeline(
+        sources,
+        job,
+        lambda batch: flush_shortlist(batch, job_role_id, recruiter_id),
+        max_in_flight=max_in_flight,
+    )
+    return split_shortlist([r["result"] for r in records])
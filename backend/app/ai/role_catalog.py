@@ -0,0 +1,308 @@
+import re
+import asyncio
+import difflib
+import threading
+
+from .llm_gateway import generate_json, generate_json_sync
+from .llm_json import object_schema, STRING_LIST
+from ..database.role_catalog import RoleCatalogDB
+
+ROLE_MODEL = "gemini-2.5-flash"
+ROLE_SKILLS_SCHEMA = object_schema(
+    {"required_skills": STRING_LIST, "preferred_skills": STRING_LIST},
+    required=["required_skills", "preferred_skills"],
+)
+# used when a role is unknown and the LLM call fails (never persisted)
+DEFAULT_ROLE_SKILLS = {
+    "required_skills": ["Python", "SQL", "Data Analysis", "Statistics", "Machine Learning"],
+    "preferred_skills": ["TensorFlow", "PyTorch", "Deep Learning"]
+}
+
+# Merged from the old self-analysis ROLE_SKILL_MAP and role_detector JOB_ROLES
+ROLE_CATALOG = {
+    "Data Analyst": {
+        "required_skills": ["SQL", "Excel", "Python", "Pandas", "Data Cleaning", "Data Visualization"],
+        "preferred_skills": ["Power BI", "Tableau", "Statistics", "A/B Testing", "Machine Learning"],
+        "aliases": ["bi analyst", "business intelligence analyst", "reporting analyst"],
+    },
+    "Data Scientist": {
+        "required_skills": ["Python", "Statistics", "Pandas", "NumPy", "Machine Learning", "Model Evaluation"],
+        "preferred_skills": ["TensorFlow", "PyTorch", "Deep Learning", "NLP", "MLOps"],
+        "aliases": [],
+    },
+    "Machine Learning Engineer": {
+        "required_skills": [
+            "Python", "Machine Learning", "TensorFlow", "PyTorch", "Model Deployment",
+            "Deep Learning", "Scikit-learn", "Data Preprocessing"
+        ],
+        "preferred_skills": ["Docker", "FastAPI", "AWS", "MLOps", "Data Engineering", "NLP", "Computer Vision"],
+        "aliases": ["mlops engineer"],
+    },
+    "AI Engineer": {
+        "required_skills": ["Python", "Deep Learning", "TensorFlow", "PyTorch", "Computer Vision", "NLP"],
+        "preferred_skills": ["Transformers", "Reinforcement Learning", "HuggingFace", "MLOps"],
+        "aliases": ["deep learning engineer", "nlp engineer", "computer vision engineer"],
+    },
+    "Frontend Developer": {
+        "required_skills": ["HTML", "CSS", "JavaScript", "React", "Responsive Design"],
+        "preferred_skills": ["TypeScript", "Redux", "TailwindCSS", "Figma", "Next.js", "UI Libraries"],
+        "aliases": ["react developer", "ui developer", "web designer"],
+    },
+    "Backend Developer": {
+        "required_skills": ["Python", "Node.js", "REST APIs", "Databases", "Authentication", "API Development"],
+        "preferred_skills": ["FastAPI", "Express.js", "Docker", "Redis", "Microservices", "CI/CD", "Cloud Deployment"],
+        "aliases": ["api developer", "server side developer", "python developer", "node developer"],
+    },
+    "Full Stack Developer": {
+        "required_skills": ["HTML", "CSS", "JavaScript", "React", "Node.js", "Python", "API Development"],
+        "preferred_skills": ["MongoDB", "SQL", "Express", "Docker", "CI/CD", "Cloud Services", "Testing"],
+        "aliases": ["web developer", "mern developer", "mean developer"],
+    },
+    "Software Engineer": {
+        "required_skills": ["Data Structures", "Algorithms", "Problem Solving", "Python", "Java"],
+        "preferred_skills": ["System Design", "Databases", "OOP", "Version Control"],
+        "aliases": ["sde", "swe", "software developer", "java developer"],
+    },
+    "Mobile App Developer": {
+        "required_skills": ["Flutter", "Dart", "React Native", "UI/UX", "API Integration", "Android", "iOS"],
+        "preferred_skills": ["Firebase", "State Management", "Android/iOS Deployment", "Push Notifications"],
+        "aliases": ["android developer", "ios developer", "flutter developer", "react native developer"],
+    },
+    "DevOps Engineer": {
+        "required_skills": ["Linux", "Git", "CI/CD", "Docker", "Kubernetes", "GitHub Actions"],
+        "preferred_skills": ["Terraform", "AWS", "Monitoring", "Cloud Networking"],
+        "aliases": ["sre", "site reliability engineer", "platform engineer", "build engineer"],
+    },
+    "Cloud Engineer": {
+        "required_skills": ["AWS", "Azure", "GCP", "Linux", "Networking", "Cloud Architecture"],
+        "preferred_skills": ["Terraform", "DevOps", "Kubernetes", "Serverless", "Containers", "Load Balancing"],
+        "aliases": ["cloud architect", "aws engineer", "azure engineer"],
+    },
+    "Cybersecurity Analyst": {
+        "required_skills": ["Networking", "Linux", "Security Fundamentals", "Vulnerability Analysis"],
+        "preferred_skills": ["SIEM Tools", "Penetration Testing", "Cloud Security"],
+        "aliases": ["security analyst", "security engineer", "soc analyst", "penetration tester"],
+    },
+    "Product Manager": {
+        "required_skills": ["Communication", "User Research", "Roadmapping", "Analytics"],
+        "preferred_skills": ["SQL", "A/B Testing", "Project Management", "Figma"],
+        "aliases": ["product owner", "pm"],
+    },
+    "UI/UX Designer": {
+        "required_skills": ["Figma", "Wireframing", "Prototyping", "User Research"],
+        "preferred_skills": ["Design Systems", "User Testing", "Front-end Basics", "Illustration", "Brand Design"],
+        "aliases": ["ui designer", "ux designer", "product designer", "interaction designer"],
+    },
+    "Business Analyst": {
+        "required_skills": ["Excel", "SQL", "Requirement Gathering", "Documentation"],
+        "preferred_skills": ["Power BI", "Dashboards", "Process Automation"],
+        "aliases": [],
+    },
+    "Software Test Engineer": {
+        "required_skills": ["Manual Testing", "Automation Testing", "Selenium"],
+        "preferred_skills": ["API Testing", "Performance Testing"],
+        "aliases": ["qa engineer", "qa analyst", "test engineer", "sdet", "automation tester"],
+    },
+}
+
+# ---------------------------------------------------------
+# Role name normalization
+# ---------------------------------------------------------
+# seniority / employment words that do not change the skill set
+_NOISE = {
+    "sr", "senior", "jr", "junior", "lead", "principal", "staff", "chief", "head", "associate",
+    "intern", "internship", "trainee", "fresher", "graduate", "entry", "level", "mid",
+    "i", "ii", "iii", "iv", "1", "2", "3", "remote", "contract", "freelance", "the", "a", "an", "of",
+}
+# spelling variants folded into one token; engineer / developer count as the same role
+_TOKEN_ALIASES = {
+    "engineer": "developer", "engg": "developer", "dev": "developer", "programmer": "developer",
+    "fullstack": "full stack", "ml": "machine learning",
+    "js": "javascript", "reactjs": "react", "nodejs": "node",
+}
+_PHRASES = (
+    (r"\bback[\s-]+end\b", "backend"),
+    (r"\bfront[\s-]+end\b", "frontend"),
+    (r"\bfull[\s-]*stack\b", "full stack"),
+    (r"\bdev[\s-]*ops\b", "devops"),
+    (r"\bmachine[\s-]+learning\b", "machine learning"),
+    (r"\bartificial intelligence\b", "ai"),
+    (r"\bcyber[\s-]+security\b", "cybersecurity"),
+)
+
+
+def normalize_role(name: str) -> str:
+    """'Sr. Back-End Engineer II' -> 'backend developer'."""
+    text = (name or "").lower()
+    for pattern, repl in _PHRASES:
+        text = re.sub(pattern, repl, text)
+    tokens = []
+    for tok in re.split(r"[^a-z0-9+#]+", text):
+        if not tok or tok in _NOISE:
+            continue
+        tokens.extend(_TOKEN_ALIASES.get(tok, tok).split())
+    return " ".join(tokens)
+
+
+# ---------------------------------------------------------
+# In-process index over the static catalog plus persisted roles
+# ---------------------------------------------------------
+_lock = threading.Lock()
+_roles = {}      # normalized key -> {"title", "required_skills", "preferred_skills"}
+_aliases = {}    # normalized alias -> normalized key
+_loaded = False
+
+
+def _add(key: str, title: str, required: list, preferred: list):
+    _roles[key] = {"title": title, "required_skills": list(required), "preferred_skills": list(preferred)}
+
+
+def _ensure_loaded():
+    global _loaded
+    if _loaded:
+        return
+    with _lock:
+        if _loaded:
+            return
+        for title, entry in ROLE_CATALOG.items():
+            key = normalize_role(title)
+            _add(key, title, entry["required_skills"], entry["preferred_skills"])
+            for alias in entry.get("aliases", []):
+                _aliases[normalize_role(alias)] = key
+        try:
+            for doc in RoleCatalogDB.list_all():
+                # the static catalog wins over anything learned
+                if doc["_id"] not in _roles:
+                    _add(doc["_id"], doc.get("title") or doc["_id"], doc.get("required_skills", []),
+                         doc.get("preferred_skills", []))
+        except Exception as e:
+            print("Role catalog load failed:", e)
+        _loaded = True
+
+
+def match_role_key(name: str):
+    """
+    Local lookup, no network: exact normalized name, alias, then the
+    catalog role whose tokens are all in the name (most specific wins),
+    then a one-word misspelling.
+    """
+    _ensure_loaded()
+    key = normalize_role(name)
+    if not key:
+        return None
+    if key in _roles:
+        return key
+    if key in _aliases:
+        return _aliases[key]
+
+    tokens = set(key.split())
+    best, best_size = None, 0
+    for candidate in list(_roles) + list(_aliases):
+        ctoks = set(candidate.split())
+        if ctoks <= tokens and len(ctoks) > best_size:
+            best, best_size = candidate, len(ctoks)
+    # a lone "developer" / "analyst" says nothing about the role
+    if best and best_size > 1:
+        return _aliases.get(best, best)
+
+    # one misspelt word: "frontned developer"
+    words = key.split()
+    for candidate in list(_roles) + list(_aliases):
+        cwords = candidate.split()
+        if len(cwords) != len(words):
+            continue
+        diff = [(a, b) for a, b in zip(words, cwords) if a != b]
+        if len(diff) == 1 and len(diff[0][1]) >= 5 and \
+                difflib.SequenceMatcher(None, *diff[0]).ratio() >= 0.8:
+            return _aliases.get(candidate, candidate)
+    return None
+
+
+def role_titles() -> list:
+    return list(ROLE_CATALOG)
+
+
+def match_role(name: str):
+    """Catalog title for name, or None."""
+    key = match_role_key(name)
+    return _roles[key]["title"] if key else None
+
+
+def known_role_skills(name: str):
+    """{"required_skills", "preferred_skills"} from the catalog, or None; never calls the LLM."""
+    key = match_role_key(name)
+    if key is None:
+        return None
+    role = _roles[key]
+    return {"required_skills": list(role["required_skills"]), "preferred_skills": list(role["preferred_skills"])}
+
+
+def remember_role(name: str, skills: dict):
+    """Persist LLM-produced skills for a role the catalog does not know yet."""
+    key = normalize_role(name)
+    required = list((skills or {}).get("required_skills") or [])
+    if not key or not required or match_role_key(name):
+        return
+    preferred = list(skills.get("preferred_skills") or [])
+    title = (name or "").strip()
+    with _lock:
+        _add(key, title, required, preferred)
+    try:
+        RoleCatalogDB.put(key, title, required, preferred)
+    except Exception as e:
+        print("Role catalog write failed:", e)
+
+
+def _role_skills_prompt(name: str) -> str:
+    return f"""
+    Predict HARD SKILLS required for the job role: "{name}"
+
+    Return STRICT JSON ONLY:
+    {{
+        "required_skills": [...],
+        "preferred_skills": [...]
+    }}
+
+    Rules:
+    - At least 5 required skills
+    - At least 3 preferred skills
+    - HARD SKILLS ONLY (technical skills)
+    """
+
+
+def _learned_skills(name: str, skills: dict) -> dict:
+    remember_role(name, skills)
+    return {
+        "required_skills": skills.get("required_skills", []),
+        "preferred_skills": skills.get("preferred_skills", []),
+    }
+
+
+def skills_for_role(name: str) -> dict:
+    """Catalog skills for name; an unseen role is asked of the LLM once and persisted."""
+    skills = known_role_skills(name)
+    if skills is not None:
+        return skills
+
+    try:
+        skills = generate_json_sync(
+            _role_skills_prompt(name), ROLE_MODEL, schema=ROLE_SKILLS_SCHEMA, site="skills_from_role"
+        )
+    except Exception:
+        return dict(DEFAULT_ROLE_SKILLS)
+    return _learned_skills(name, skills)
+
+
+async def skills_for_role_async(name: str) -> dict:
+    """skills_for_role for async callers: awaits the gateway; catalog reads and writes run in a thread."""
+    skills = await asyncio.to_thread(known_role_skills, name)
+    if skills is not None:
+        return skills
+
+    try:
+        skills = await generate_json(
+            _role_skills_prompt(name), ROLE_MODEL, schema=ROLE_SKILLS_SCHEMA, site="skills_from_role"
+        )
+    except Exception:
+        return dict(DEFAULT_ROLE_SKILLS)
+    return await asyncio.to_thread(_learned_skills, name, skills)
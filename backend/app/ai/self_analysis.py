@@ -1,174 +1,142 @@
-import json
-import google.generativeai as genai
+import asyncio
 from datetime import datetime
-import os
-from dotenv import load_dotenv
 
 from .ats_scoring import compute_ats_score
-from .match_score import compute_match_score
+from .match_score import compute_match_score_async, deterministic_score
 from .skill_gap import get_skill_gap
-from .feedback import generate_feedback
+from .feedback import generate_feedback_async
+from .llm_gateway import generate_text
+from .fused_analysis import analyze_self
+from .jd_parser import parse_jd_text_async, cached_jd
+from .role_catalog import DEFAULT_ROLE_SKILLS, known_role_skills, skills_for_role_async, remember_role
+from .fanout import Timings, run_branch
+from .prompt_builder import fit_prompt
 from ..database.candidate import CandidateDB
 
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-
-ROLE_SKILL_MAP = {
-    "data analyst": {
-        "required": ["SQL", "Excel", "Python", "Pandas", "Data Cleaning", "Data Visualization"],
-        "preferred": ["Power BI", "Tableau", "Statistics", "A/B Testing", "Machine Learning"]
-    },
-    "data scientist": {
-        "required": ["Python", "Statistics", "Pandas", "NumPy", "Machine Learning", "Model Evaluation"],
-        "preferred": ["TensorFlow", "PyTorch", "Deep Learning", "NLP", "MLOps"]
-    },
-    "machine learning engineer": {
-        "required": ["Python", "Machine Learning", "TensorFlow", "PyTorch", "Model Deployment"],
-        "preferred": ["Docker", "FastAPI", "AWS", "MLOps", "Data Engineering"]
-    },
-    "ai engineer": {
-        "required": ["Python", "Deep Learning", "TensorFlow", "PyTorch", "Computer Vision", "NLP"],
-        "preferred": ["Transformers", "Reinforcement Learning", "HuggingFace", "MLOps"]
-    },
-    "frontend developer": {
-        "required": ["HTML", "CSS", "JavaScript", "React", "Responsive Design"],
-        "preferred": ["TypeScript", "Redux", "TailwindCSS", "Figma", "Next.js"]
-    },
-    "backend developer": {
-        "required": ["Python", "Node.js", "REST APIs", "Databases", "Authentication"],
-        "preferred": ["FastAPI", "Express.js", "Docker", "Redis", "Microservices"]
-    },
-    "full stack developer": {
-        "required": ["HTML", "CSS", "JavaScript", "React", "Node.js"],
-        "preferred": ["MongoDB", "SQL", "Express", "Docker", "CI/CD"]
-    },
-    "software engineer": {
-        "required": ["Data Structures", "Algorithms", "Problem Solving", "Python", "Java"],
-        "preferred": ["System Design", "Databases", "OOP", "Version Control"]
-    },
-    "mobile app developer": {
-        "required": ["Flutter", "Dart", "React Native", "UI/UX", "API Integration"],
-        "preferred": ["Firebase", "State Management", "Android/iOS Deployment"]
-    },
-    "devops engineer": {
-        "required": ["Linux", "Git", "CI/CD", "Docker", "Kubernetes"],
-        "preferred": ["Terraform", "AWS", "Monitoring", "Cloud Networking"]
-    },
-    "cloud engineer": {
-        "required": ["AWS", "Azure", "GCP", "Linux", "Networking"],
-        "preferred": ["Terraform", "DevOps", "Kubernetes", "Serverless"]
-    },
-    "cybersecurity analyst": {
-        "required": ["Networking", "Linux", "Security Fundamentals", "Vulnerability Analysis"],
-        "preferred": ["SIEM Tools", "Penetration Testing", "Cloud Security"]
-    },
-    "product manager": {
-        "required": ["Communication", "User Research", "Roadmapping", "Analytics"],
-        "preferred": ["SQL", "A/B Testing", "Project Management", "Figma"]
-    },
-    "ui ux designer": {
-        "required": ["Figma", "Wireframing", "Prototyping", "User Research"],
-        "preferred": ["Design Systems", "User Testing", "Front-end Basics"]
-    },
-    "business analyst": {
-        "required": ["Excel", "SQL", "Requirement Gathering", "Documentation"],
-        "preferred": ["Power BI", "Dashboards", "Process Automation"]
-    }
+SKILLS_MODEL = "gemini-2.5-flash"
+# used when skill extraction fails or times out
+DEFAULT_JD_SKILLS = {
+    "required_skills": ["Python", "Pandas", "NumPy", "SQL", "Machine Learning"],
+    "preferred_skills": ["TensorFlow", "PyTorch", "Statistics", "Data Visualization"]
 }
 
-def extract_skills_from_jd(jd_text: str):
-    prompt = f"""
-    You are an ATS and HR skill extraction engine.
 
-    Extract HARD SKILLS ONLY from this Job Description:
+async def extract_skills_from_jd(jd_text: str):
+    # served from the shared JD parse store, so a JD already parsed for a
+    # recruiter (or another candidate) costs no LLM call
+    try:
+        parsed = await parse_jd_text_async(jd_text)
+    except Exception:
+        return dict(DEFAULT_JD_SKILLS)
+    if not parsed.get("required_skills"):
+        return dict(DEFAULT_JD_SKILLS)
+    return {
+        "required_skills": parsed["required_skills"],
+        "preferred_skills": parsed.get("preferred_skills", []),
+    }
+
 
-    {jd_text}
+def _cached_jd_skills(jd_text: str):
+    parsed = cached_jd(jd_text)
+    if not parsed or not parsed.get("required_skills"):
+        return None
+    return {"required_skills": parsed["required_skills"], "preferred_skills": parsed.get("preferred_skills", [])}
 
-    Return STRICT JSON ONLY in this format:
-    {{
-        "required_skills": ["skill1", "skill2"],
-        "preferred_skills": ["skill3", "skill4"]
-    }}
+async def extract_skills_from_role(role_name: str):
+    # local catalog lookup first; only unseen roles reach the LLM, once
+    return await skills_for_role_async(role_name)
 
-    Rules:
-    - Return at least 5 required skills
-    - Skills MUST be actual technical skills, not soft skills
-    - Avoid generic words like 'good', 'experience', 'knowledge'
-    """
+async def auto_detect_role(resume_text: str):
+    def render(resume_text):
+        return f"""
+    Based on this resume text, identify the most suitable job role (2–4 words max):
 
-    model = genai.GenerativeModel("gemini-2.5-flash")
+    {resume_text}
+
+    Return ONLY the role name, e.g. "Data Scientist" or "Frontend Developer".
+    """
+    prompt = fit_prompt("detect_role", render, {"resume_text": resume_text})
 
     try:
-        response = model.generate_content(prompt)
-        text = response.text.strip()
-        start = text.find("{")
-        end = text.rfind("}")
-        if start != -1 and end != -1:
-            return json.loads(text[start:end + 1])
-        raise ValueError("Invalid JSON returned")
+        return await generate_text(prompt, SKILLS_MODEL)
     except Exception:
-        return {
-            "required_skills": ["Python", "Pandas", "NumPy", "SQL", "Machine Learning"],
-            "preferred_skills": ["TensorFlow", "PyTorch", "Statistics", "Data Visualization"]
-        }
+        return "General Profile"
 
-def extract_skills_from_role(role_name: str):
-    role_name = role_name.lower().strip()
 
-    if role_name in ROLE_SKILL_MAP:
-        return {
-            "required_skills": ROLE_SKILL_MAP[role_name]["required"],
-            "preferred_skills": ROLE_SKILL_MAP[role_name]["preferred"]
-        }
+async def _analyze_multi(parsed: dict, resume_text: str, jd_text: str = None,
+                         target_role: str = None, timings: Timings = None):
+    """
+    One LLM call per step, run as a small task graph: role detection and JD
+    skill extraction in parallel, then match scoring and feedback in
+    parallel. Each branch has its own timeout and fallback.
+    """
+    timings = timings or Timings()
 
-    prompt = f"""
-    Predict HARD SKILLS required for the job role: "{role_name}"
+    async def detect_role():
+        if target_role:
+            return target_role
+        return await run_branch(timings, "detect_role", auto_detect_role(resume_text), fallback="General Profile")
 
-    Return STRICT JSON ONLY:
-    {{
-        "required_skills": [...],
-        "preferred_skills": [...]
-    }}
+    role_task = asyncio.create_task(detect_role())
+    if jd_text:
+        skill_info = await run_branch(
+            timings, "skills", extract_skills_from_jd(jd_text), fallback=lambda: dict(DEFAULT_JD_SKILLS)
+        )
+        detected_role = await role_task
+    else:
+        detected_role = await role_task
+        skill_info = await run_branch(
+            timings, "skills", extract_skills_from_role(detected_role.lower()),
+            fallback=lambda: dict(DEFAULT_ROLE_SKILLS),
+        )
 
-    Rules:
-    - At least 5 required skills
-    - At least 3 preferred skills
-    - HARD SKILLS ONLY (technical skills)
-    """
+    candidate_obj = {
+        "skills": parsed.get("skills", []),
+        "projects": parsed.get("projects", []),
+        "experience_years": parsed.get("experience_years", 0),
+        "parsed_text": parsed.get("raw_text", ""),
+    }
 
-    model = genai.GenerativeModel("gemini-2.5-flash")
-    try:
-        response = model.generate_content(prompt)
-        text = response.text.strip()
-        start = text.find("{")
-        end = text.rfind("}")
-        if start != -1 and end != -1:
-            return json.loads(text[start:end + 1])
-        raise ValueError("Invalid JSON returned")
-    except Exception:
-        return {
-            "required_skills": ["Python", "SQL", "Data Analysis", "Statistics", "Machine Learning"],
-            "preferred_skills": ["TensorFlow", "PyTorch", "Deep Learning"]
+    job_role_obj = {
+        "title": detected_role,
+        "required_skills": skill_info.get("required_skills", []),
+        "preferred_skills": skill_info.get("preferred_skills", []),
+        "responsibilities": [],      
+        "experience_level": None,    
+        "parsed": {
+            "raw_text": jd_text or ""   
         }
+    }
 
-def auto_detect_role(resume_text: str):
-    prompt = f"""
-    Based on this resume text, identify the most suitable job role (2–4 words max):
+    def feedback_unavailable(reason="AI feedback timed out."):
+        return {
+            "summary": "AI feedback unavailable.",
+            "recommendations": [reason],
+        }
 
-    {resume_text}
+    async def feedback():
+        try:
+            return await generate_feedback_async(parsed, skill_info)
+        except Exception as e:
+            return feedback_unavailable(str(e))
 
-    Return ONLY the role name, e.g. "Data Scientist" or "Frontend Developer".
-    """
+    match_result, feedback_result = await asyncio.gather(
+        run_branch(
+            timings, "match_score", compute_match_score_async(candidate_obj, job_role_obj),
+            fallback=lambda: deterministic_score(candidate_obj, job_role_obj),
+        ),
+        run_branch(timings, "feedback", feedback(), fallback=feedback_unavailable),
+    )
 
-    try:
-        model = genai.GenerativeModel("gemini-2.5-flash")
-        response = model.generate_content(prompt)
-        return response.text.strip()
-    except Exception:
-        return "General Profile"
+    return {
+        "detected_role": detected_role,
+        "skill_info": skill_info,
+        "match": match_result,
+        "feedback": feedback_result,
+    }
 
 
-def run_self_analysis(user_id: str, jd_text: str = None, target_role: str = None):
+async def run_self_analysis(user_id: str, jd_text: str = None, target_role: str = None, mode: str = "multi"):
     candidate = CandidateDB.find_by_user_id(user_id)
     if not candidate:
         return {"error": "Candidate profile not found. Please complete signup."}
@@ -190,51 +158,37 @@ def run_self_analysis(user_id: str, jd_text: str = None, target_role: str = None
 
     candidate_skills = parsed.get("skills", [])
 
-    if jd_text:
-        skill_info = extract_skills_from_jd(jd_text)
-        detected_role = target_role or auto_detect_role(resume_text)
-    elif target_role:
-        skill_info = extract_skills_from_role(target_role)
-        detected_role = target_role
-    else:
-        detected_role = auto_detect_role(resume_text)
-        skill_info = extract_skills_from_role(detected_role.lower())
-
+    timings = Timings()
+    analysis = None
+    if mode == "fused":
+        role_skills = _cached_jd_skills(jd_text) if jd_text else known_role_skills(target_role)
+        analysis = await run_branch(
+            timings,
+            "fused_analysis",
+            analyze_self(
+                resume_text,
+                parsed,
+                jd_text=jd_text,
+                target_role=target_role,
+                role_skills=role_skills,
+                candidate_id=candidate.get("_id"),
+            ),
+        )
+        if analysis is None:
+            mode = "multi"
+        elif not jd_text and role_skills is None:
+            # the fused call produced skills for a role the catalog lacks
+            await asyncio.to_thread(remember_role, analysis["detected_role"], analysis["skill_info"])
+    if analysis is None:
+        analysis = await _analyze_multi(parsed, resume_text, jd_text, target_role, timings)
+
+    skill_info = analysis["skill_info"]
     required = skill_info.get("required_skills", [])
-    preferred = skill_info.get("preferred_skills", [])
 
     ats_score = compute_ats_score(resume_text, required)
-    candidate_obj = {
-        "skills": candidate_skills,
-        "projects": parsed.get("projects", []),
-        "experience_years": parsed.get("experience_years", 0),
-        "parsed_text": parsed.get("raw_text", ""),
-    }
-
-    job_role_obj = {
-        "title": detected_role,
-        "required_skills": required,
-        "preferred_skills": preferred,
-        "responsibilities": [],      
-        "experience_level": None,    
-        "parsed": {
-            "raw_text": jd_text or ""   
-        }
-    }
-
-    match_result = compute_match_score(candidate_obj, job_role_obj)
-    match_score = match_result["score"]
-
+    match_score = analysis["match"]["score"]
     skill_gap = get_skill_gap(candidate_skills, required)
 
-    try:
-        feedback = generate_feedback(parsed, skill_info)
-    except Exception as e:
-        feedback = {
-            "summary": "AI feedback unavailable.",
-            "recommendations": [str(e)],
-        }
-
     learning_path = {
         "next_steps": [f"Learn: {skill}" for skill in skill_gap]
     }
@@ -244,8 +198,10 @@ def run_self_analysis(user_id: str, jd_text: str = None, target_role: str = None
         "ats_score": ats_score,
         "match_score": match_score,
         "skill_gap": skill_gap,
-        "feedback": feedback,
+        "feedback": analysis["feedback"],
         "learning_path": learning_path,
-        "auto_detected_role": detected_role,
+        "auto_detected_role": analysis["detected_role"],
+        "analysis_mode": mode,
+        "latency_ms": timings.report(),
         "timestamp": datetime.utcnow().isoformat(),
-    }
\ No newline at end of file
+    }
@@ -1,40 +1,40 @@
-import json
-import datetime
-import google.generativeai as genai
-import os
-
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+from .llm_gateway import generate_json, generate_json_sync
+from .llm_json import object_schema, STRING, NUMBER, STRING_LIST
+from .prompt_builder import fit_prompt, project, compact
 
 MODEL = "gemini-2.5-pro"
-
-
-def _json_safe(obj):
-    if isinstance(obj, datetime.datetime):
-        return obj.isoformat()
-
-    if isinstance(obj, list):
-        return [_json_safe(x) for x in obj]
-
-    if isinstance(obj, dict):
-        return {k: _json_safe(v) for k, v in obj.items()}
-
-    return obj
-
-
-def explain_semantic_fit(candidate, job_role):
-    candidate_json = json.dumps(_json_safe(candidate), indent=2)
-    job_json = json.dumps(_json_safe(job_role), indent=2)
-
-    prompt = f"""
+CANDIDATE_FIELDS = ("name", "skills", "projects", "experience_years", "education")
+JOB_FIELDS = (
+    "title", "job_title", "role_summary", "required_skills", "preferred_skills",
+    "responsibilities", "experience_level", "seniority", "tech_stack",
+)
+SEMANTIC_SCHEMA = object_schema(
+    {"fit_summary": STRING, "strengths": STRING_LIST, "weaknesses": STRING_LIST, "reasoning_score": NUMBER},
+    required=["fit_summary", "strengths", "weaknesses", "reasoning_score"],
+)
+
+
+def _semantic_prompt(candidate, job_role):
+    job_parsed = job_role.get("parsed") if isinstance(job_role.get("parsed"), dict) else {}
+    cand = project(candidate, CANDIDATE_FIELDS)
+    job = project({**job_parsed, **job_role}, JOB_FIELDS)
+    candidate_json, job_json = compact(cand), compact(job)
+
+    def render(resume_text, jd_text):
+        return f"""
 You are an expert hiring evaluator.
 
 Provide a semantic explanation of candidate-to-job fit.
 
 Candidate:
 {candidate_json}
+Resume excerpt:
+{resume_text}
 
 Job Role:
 {job_json}
+Job description excerpt:
+{jd_text}
 
 Return STRICT JSON ONLY:
 {{
@@ -45,18 +45,38 @@ Return STRICT JSON ONLY:
 }}
 """
 
+    return fit_prompt(
+        "semantic_fit",
+        render,
+        {
+            "resume_text": candidate.get("parsed_text") or candidate.get("raw_text") or "",
+            "jd_text": job_role.get("raw_text") or job_parsed.get("raw_text") or "",
+        },
+        parts=(candidate_json, job_json),
+        baseline=(candidate, job_role),
+    )
+
+
+def _failed(e):
+    return {
+        "fit_summary": "Semantic analysis failed.",
+        "strengths": [],
+        "weaknesses": [str(e)],
+        "reasoning_score": 0
+    }
+
+
+def explain_semantic_fit(candidate, job_role):
     try:
-        model = genai.GenerativeModel(MODEL)
-        resp = model.generate_content(prompt)
-        txt = resp.text.strip()
+        return generate_json_sync(_semantic_prompt(candidate, job_role), MODEL, schema=SEMANTIC_SCHEMA, site="semantic_fit")
 
-        s, e = txt.find("{"), txt.rfind("}")
-        return json.loads(txt[s:e+1])
+    except Exception as e:
+        return _failed(e)
+
+
+async def explain_semantic_fit_async(candidate, job_role):
+    try:
+        return await generate_json(_semantic_prompt(candidate, job_role), MODEL, schema=SEMANTIC_SCHEMA, site="semantic_fit")
 
     except Exception as e:
-        return {
-            "fit_summary": "Semantic analysis failed.",
-            "strengths": [],
-            "weaknesses": [str(e)],
-            "reasoning_score": 0
-        }
\ No newline at end of file
+        return _failed(e)
\ No newline at end of file
@@ -0,0 +1,116 @@
+import os
+import hashlib
+import tempfile
+from contextlib import asynccontextmanager, AsyncExitStack
+
+from fastapi import HTTPException
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "20")) * 1024 * 1024
+CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_KB", "1024")) * 1024
+
+
+class UploadTooLarge(HTTPException):
+    def __init__(self, filename: str, max_bytes: int):
+        super().__init__(
+            status_code=413,
+            detail=f"{filename or 'Upload'} exceeds the {max_bytes // (1024 * 1024)} MB limit."
+        )
+
+
+class SpooledUpload:
+    """An upload copied to disk (path) or held in memory (data)."""
+
+    def __init__(self, path: str, file_hash: str, size: int, filename: str = None, data: bytes = None):
+        self.path = path
+        self.file_hash = file_hash
+        self.size = size
+        self.filename = filename
+        self.data = data
+
+    @property
+    def source(self):
+        """What extract_text / parse_resume take: the bytes or the path."""
+        return self.data if self.data is not None else self.path
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except Exception:
+        pass
+
+
+async def spool_upload(file, suffix: str = None, path: str = None, max_bytes: int = None) -> SpooledUpload:
+    """
+    Copy an UploadFile to disk chunk by chunk, hashing (SHA-256) on the way.
+    Writes to `path` if given, else a new temp file named with `suffix`
+    (default: the upload's extension). The caller owns the returned path;
+    on any failure the partial file is removed.
+    """
+    max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    if suffix is None:
+        suffix = os.path.splitext(getattr(file, "filename", None) or "")[1]
+
+    if path:
+        out = open(path, "wb")
+    else:
+        out = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+        path = out.name
+
+    h = hashlib.sha256()
+    size = 0
+    try:
+        with out:
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise UploadTooLarge(getattr(file, "filename", None), max_bytes)
+                h.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        _remove(path)
+        raise
+
+    return SpooledUpload(path, h.hexdigest(), size, getattr(file, "filename", None))
+
+
+async def read_upload(file, max_bytes: int = None) -> SpooledUpload:
+    """
+    Read an UploadFile into memory with the same chunked hashing and size
+    limit as spool_upload, for handlers that extract text straight away.
+    """
+    max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    h = hashlib.sha256()
+    buf = bytearray()
+    while True:
+        chunk = await file.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        if max_bytes and len(buf) + len(chunk) > max_bytes:
+            raise UploadTooLarge(getattr(file, "filename", None), max_bytes)
+        h.update(chunk)
+        buf += chunk
+    return SpooledUpload(None, h.hexdigest(), len(buf), getattr(file, "filename", None), bytes(buf))
+
+
+@asynccontextmanager
+async def spooled(file, suffix: str = None, max_bytes: int = None):
+    """async with spooled(upload) as up: ... (temp file removed on exit)"""
+    up = await spool_upload(file, suffix=suffix, max_bytes=max_bytes)
+    try:
+        yield up
+    finally:
+        _remove(up.path)
+
+
+@asynccontextmanager
+async def spooled_many(files, suffix: str = None, max_bytes: int = None):
+    """Spool several uploads one after another; all are removed on exit."""
+    async with AsyncExitStack() as stack:
+        ups = []
+        for f in files:
+            ups.append(await stack.enter_async_context(spooled(f, suffix=suffix, max_bytes=max_bytes)))
+        yield ups
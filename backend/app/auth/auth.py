@@ -20,6 +20,7 @@ from ..database.user import (
     get_user_by_email,
     get_user_by_id,
     link_user_to_profile,
+    USER_PUBLIC_PROJECTION,
 )
 from ..database.candidate import CandidateDB
 from ..database.recruiter import RecruiterDB
@@ -85,7 +86,8 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise cred_exc
 
-    user = get_user_by_id(user_id)
+    # every route gets this doc (and /me returns it): no password hash or code
+    user = get_user_by_id(user_id, USER_PUBLIC_PROJECTION)
     if not user:
         raise cred_exc
 
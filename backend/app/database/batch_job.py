@@ -0,0 +1,203 @@
+# app/database/batch_job.py
+
+from .connection import db
+from .indexes import declare_index, declare_query
+from bson.objectid import ObjectId
+from pymongo import ReturnDocument
+import datetime
+import uuid
+
+batch_jobs_col = db.batch_jobs
+
+declare_index("batch_jobs", "status")
+declare_query("batch_jobs.unfinished", "batch_jobs", {"status": {"$in": ["queued", "running"]}})
+
+
+class BatchJobDB:
+
+    # -----------------------------------------------------
+    # Create job (files: [{"index", "filename", "path", "file_hash"}, ...])
+    # -----------------------------------------------------
+    @staticmethod
+    def create(kind: str, job_role_id: str, recruiter_id: str, files: list, spool_dir: str, max_in_flight: int = None):
+        now = datetime.datetime.utcnow()
+        doc = {
+            "kind": kind,                 # "shortlist" or "process"
+            "job_role_id": job_role_id,
+            "recruiter_id": recruiter_id,
+            "max_in_flight": max_in_flight,
+            "status": "queued",           # queued → running → completed / failed
+            "spool_dir": spool_dir,
+            "files": [
+                {**f, "status": "pending", "result": None}
+                for f in files
+            ],
+            "total": len(files),
+            "done": 0,
+            "lease_expires_at": None,
+            "lease_owner": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        res = batch_jobs_col.insert_one(doc)
+        doc["_id"] = str(res.inserted_id)
+        return doc
+
+    # -----------------------------------------------------
+    # Get job (optionally without per-file results)
+    # -----------------------------------------------------
+    @staticmethod
+    def get(job_id: str, with_results: bool = True):
+        projection = None if with_results else {"files.result": 0, "files.path": 0}
+        try:
+            job = batch_jobs_col.find_one({"_id": ObjectId(job_id)}, projection)
+        except Exception:
+            return None
+        if not job:
+            return None
+        job["_id"] = str(job["_id"])
+        return job
+
+    # -----------------------------------------------------
+    # Per-file results, only for the given indexes
+    # -----------------------------------------------------
+    @staticmethod
+    def results(job_id: str, indexes: list) -> dict:
+        """{index: result} for finished files among indexes."""
+        if not indexes:
+            return {}
+        rows = batch_jobs_col.aggregate([
+            {"$match": {"_id": ObjectId(job_id)}},
+            {"$project": {"files": {"$filter": {
+                "input": "$files", "as": "f", "cond": {"$in": ["$$f.index", list(indexes)]}
+            }}}},
+        ])
+        out = {}
+        for job in rows:
+            for f in job.get("files") or []:
+                out[f["index"]] = f.get("result")
+        return out
+
+    # -----------------------------------------------------
+    # Claim a job for this worker (lease guards double-runs
+    # when several app processes resume jobs at startup).
+    # The returned job carries lease_owner; writes pass it back.
+    # -----------------------------------------------------
+    @staticmethod
+    def claim(job_id: str, lease_seconds: int):
+        now = datetime.datetime.utcnow()
+        owner = uuid.uuid4().hex
+        job = batch_jobs_col.find_one_and_update(
+            {
+                "_id": ObjectId(job_id),
+                "status": {"$in": ["queued", "running"]},
+                "$or": [
+                    {"lease_expires_at": None},
+                    {"lease_expires_at": {"$lt": now}},
+                ],
+            },
+            {"$set": {
+                "status": "running",
+                "lease_expires_at": now + datetime.timedelta(seconds=lease_seconds),
+                "lease_owner": owner,
+                "updated_at": now,
+            }},
+            return_document=ReturnDocument.AFTER,
+        )
+        if not job:
+            return None
+        job["_id"] = str(job["_id"])
+        return job
+
+    # -----------------------------------------------------
+    # Extend the lease; False once another worker owns the job
+    # -----------------------------------------------------
+    @staticmethod
+    def renew_lease(job_id: str, owner: str, lease_seconds: int) -> bool:
+        now = datetime.datetime.utcnow()
+        res = batch_jobs_col.update_one(
+            {"_id": ObjectId(job_id), "lease_owner": owner},
+            {"$set": {"lease_expires_at": now + datetime.timedelta(seconds=lease_seconds), "updated_at": now}}
+        )
+        return res.matched_count == 1
+
+    # -----------------------------------------------------
+    # Record finished files (results: [(index, result_dict)]);
+    # False (nothing written) once another worker owns the job
+    # -----------------------------------------------------
+    @staticmethod
+    def mark_files_done(job_id: str, results: list, lease_seconds: int, owner: str) -> bool:
+        now = datetime.datetime.utcnow()
+        updates = {
+            "updated_at": now,
+            "lease_expires_at": now + datetime.timedelta(seconds=lease_seconds),
+        }
+        for index, result in results:
+            updates[f"files.{index}.status"] = "done"
+            updates[f"files.{index}.result"] = result
+
+        res = batch_jobs_col.update_one(
+            {"_id": ObjectId(job_id), "lease_owner": owner},
+            {"$set": updates, "$inc": {"done": len(results)}}
+        )
+        return res.matched_count == 1
+
+    # -----------------------------------------------------
+    # Files whose write failed stay pending; count the attempt
+    # -----------------------------------------------------
+    @staticmethod
+    def mark_write_failed(job_id: str, indexes: list, error: str, lease_seconds: int, owner: str) -> bool:
+        now = datetime.datetime.utcnow()
+        res = batch_jobs_col.update_one(
+            {"_id": ObjectId(job_id), "lease_owner": owner},
+            {
+                "$set": {
+                    **{f"files.{i}.last_error": error for i in indexes},
+                    "updated_at": now,
+                    "lease_expires_at": now + datetime.timedelta(seconds=lease_seconds),
+                },
+                "$inc": {f"files.{i}.write_attempts": 1 for i in indexes},
+            }
+        )
+        return res.matched_count == 1
+
+    # -----------------------------------------------------
+    # Give the job back (queued, no lease) so the next claim retries its pending files
+    # -----------------------------------------------------
+    @staticmethod
+    def release(job_id: str, owner: str) -> bool:
+        res = batch_jobs_col.update_one(
+            {"_id": ObjectId(job_id), "lease_owner": owner},
+            {"$set": {
+                "status": "queued",
+                "lease_expires_at": None,
+                "lease_owner": None,
+                "updated_at": datetime.datetime.utcnow(),
+            }}
+        )
+        return res.matched_count == 1
+
+    @staticmethod
+    def finish(job_id: str, status: str, owner: str, error: str = None) -> bool:
+        now = datetime.datetime.utcnow()
+        res = batch_jobs_col.update_one(
+            {"_id": ObjectId(job_id), "lease_owner": owner},
+            {"$set": {
+                "status": status,
+                "error": error,
+                "lease_expires_at": None,
+                "lease_owner": None,
+                "completed_at": now,
+                "updated_at": now,
+            }}
+        )
+        return res.matched_count == 1
+
+    @staticmethod
+    def list_unfinished():
+        cur = batch_jobs_col.find(
+            {"status": {"$in": ["queued", "running"]}},
+            {"_id": 1}
+        )
+        return [str(r["_id"]) for r in cur]
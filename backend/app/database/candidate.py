@@ -1,9 +1,87 @@
 from .connection import db
 from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError, BulkWriteError
+from .llm_cache import LLMCacheDB
+from .candidate_analysis import CandidateAnalysisDB
+from .indexes import declare_index, declare_query, ensure_indexes
+from ..ai.minhash import text_fingerprint
 import datetime
 
 candidates_col = db.candidates
 
+# multikey: one entry per LSH band key, used for near-duplicate lookup
+declare_index("candidates", "lsh_bands")
+# one candidate per uploaded file; docs without a hash are not indexed
+declare_index(
+    "candidates",
+    "file_hash",
+    unique=True,
+    partialFilterExpression={"file_hash": {"$type": "string"}}
+)
+declare_index("candidates", "email")
+declare_index("candidates", "user_id")
+# multikey over embedded analysis entries; serves the legacy read path
+# for candidates scripts/migrate_analyses.py has not moved yet
+declare_index("candidates", "analysis.job_role_id")
+
+declare_query("candidates.by_hash", "candidates", {"file_hash": {"$eq": "h", "$type": "string"}})
+declare_query("candidates.by_email", "candidates", {"email": "a@b.c"})
+declare_query("candidates.by_emails", "candidates", {"email": {"$in": ["a@b.c", "d@e.f"]}})
+declare_query("candidates.by_user_id", "candidates", {"user_id": "u"})
+declare_query("candidates.by_job_role", "candidates", {"analysis.job_role_id": "j"})
+declare_query("candidates.by_lsh_bands", "candidates", {"lsh_bands": {"$in": ["b0:1", "b1:2"]}})
+
+
+# per-job analyses and history events live in their own collections now;
+# legacy docs still carry these arrays until migrated, so plain reads skip them
+_LEAN = {"analysis": 0, "submission_history": 0, "feedback_history": 0, "manual_shortlists": 0}
+
+
+def _ensure_indexes():
+    # the unique file_hash index backs duplicate detection, so writers make
+    # sure it exists even outside the app (scripts, workers)
+    ensure_indexes("candidates")
+
+
+def _doc_text(doc: dict):
+    return doc.get("parsed_text") or (doc.get("parsed") or {}).get("raw_text") or ""
+
+
+def _fingerprint(text: str):
+    """minhash/lsh_bands for parsed_text; empty text still gets the fields so
+    it is never mistaken for a document awaiting backfill."""
+    return text_fingerprint(text) or {"minhash": None, "lsh_bands": []}
+
+
+def _set_resume(candidate_id, parsed_data: dict, file_hash: str = None):
+    fields = {
+        "name": parsed_data.get("name"),
+        "email": parsed_data.get("email", "").lower(),
+        "skills": parsed_data.get("skills", []),
+        "projects": parsed_data.get("projects", []),
+        "education": parsed_data.get("education", []),
+        "experience_years": parsed_data.get("experience_years", 0),
+        "parsed_text": parsed_data.get("raw_text", ""),
+        "updated_at": datetime.datetime.utcnow(),
+        **_fingerprint(parsed_data.get("raw_text", ""))
+    }
+    update = {"$set": fields}
+    if file_hash:
+        fields["file_hash"] = file_hash
+    else:
+        # the previous file's hash no longer describes this resume
+        update["$unset"] = {"file_hash": ""}
+
+    _ensure_indexes()
+    try:
+        candidates_col.update_one({"_id": ObjectId(candidate_id)}, update)
+    except DuplicateKeyError:
+        # the file is already on record for another candidate
+        fields.pop("file_hash")
+        update["$unset"] = {"file_hash": ""}
+        candidates_col.update_one({"_id": ObjectId(candidate_id)}, update)
+
 
 class CandidateDB:
 
@@ -15,7 +93,16 @@ class CandidateDB:
         now = datetime.datetime.utcnow()
         doc.setdefault("created_at", now)
         doc.setdefault("updated_at", now)
-        res = candidates_col.insert_one(doc)
+        doc.update(_fingerprint(_doc_text(doc)))
+        _ensure_indexes()
+        try:
+            res = candidates_col.insert_one(doc)
+        except DuplicateKeyError:
+            # same file ingested concurrently: hand back the stored candidate
+            existing = CandidateDB.find_by_hash(doc.get("file_hash")) if doc.get("file_hash") else None
+            if not existing:
+                raise
+            return existing
         doc["_id"] = str(res.inserted_id)
         return doc
 
@@ -23,28 +110,19 @@ class CandidateDB:
     # 2. Update parsed resume (used in profile resume upload)
     # ---------------------------------------------------------
     @staticmethod
-    def update_parsed_resume(candidate_id, parsed_data: dict):
-        candidates_col.update_one(
-            {"_id": ObjectId(candidate_id)},
-            {"$set": {
-                "name": parsed_data.get("name"),
-                "email": parsed_data.get("email", "").lower(),
-                "skills": parsed_data.get("skills", []),
-                "projects": parsed_data.get("projects", []),
-                "education": parsed_data.get("education", []),
-                "experience_years": parsed_data.get("experience_years", 0),
-                "parsed_text": parsed_data.get("raw_text", ""),
-                "updated_at": datetime.datetime.utcnow()
-            }}
-        )
+    def update_parsed_resume(candidate_id, parsed_data: dict, file_hash: str = None):
+        _set_resume(candidate_id, parsed_data, file_hash)
+        LLMCacheDB.delete_tagged("match_score", f"candidate:{candidate_id}")
         return CandidateDB.get(candidate_id)
 
     # ---------------------------------------------------------
-    # 3. Find by resume hash (duplicate detection)
+    # 3. Find by resume hash (duplicate detection, ingest short-circuit)
     # ---------------------------------------------------------
     @staticmethod
     def find_by_hash(h: str):
-        r = candidates_col.find_one({"file_hash": h})
+        _ensure_indexes()
+        # repeats the partial index filter so the planner can use the index
+        r = candidates_col.find_one({"file_hash": {"$eq": h, "$type": "string"}}, _LEAN)
         if not r:
             return None
         r["_id"] = str(r["_id"])
@@ -55,18 +133,29 @@ class CandidateDB:
     # ---------------------------------------------------------
     @staticmethod
     def find_by_email(email: str):
-        r = candidates_col.find_one({"email": email.lower()})
+        r = candidates_col.find_one({"email": email.lower()}, _LEAN)
         if not r:
             return None
         r["_id"] = str(r["_id"])
         return r
 
+    # ---------------------------------------------------------
+    # 4b. Resolve many emails to candidate ids in one query (batch flows)
+    # ---------------------------------------------------------
+    @staticmethod
+    def find_ids_by_emails(emails: list):
+        emails = [e.lower() for e in emails if e]
+        if not emails:
+            return {}
+        cur = candidates_col.find({"email": {"$in": emails}}, {"_id": 1, "email": 1})
+        return {r["email"]: str(r["_id"]) for r in cur}
+
     # ---------------------------------------------------------
     # 5. Find by linked user_id (candidate logged-in account)
     # ---------------------------------------------------------
     @staticmethod
     def find_by_user_id(user_id: str):
-        r = candidates_col.find_one({"user_id": user_id})
+        r = candidates_col.find_one({"user_id": user_id}, _LEAN)
         if not r:
             return None
         r["_id"] = str(r["_id"])
@@ -76,20 +165,9 @@ class CandidateDB:
     # 6. Update resume (used internally)
     # ---------------------------------------------------------
     @staticmethod
-    def update_resume(candidate_id: str, parsed_data: dict):
-        candidates_col.update_one(
-            {"_id": ObjectId(candidate_id)},
-            {"$set": {
-                "name": parsed_data.get("name"),
-                "email": parsed_data.get("email", "").lower(),
-                "skills": parsed_data.get("skills", []),
-                "projects": parsed_data.get("projects", []),
-                "education": parsed_data.get("education", []),
-                "experience_years": parsed_data.get("experience_years", 0),
-                "parsed_text": parsed_data.get("raw_text", ""),
-                "updated_at": datetime.datetime.utcnow()
-            }}
-        )
+    def update_resume(candidate_id: str, parsed_data: dict, file_hash: str = None):
+        _set_resume(candidate_id, parsed_data, file_hash)
+        LLMCacheDB.delete_tagged("match_score", f"candidate:{candidate_id}")
         return CandidateDB.get(candidate_id)
 
     # ---------------------------------------------------------
@@ -98,99 +176,149 @@ class CandidateDB:
     @staticmethod
     def add_analysis(candidate_id: str, job_role_id: str, analysis_dict: dict):
         analysis_dict.setdefault("timestamp", datetime.datetime.utcnow())
-
+        CandidateAnalysisDB.add(candidate_id, job_role_id, analysis_dict)
         candidates_col.update_one(
             {"_id": ObjectId(candidate_id)},
-            {
-                "$push": {"analysis": analysis_dict},
-                "$set": {"updated_at": datetime.datetime.utcnow()}
-            }
+            {"$set": {"updated_at": datetime.datetime.utcnow()}}
         )
         return True
 
     # ---------------------------------------------------------
-    # 8. Get top N candidates (ranking)
+    # 7b. Analyses (compatible with candidates not migrated yet)
     # ---------------------------------------------------------
     @staticmethod
-    def get_top_n(job_role_id: str, n: int = 5):
-        cursor = candidates_col.find(
-            {"analysis.job_role_id": job_role_id},
-            {"analysis": 1}
-        )
+    def get_analyses(candidate_id: str):
+        return CandidateAnalysisDB.for_candidate(candidate_id)
 
-        ranking = []
-        for r in cursor:
-            analyses = r.get("analysis", [])
-            entry = next(
-                (a for a in analyses if a.get("job_role_id") == job_role_id),
-                None
-            )
-            if entry:
-                ranking.append({
-                    "candidate_id": str(r["_id"]),
-                    "match_score": entry.get("match_score", 0),
-                    "ats_score": entry.get("ats_score", 0),
-                })
-
-        ranked = sorted(
-            ranking,
-            key=lambda x: (x["match_score"], x["ats_score"]),
-            reverse=True
-        )
-        return ranked[:n]
+    @staticmethod
+    def get_analysis_for_job(job_role_id: str, limit: int = 50):
+        return CandidateAnalysisDB.ranked(job_role_id, limit)
+
+    # ---------------------------------------------------------
+    # 8. Get top N candidates (ranking)
+    # ---------------------------------------------------------
+    @staticmethod
+    def get_top_n(job_role_id: str, n: int = 5, min_score: float = None):
+        rows, _ = CandidateAnalysisDB.top_n(job_role_id, n, min_score=min_score, fields=())
+        return [
+            {"candidate_id": r["candidate_id"], "match_score": r["match_score"], "ats_score": r["ats_score"]}
+            for r in rows
+        ]
 
     # ---------------------------------------------------------
     # 9. Store recruiter feedback
     # ---------------------------------------------------------
     @staticmethod
     def add_feedback(candidate_id: str, job_role_id: str, recruiter_id: str, feedback_text: str):
-        fb = {
+        CandidateAnalysisDB.add_events("feedback", [{
+            "candidate_id": candidate_id,
             "job_role_id": job_role_id,
             "recruiter_id": recruiter_id,
             "feedback": feedback_text,
-            "timestamp": datetime.datetime.utcnow()
-        }
-        return candidates_col.update_one(
-            {"_id": ObjectId(candidate_id)},
-            {"$push": {"feedback_history": fb}}
-        )
+        }])
 
     # ---------------------------------------------------------
     # 10. Store resume submission history
     # ---------------------------------------------------------
     @staticmethod
     def add_submission(candidate_id: str, job_role_id: str, recruiter_id: str):
-        record = {
+        CandidateAnalysisDB.add_events("submission", [{
+            "candidate_id": candidate_id,
             "job_role_id": job_role_id,
             "recruiter_id": recruiter_id,
-            "timestamp": datetime.datetime.utcnow()
-        }
-        candidates_col.update_one(
-            {"_id": ObjectId(candidate_id)},
-            {"$push": {"submission_history": record}}
-        )
+        }])
+
+    # ---------------------------------------------------------
+    # 10b. Batched insert / submission writes (shortlist pipeline)
+    # ---------------------------------------------------------
+    @staticmethod
+    def insert_candidate_docs(docs: list):
+        if not docs:
+            return []
+        now = datetime.datetime.utcnow()
+        for doc in docs:
+            doc.setdefault("created_at", now)
+            doc.setdefault("updated_at", now)
+            doc.update(_fingerprint(_doc_text(doc)))
+        _ensure_indexes()
+        try:
+            candidates_col.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            failed = {err["index"] for err in e.details.get("writeErrors", []) if err.get("code") == 11000}
+            if len(failed) != len(e.details.get("writeErrors", [])):
+                raise
+            # same file ingested concurrently: point these docs at the stored candidate
+            for i in failed:
+                existing = CandidateDB.find_by_hash(docs[i].get("file_hash")) if docs[i].get("file_hash") else None
+                if not existing:
+                    raise
+                docs[i]["_id"] = existing["_id"]
+        # insert_many sets _id on each inserted doc
+        for doc in docs:
+            doc["_id"] = str(doc["_id"])
+        return docs
+
+    @staticmethod
+    def add_submissions(entries: list, batch_job_id: str = None):
+        """
+        entries: [(candidate_id, job_role_id, recruiter_id), ...]
+        batch_job_id: the batch job writing them; a retried write adds no second event.
+        """
+        if not entries:
+            return
+        extra = {"batch_job_id": batch_job_id} if batch_job_id else {}
+        CandidateAnalysisDB.add_events("submission", [
+            {"candidate_id": candidate_id, "job_role_id": job_role_id, "recruiter_id": recruiter_id, **extra}
+            for candidate_id, job_role_id, recruiter_id in entries
+        ])
 
     # ---------------------------------------------------------
     # 11. General getter
     # ---------------------------------------------------------
     @staticmethod
-    def get(candidate_id: str):
+    def get(candidate_id: str, with_analyses: bool = False, projection=None):
+        """projection narrows the read further (e.g. ["_id"] for an existence check)."""
         try:
-            r = candidates_col.find_one({"_id": ObjectId(candidate_id)})
+            r = candidates_col.find_one({"_id": ObjectId(candidate_id)}, projection or _LEAN)
             if not r:
                 return None
             r["_id"] = str(r["_id"])
+            if with_analyses:
+                r["analysis"] = CandidateAnalysisDB.for_candidate(r["_id"])
             return r
         except Exception:
             return None
 
     # ---------------------------------------------------------
-    # 12. Text samples (optional)
+    # 12. Near-duplicate candidates sharing any LSH band
     # ---------------------------------------------------------
     @staticmethod
-    def find_texts(limit: int = 200):
-        cur = candidates_col.find({}, {"_id": 1, "parsed_text": 1}).limit(limit)
-        return [{"_id": str(r["_id"]), "text": r.get("parsed_text", "")} for r in cur]
+    def find_by_lsh_bands(bands: list, limit: int = 500):
+        if not bands:
+            return []
+        cur = candidates_col.find(
+            {"lsh_bands": {"$in": bands}},
+            {"_id": 1, "minhash": 1}
+        ).limit(limit)
+        return [{"_id": str(r["_id"]), "minhash": r.get("minhash")} for r in cur]
+
+    @staticmethod
+    def missing_fingerprints(limit: int = 1000):
+        """Candidates ingested before minhash/lsh_bands were stored."""
+        cur = candidates_col.find(
+            {"minhash": {"$exists": False}},
+            {"_id": 1, "parsed_text": 1, "parsed.raw_text": 1}
+        ).limit(limit)
+        return list(cur)
+
+    @staticmethod
+    def set_fingerprints(items: list):
+        """items: [(ObjectId, text), ...]; writes minhash/lsh_bands in one round trip."""
+        ops = [UpdateOne({"_id": oid}, {"$set": _fingerprint(text)}) for oid, text in items]
+        if ops:
+            _ensure_indexes()
+            candidates_col.bulk_write(ops, ordered=False)
+        return len(ops)
 
     # ---------------------------------------------------------
     # 13. Link temp candidate profile to final user after invite signup
@@ -205,15 +333,11 @@ class CandidateDB:
     
     @staticmethod
     def add_manual_shortlist(candidate_id: str, job_role_id: str, recruiter_id: str):
-        record = {
+        CandidateAnalysisDB.add_events("manual_shortlist", [{
+            "candidate_id": candidate_id,
             "job_role_id": job_role_id,
             "recruiter_id": recruiter_id,
-            "timestamp": datetime.datetime.utcnow()
-        }
-        candidates_col.update_one(
-            {"_id": ObjectId(candidate_id)},
-            {"$push": {"manual_shortlists": record}}
-        )
+        }])
 
         @staticmethod
         def add_final_feedback(candidate_id, job_role_id, feedback_text):
@@ -0,0 +1,334 @@
+# app/database/candidate_analysis.py
+#
+# Per-job analyses and candidate history events, one document each, instead
+# of arrays embedded in (and growing) the candidate document. Candidates
+# written before this collection existed keep their embedded arrays until
+# scripts/migrate_analyses.py moves them; reads merge those in while
+# ANALYSIS_LEGACY_READS is on.
+
+import os
+import json
+import base64
+import datetime
+from bson.objectid import ObjectId
+from bson.son import SON
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from .connection import db
+from .indexes import declare_index, declare_query
+
+analyses_col = db.candidate_analyses
+history_col = db.candidate_history
+candidates_col = db.candidates
+
+# turn off once the migration has run to skip the embedded-array lookups
+ANALYSIS_LEGACY_READS = os.getenv("ANALYSIS_LEGACY_READS", "1") == "1"
+
+# ranking order; _id breaks ties so cursor pagination is stable
+RANK_SORT = [("match_score", -1), ("ats_score", -1), ("_id", -1)]
+# ranking per job role: an index scan in score order, superseded analyses skipped by the index
+declare_index("candidate_analyses", [("job_role_id", 1), ("current", 1), *RANK_SORT])
+declare_index("candidate_analyses", [("candidate_id", 1), ("timestamp", -1)])
+# at most one current analysis per (candidate, job), even under concurrent add()s
+declare_index(
+    "candidate_analyses", [("candidate_id", 1), ("job_role_id", 1)],
+    unique=True, partialFilterExpression={"current": True},
+)
+declare_index("candidate_history", [("candidate_id", 1), ("kind", 1), ("timestamp", -1)])
+# one event per batch job write, so a replayed flush adds nothing
+declare_index(
+    "candidate_history", [("batch_job_id", 1), ("candidate_id", 1), ("kind", 1), ("job_role_id", 1)],
+    unique=True, partialFilterExpression={"batch_job_id": {"$exists": True}},
+)
+
+declare_query("candidate_analyses.ranking", "candidate_analyses", {"job_role_id": "j", "current": True}, sort=RANK_SORT)
+declare_query(
+    "candidate_analyses.ranking_page", "candidate_analyses",
+    {"job_role_id": "j", "current": True, "match_score": {"$gte": 40}, "$or": [
+        {"match_score": {"$lt": 80}},
+        {"match_score": 80, "ats_score": {"$lt": 60}},
+        {"match_score": 80, "ats_score": 60, "_id": {"$lt": ObjectId("0" * 24)}},
+    ]},
+    sort=RANK_SORT,
+)
+declare_query("candidate_analyses.by_candidate", "candidate_analyses", {"candidate_id": "c"}, sort=[("timestamp", -1)])
+
+# embedded array on legacy candidate docs -> history kind
+HISTORY_FIELDS = {
+    "submission_history": "submission",
+    "feedback_history": "feedback",
+    "manual_shortlists": "manual_shortlist",
+}
+
+
+def _public(doc: dict) -> dict:
+    doc["_id"] = str(doc["_id"])
+    return doc
+
+
+def _with_scores(doc: dict) -> dict:
+    # ranking and its cursor compare these; a missing / null score would
+    # sort apart from 0 and never match the cursor's $lt / equality filters
+    doc["match_score"] = doc.get("match_score") or 0
+    doc["ats_score"] = doc.get("ats_score") or 0
+    return doc
+
+
+def _rank_key(doc: dict):
+    return (doc.get("match_score") or 0, doc.get("ats_score") or 0, str(doc.get("_id", "")))
+
+
+def encode_cursor(doc: dict) -> str:
+    """Opaque page token: the sort key of the last row served."""
+    raw = json.dumps(_rank_key(doc)).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str):
+    """(match_score, ats_score, _id); ValueError for a malformed token."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        match, ats, oid = json.loads(raw)
+        return float(match), float(ats), str(oid)
+    except Exception:
+        raise ValueError("Invalid ranking cursor")
+
+
+def _after(cursor: str) -> dict:
+    """Rows strictly after the cursor in RANK_SORT order."""
+    match, ats, oid = decode_cursor(cursor)
+    oid = ObjectId(oid) if ObjectId.is_valid(oid) else oid
+    return {"$or": [
+        {"match_score": {"$lt": match}},
+        {"match_score": match, "ats_score": {"$lt": ats}},
+        {"match_score": match, "ats_score": ats, "_id": {"$lt": oid}},
+    ]}
+
+
+def _legacy_analyses(query: dict, job_role_id: str = None) -> list:
+    """Embedded analyses of candidates not migrated yet, shaped like collection docs."""
+    if not ANALYSIS_LEGACY_READS:
+        return []
+    out = []
+    for r in candidates_col.find(query, {"analysis": 1}):
+        entries = [a for a in r.get("analysis", []) if job_role_id is None or a.get("job_role_id") == job_role_id]
+        for i, a in enumerate(entries):
+            doc = dict(a)
+            doc["candidate_id"] = str(r["_id"])
+            # a candidate's latest analysis per job is the one that counts
+            doc["current"] = all(b.get("job_role_id") != a.get("job_role_id") for b in entries[i + 1:])
+            doc["legacy"] = True
+            out.append(doc)
+    return out
+
+
+class CandidateAnalysisDB:
+
+    # -----------------------------------------------------
+    # Store one analysis; it supersedes the candidate's previous one for the job
+    # -----------------------------------------------------
+    @staticmethod
+    def add(candidate_id: str, job_role_id: str, analysis: dict):
+        doc = dict(analysis)
+        doc["candidate_id"] = str(candidate_id)
+        doc["job_role_id"] = job_role_id
+        doc.setdefault("timestamp", datetime.datetime.utcnow())
+        _with_scores(doc)
+        doc["current"] = True
+        for attempt in range(3):
+            analyses_col.update_many(
+                {"candidate_id": doc["candidate_id"], "job_role_id": job_role_id, "current": True},
+                {"$set": {"current": False}}
+            )
+            try:
+                res = analyses_col.insert_one(doc)
+                return str(res.inserted_id)
+            except DuplicateKeyError:
+                # a concurrent add() got its analysis in first; supersede it
+                doc.pop("_id", None)
+                if attempt == 2:
+                    raise
+
+    # -----------------------------------------------------
+    # All analyses of one candidate, newest first
+    # -----------------------------------------------------
+    @staticmethod
+    def for_candidate(candidate_id: str, limit: int = 50):
+        cur = analyses_col.find({"candidate_id": str(candidate_id)}).sort("timestamp", -1).limit(limit)
+        docs = [_public(d) for d in cur]
+        if not docs:
+            try:
+                docs = _legacy_analyses({"_id": ObjectId(candidate_id)})[::-1][:limit]
+            except Exception:
+                docs = []
+        return docs
+
+    # -----------------------------------------------------
+    # Ranking: current analyses for a job role, best first
+    # -----------------------------------------------------
+    @staticmethod
+    def top_n(job_role_id: str, limit: int = None, min_score: float = None, cursor: str = None, fields=None):
+        """
+        (rows, next_cursor) ordered by match then ATS score. `min_score`
+        drops rows below a match score, `cursor` (a previous next_cursor)
+        resumes after the last row served and `fields` limits what each
+        row carries (candidate_id and scores are always included).
+        """
+        match = {"job_role_id": job_role_id, "current": True}
+        if min_score is not None:
+            match["match_score"] = {"$gte": min_score}
+        if cursor:
+            match.update(_after(cursor))
+
+        pipeline = [{"$match": match}, {"$sort": SON(RANK_SORT)}]
+        if limit:
+            # one extra row tells whether another page exists
+            pipeline.append({"$limit": limit + 1})
+        if fields:
+            pipeline.append({"$project": {f: 1 for f in ("candidate_id", "match_score", "ats_score", *fields)}})
+        rows = [_public(d) for d in analyses_col.aggregate(pipeline)]
+
+        legacy = CandidateAnalysisDB._legacy_page(job_role_id, min_score, cursor)
+        if legacy:
+            # the page's collection rows are already the best limit + 1, so
+            # only the few embedded rows need merging in
+            rows = sorted(rows + legacy, key=_rank_key, reverse=True)
+            if limit:
+                rows = rows[:limit + 1]
+
+        next_cursor = None
+        if limit and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1])
+        if fields:
+            keep = {"_id", "candidate_id", "match_score", "ats_score", *fields}
+            rows = [{k: v for k, v in r.items() if k in keep} for r in rows]
+        return rows, next_cursor
+
+    @staticmethod
+    def _legacy_page(job_role_id: str, min_score=None, cursor=None):
+        """Current embedded analyses of unmigrated candidates that fall in the requested page."""
+        legacy = [
+            d for d in _legacy_analyses({"analysis.job_role_id": job_role_id}, job_role_id) if d["current"]
+        ]
+        if not legacy:
+            return []
+        # an analysis stored here since supersedes the embedded one
+        seen = {d["candidate_id"] for d in analyses_col.find(
+            {"job_role_id": job_role_id, "candidate_id": {"$in": [d["candidate_id"] for d in legacy]}},
+            {"candidate_id": 1},
+        )}
+        after = decode_cursor(cursor) if cursor else None
+        rows = []
+        for d in legacy:
+            if d["candidate_id"] in seen:
+                continue
+            d["_id"] = d["candidate_id"]
+            _with_scores(d)
+            if min_score is not None and d["match_score"] < min_score:
+                continue
+            if after and _rank_key(d) >= after:
+                continue
+            rows.append(d)
+        return rows
+
+    @staticmethod
+    def ranked(job_role_id: str, limit: int = None):
+        return CandidateAnalysisDB.top_n(job_role_id, limit)[0]
+
+    # -----------------------------------------------------
+    # History events (submissions, recruiter feedback, manual shortlists)
+    # -----------------------------------------------------
+    @staticmethod
+    def add_events(kind: str, records: list):
+        """
+        records: dicts with candidate_id, job_role_id, recruiter_id, ...
+        Records carrying a batch_job_id are upserted on (batch_job_id,
+        candidate_id, kind, job_role_id), so replaying a batch write is a no-op.
+        """
+        if not records:
+            return
+        now = datetime.datetime.utcnow()
+        docs, ops = [], []
+        for r in records:
+            doc = {"kind": kind, **r}
+            doc["candidate_id"] = str(doc["candidate_id"])
+            doc.setdefault("timestamp", now)
+            if doc.get("batch_job_id"):
+                key = {f: doc.get(f) for f in ("batch_job_id", "candidate_id", "kind", "job_role_id")}
+                ops.append(UpdateOne(key, {"$setOnInsert": doc}, upsert=True))
+            else:
+                docs.append(doc)
+        if docs:
+            history_col.insert_many(docs, ordered=False)
+        if ops:
+            history_col.bulk_write(ops, ordered=False)
+
+    @staticmethod
+    def events(candidate_id: str, kind: str = None, limit: int = 100):
+        query = {"candidate_id": str(candidate_id)}
+        if kind:
+            query["kind"] = kind
+        cur = history_col.find(query).sort("timestamp", -1).limit(limit)
+        return [_public(d) for d in cur]
+
+    # -----------------------------------------------------
+    # Migration of embedded arrays (scripts/migrate_analyses.py)
+    # -----------------------------------------------------
+    @staticmethod
+    def unmigrated(limit: int = 200):
+        fields = ["analysis", *HISTORY_FIELDS]
+        cur = candidates_col.find(
+            {"$or": [{f: {"$exists": True}} for f in fields]},
+            {f: 1 for f in fields}
+        ).limit(limit)
+        return list(cur)
+
+    @staticmethod
+    def migrate(candidate: dict):
+        """
+        Copy one candidate's embedded analyses / history into the
+        collections, then drop the arrays. Upserts keyed on (candidate,
+        job, timestamp) make a rerun after a crash a no-op.
+        """
+        cid = str(candidate["_id"])
+        analyses = candidate.get("analysis") or []
+        # jobs already re-analysed since the switch keep that analysis as current
+        live_jobs = set(analyses_col.distinct(
+            "job_role_id", {"candidate_id": cid, "current": True, "migrated": {"$ne": True}}
+        ))
+        ops = []
+        for i, a in enumerate(analyses):
+            doc = _with_scores(dict(a))
+            doc["candidate_id"] = cid
+            doc["migrated"] = True
+            doc["current"] = a.get("job_role_id") not in live_jobs and \
+                all(b.get("job_role_id") != a.get("job_role_id") for b in analyses[i + 1:])
+            key = {"candidate_id": cid, "job_role_id": a.get("job_role_id"), "timestamp": a.get("timestamp")}
+            ops.append(UpdateOne(key, {"$setOnInsert": doc}, upsert=True))
+        if ops:
+            analyses_col.bulk_write(ops, ordered=False)
+
+        events = []
+        for field, kind in HISTORY_FIELDS.items():
+            for e in candidate.get(field) or []:
+                doc = {"kind": kind, **e, "candidate_id": cid}
+                key = {"candidate_id": cid, "kind": kind, "job_role_id": e.get("job_role_id"), "timestamp": e.get("timestamp")}
+                events.append(UpdateOne(key, {"$setOnInsert": doc}, upsert=True))
+        if events:
+            history_col.bulk_write(events, ordered=False)
+
+        candidates_col.update_one(
+            {"_id": candidate["_id"]},
+            {"$unset": {f: "" for f in ("analysis", *HISTORY_FIELDS)}}
+        )
+        return len(ops), len(events)
+
+    @staticmethod
+    def fill_missing_scores():
+        """Zero the null / missing scores of analyses migrated before migrate() defaulted them."""
+        n = 0
+        for field in ("match_score", "ats_score"):
+            n += analyses_col.update_many({field: None}, {"$set": {field: 0}}).modified_count
+        return n
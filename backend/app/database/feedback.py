@@ -1,10 +1,23 @@
 # app/database/feedback.py
 from .connection import db
+from .indexes import declare_index, declare_query
 from bson.objectid import ObjectId
 from datetime import datetime
+from pymongo import UpdateOne
 
 feedback_col = db.feedback_drafts
 
+declare_index("feedback_drafts", [("recruiter_id", 1), ("status", 1), ("created_at", -1)])
+# one draft per batch job write, so a replayed flush adds nothing
+declare_index(
+    "feedback_drafts", [("batch_job_id", 1), ("candidate_id", 1), ("job_role_id", 1)],
+    unique=True, partialFilterExpression={"batch_job_id": {"$exists": True}},
+)
+declare_query(
+    "feedback_drafts.pending", "feedback_drafts",
+    {"recruiter_id": "r", "status": "pending"}, sort=[("created_at", -1)]
+)
+
 
 class FeedbackDB:
 
@@ -24,6 +37,49 @@ class FeedbackDB:
         draft["_id"] = str(res.inserted_id)
         return draft
 
+    @staticmethod
+    def create_drafts(items, batch_job_id=None):
+        """
+        items: [{"candidate_id", "recruiter_id", "job_role_id", "feedback_text"}, ...]
+        With batch_job_id the drafts are upserted per (job, candidate, role) and
+        only the ones created by this call are returned; a retried write adds none.
+        """
+        if not items:
+            return []
+        now = datetime.utcnow()
+        drafts = [
+            {
+                "candidate_id": it["candidate_id"],
+                "recruiter_id": it["recruiter_id"],
+                "job_role_id": it["job_role_id"],
+                "text": it["feedback_text"],
+                "status": "pending",
+                "created_at": now,
+                "updated_at": now,
+                **({"batch_job_id": batch_job_id} if batch_job_id else {}),
+            }
+            for it in items
+        ]
+        if not batch_job_id:
+            res = feedback_col.insert_many(drafts)
+            for d, oid in zip(drafts, res.inserted_ids):
+                d["_id"] = str(oid)
+            return drafts
+
+        res = feedback_col.bulk_write([
+            UpdateOne(
+                {"batch_job_id": batch_job_id, "candidate_id": d["candidate_id"], "job_role_id": d["job_role_id"]},
+                {"$setOnInsert": d},
+                upsert=True,
+            )
+            for d in drafts
+        ], ordered=False)
+        created = []
+        for i, oid in res.upserted_ids.items():
+            drafts[i]["_id"] = str(oid)
+            created.append(drafts[i])
+        return created
+
     @staticmethod
     def get(draft_id):
         try:
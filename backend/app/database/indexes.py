@@ -0,0 +1,157 @@
+# app/database/indexes.py
+#
+# Index registry. Each DB module declares the indexes its queries need
+# (declare_index) and the shape of its hot queries (declare_query). The app
+# applies the indexes once at startup; create_index is a no-op for an index
+# that already exists, so this is safe on every boot.
+#
+#   python -m app.database.indexes           apply indexes
+#   python -m app.database.indexes --check   apply, then explain every hot
+#                                            query; exit 1 on a COLLSCAN
+
+import os
+import sys
+import importlib
+import threading
+
+from .connection import db
+
+# "off", "warn" (print COLLSCAN hot queries at startup) or "strict" (fail startup)
+MONGO_INDEX_CHECK = os.getenv("MONGO_INDEX_CHECK", "off").lower()
+
+# imported before applying so every module's declarations are registered
+_DB_MODULES = (
+    "batch_job", "candidate", "candidate_analysis", "feedback", "interview_chat", "invite", "jobrole",
+    "llm_cache", "recruiter", "recruiter_chat", "recruiter_messages", "user",
+)
+
+_indexes = {}    # collection -> [(keys, options)]
+_queries = []    # [{"name", "collection", "filter", "sort"}]
+_applied = set()
+_lock = threading.Lock()
+
+
+def declare_index(collection: str, keys, **options):
+    """keys: a field name or [(field, direction), ...]; options go to create_index."""
+    if isinstance(keys, str):
+        keys = [(keys, 1)]
+    entry = (list(keys), options)
+    specs = _indexes.setdefault(collection, [])
+    if entry not in specs:
+        specs.append(entry)
+
+
+def declare_query(name: str, collection: str, filter: dict, sort=None):
+    """A hot query shape that must be served by an index (see check_hot_queries)."""
+    _queries.append({"name": name, "collection": collection, "filter": filter, "sort": sort})
+
+
+def ensure_indexes(collection: str):
+    """Apply one collection's declared indexes once per process."""
+    if collection in _applied:
+        return
+    with _lock:
+        if collection in _applied:
+            return
+        for keys, options in _indexes.get(collection, []):
+            try:
+                db[collection].create_index(keys, **options)
+            except Exception as e:
+                # e.g. existing duplicates block a unique index; the app still runs
+                print(f"Index {collection} {keys} failed:", e)
+        _applied.add(collection)
+
+
+def apply_indexes():
+    for name in _DB_MODULES:
+        importlib.import_module(f"{__package__}.{name}")
+    for collection in list(_indexes):
+        ensure_indexes(collection)
+    return {c: len(specs) for c, specs in _indexes.items()}
+
+
+# ---------------------------------------------------------
+# Explain-plan check
+# ---------------------------------------------------------
+def _stages(plan: dict):
+    if not isinstance(plan, dict):
+        return
+    if "stage" in plan:
+        yield plan["stage"], plan.get("indexName")
+    for key in ("inputStage", "queryPlan"):
+        yield from _stages(plan.get(key))
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+def explain_query(collection: str, filter: dict, sort=None) -> dict:
+    cmd = {"find": collection, "filter": filter}
+    if sort:
+        cmd["sort"] = dict(sort)
+    out = db.command("explain", cmd, verbosity="queryPlanner")
+    planner = out.get("queryPlanner", {})
+    stages = list(_stages(planner.get("winningPlan", {})))
+    return {
+        "stages": [s for s, _ in stages],
+        "indexes": sorted({i for _, i in stages if i}),
+        "collscan": any(s == "COLLSCAN" for s, _ in stages),
+    }
+
+
+def check_hot_queries() -> list:
+    """Explain every declared hot query; one result dict per query."""
+    apply_indexes()
+    results = []
+    for q in _queries:
+        try:
+            plan = explain_query(q["collection"], q["filter"], q["sort"])
+        except Exception as e:
+            plan = {"error": str(e), "collscan": None}
+        results.append({"name": q["name"], "collection": q["collection"], **plan})
+    return results
+
+
+def assert_no_collscan():
+    """
+    Raise AssertionError naming every hot query whose winning plan is a
+    COLLSCAN, or that could not be explained (which proves nothing).
+    """
+    results = check_hot_queries()
+    bad = [r["name"] for r in results if r["collscan"]]
+    failed = [r["name"] for r in results if r.get("error")]
+    if bad or failed:
+        raise AssertionError(
+            f"COLLSCAN in hot queries: {', '.join(bad) or '-'}; not explained: {', '.join(failed) or '-'}"
+        )
+
+
+def provision_indexes():
+    """Startup hook body: apply indexes, then run the check MONGO_INDEX_CHECK asks for."""
+    counts = apply_indexes()
+    print(f"Indexes applied: {sum(counts.values())} across {len(counts)} collections")
+    if MONGO_INDEX_CHECK == "off":
+        return
+    results = check_hot_queries()
+    for r in results:
+        if r.get("error"):
+            print(f"Index check {r['name']}: explain failed ({r['error']})")
+        elif r["collscan"]:
+            print(f"Index check {r['name']}: COLLSCAN on {r['collection']}")
+    if MONGO_INDEX_CHECK == "strict":
+        bad = [r["name"] for r in results if r["collscan"]]
+        if bad:
+            raise RuntimeError(f"COLLSCAN in hot queries: {', '.join(bad)}")
+
+
+if __name__ == "__main__":
+    # run as a script this file is __main__; the DB modules register into
+    # the importable copy, so work through that one
+    registry = importlib.import_module(f"{__package__}.indexes")
+    counts = registry.apply_indexes()
+    print(f"Indexes applied: {counts}")
+    if "--check" in sys.argv:
+        results = registry.check_hot_queries()
+        for r in results:
+            state = "ERROR" if r.get("error") else ("COLLSCAN" if r["collscan"] else "ok")
+            print(f"{state:9} {r['name']:40} {','.join(r.get('indexes', []))}")
+        sys.exit(1 if any(r["collscan"] for r in results) else 0)
@@ -1,9 +1,13 @@
 from ..database.connection import db
+from .indexes import declare_index, declare_query
 from bson.objectid import ObjectId
 from datetime import datetime
 
 interview_col = db.interview_chats
 
+declare_index("interview_chats", "candidate_id")
+declare_query("interview_chats.by_candidate", "interview_chats", {"candidate_id": "c"})
+
 class InterviewChatDB:
 
     @staticmethod
@@ -39,8 +43,8 @@ class InterviewChatDB:
         )
 
     @staticmethod
-    def list_for_candidate(candidate_id):
-        chats = list(interview_col.find({"candidate_id": candidate_id}))
+    def list_for_candidate(candidate_id, projection=None):
+        chats = list(interview_col.find({"candidate_id": candidate_id}, projection))
         for c in chats:
             c["_id"] = str(c["_id"])
         return chats
@@ -1,11 +1,15 @@
 # app/database/invite.py
 from .connection import db
+from .indexes import declare_index, declare_query
 from bson.objectid import ObjectId
 import datetime
 import secrets
 
 invite_col = db.invites
 
+declare_index("invites", "token")
+declare_query("invites.by_token", "invites", {"token": "t", "used": False})
+
 
 class InviteDB:
 
@@ -2,10 +2,22 @@
 
 from .connection import db
 from bson.objectid import ObjectId
+from .llm_cache import LLMCacheDB
+from .candidate_analysis import CandidateAnalysisDB
+from .indexes import declare_index, declare_query
 import datetime
 
 jobroles_col = db.job_roles
 
+declare_index("job_roles", "recruiter_id")
+declare_query("job_roles.by_recruiter", "job_roles", {"recruiter_id": "r"})
+
+# fields read by match scoring; editing any of them drops cached scores
+SCORING_FIELDS = {
+    "title", "required_skills", "preferred_skills", "responsibilities",
+    "experience_level", "raw_text", "parsed",
+}
+
 
 # -----------------------------------------------------
 # Helper: Clean duplicate parsed responsibilities
@@ -47,9 +59,9 @@ class JobRoleDB:
     # Get job role by ID
     # -----------------------------------------------------
     @staticmethod
-    def get(job_role_id: str):
+    def get(job_role_id: str, projection=None):
         try:
-            doc = jobroles_col.find_one({"_id": ObjectId(job_role_id)})
+            doc = jobroles_col.find_one({"_id": ObjectId(job_role_id)}, projection)
             if not doc:
                 return None
 
@@ -91,6 +103,8 @@ class JobRoleDB:
             {"_id": ObjectId(job_role_id)},
             {"$set": updates}
         )
+        if SCORING_FIELDS & set(updates):
+            LLMCacheDB.delete_tagged("match_score", f"job_role:{job_role_id}")
         return JobRoleDB.get(job_role_id)
 
     @staticmethod
@@ -129,33 +143,14 @@ class JobRoleDB:
             {"_id": ObjectId(job_role_id)},
             {"$set": {"parsed": parsed}}
         )
+        LLMCacheDB.delete_tagged("match_score", f"job_role:{job_role_id}")
         return JobRoleDB.get(job_role_id)
 
     @staticmethod
     def add_candidate_analysis(job_role_id: str, candidate_id: str, match_score: float, ats_score: float):
-        entry = {
-            "candidate_id": candidate_id,
-            "match_score": match_score,
-            "ats_score": ats_score,
-            "timestamp": datetime.datetime.utcnow()
-        }
-
-        jobroles_col.update_one(
-            {"_id": ObjectId(job_role_id)},
-            {"$push": {"candidate_analysis": entry}}
-        )
+        # stored once, in candidate_analyses, rather than also on the job doc
+        CandidateAnalysisDB.add(candidate_id, job_role_id, {"match_score": match_score, "ats_score": ats_score})
 
     @staticmethod
     def ranked_candidates(job_role_id: str):
-        job = jobroles_col.find_one({"_id": ObjectId(job_role_id)})
-        if not job:
-            return []
-
-        analysis = job.get("candidate_analysis", [])
-        sorted_list = sorted(
-            analysis,
-            key=lambda x: (x.get("match_score", 0), x.get("ats_score", 0)),
-            reverse=True
-        )
-
-        return sorted_list
+        return CandidateAnalysisDB.ranked(job_role_id)
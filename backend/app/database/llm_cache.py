@@ -0,0 +1,55 @@
+# app/database/llm_cache.py
+
+from .connection import db
+from .indexes import declare_index, declare_query, ensure_indexes
+import datetime
+
+llm_cache_col = db.llm_cache
+
+# Mongo drops documents once expires_at has passed
+declare_index("llm_cache", "expires_at", expireAfterSeconds=0)
+declare_index("llm_cache", [("namespace", 1), ("tags", 1)])
+
+declare_query("llm_cache.by_tag", "llm_cache", {"namespace": "match_score", "tags": "candidate:c"})
+
+
+def _ensure_indexes():
+    ensure_indexes("llm_cache")
+
+
+class LLMCacheDB:
+
+    @staticmethod
+    def get(namespace: str, key: str):
+        r = llm_cache_col.find_one({"_id": f"{namespace}:{key}"}, {"value": 1, "expires_at": 1})
+        if not r:
+            return None
+        # the TTL monitor runs about once a minute, so check expiry here too
+        if r.get("expires_at") and r["expires_at"] < datetime.datetime.utcnow():
+            return None
+        return r.get("value")
+
+    @staticmethod
+    def put(namespace: str, key: str, value, ttl_seconds: int, tags: list = None):
+        _ensure_indexes()
+        now = datetime.datetime.utcnow()
+        llm_cache_col.update_one(
+            {"_id": f"{namespace}:{key}"},
+            {"$set": {
+                "namespace": namespace,
+                "value": value,
+                "tags": tags or [],
+                "created_at": now,
+                "expires_at": now + datetime.timedelta(seconds=ttl_seconds),
+            }},
+            upsert=True
+        )
+
+    @staticmethod
+    def delete(namespace: str, key: str):
+        llm_cache_col.delete_one({"_id": f"{namespace}:{key}"})
+
+    @staticmethod
+    def delete_tagged(namespace: str, tag: str):
+        res = llm_cache_col.delete_many({"namespace": namespace, "tags": tag})
+        return res.deleted_count
@@ -1,12 +1,17 @@
 # app/database/recruiter.py
 
 from .connection import db
+from .indexes import declare_index, declare_query
+from .user import USER_PUBLIC_PROJECTION
 from bson.objectid import ObjectId
 import datetime
 
 recruiter_col = db.recruiters
 users_col = db.users
 
+declare_index("recruiters", "user_id")
+declare_query("recruiters.by_user_id", "recruiters", {"user_id": "u"})
+
 
 class RecruiterDB:
     # ---------------------------------------------------------
@@ -91,14 +96,14 @@ class RecruiterDB:
     def get(recruiter_id: str):
         try:
             oid = ObjectId(recruiter_id)
-            r = users_col.find_one({"_id": oid})
+            r = users_col.find_one({"_id": oid}, USER_PUBLIC_PROJECTION)
             if r:
                 r["_id"] = str(r["_id"])
                 return r
         except:
             pass
 
-        r = users_col.find_one({"_id": recruiter_id})
+        r = users_col.find_one({"_id": recruiter_id}, USER_PUBLIC_PROJECTION)
         if r:
             r["_id"] = str(r["_id"])
             return r
@@ -1,12 +1,48 @@
 # app/database/recruiter_chat.py
+#
+# Chat documents carry metadata plus a copy of the last message and a
+# message counter; the messages themselves live in recruiter_messages.
+# Chats created before that split embed a `messages` array; it is moved
+# out the first time the chat is touched while CHAT_LEGACY_READS is on,
+# or in bulk by scripts/migrate_chat_messages.py.
+
+import os
 
 from .connection import db
+from .indexes import declare_index, declare_query
+from .recruiter_messages import RecruiterMessageDB
 from bson.objectid import ObjectId
 from datetime import datetime
 
-# MAIN COLLECTION (use ONLY this)
 chats_col = db.recruiter_chats
 
+# messages of history the assistant sees per turn
+CHAT_HISTORY_K = int(os.getenv("CHAT_HISTORY_K", "20"))
+# turn off once the migration has run to skip the embedded-array check
+CHAT_LEGACY_READS = os.getenv("CHAT_LEGACY_READS", "1") == "1"
+
+# list_for_user ORs the two; each branch gets its own index in updated_at order
+declare_index("recruiter_chats", [("creator_user_id", 1), ("updated_at", -1)])
+declare_index("recruiter_chats", [("participants", 1), ("updated_at", -1)])
+declare_index("recruiter_chats", [("creator_user_id", 1), ("chat_type", 1)])
+
+declare_query(
+    "recruiter_chats.for_user", "recruiter_chats",
+    {"$or": [{"creator_user_id": "u"}, {"participants": "u"}]}, sort=[("updated_at", -1)]
+)
+# what the chat list renders (legacy chats: the newest embedded message)
+CHAT_LIST_PROJECTION = {
+    "title": 1, "chat_type": 1, "type": 1, "job_role_id": 1, "updated_at": 1, "created_at": 1,
+    "last_message": 1, "message_count": 1, "messages": {"$slice": -1},
+}
+
+declare_query("recruiter_chats.global", "recruiter_chats", {"creator_user_id": "u", "chat_type": "general"})
+
+
+def _summary(msg: dict) -> dict:
+    """The part of a message the chat document keeps as last_message."""
+    return {k: msg.get(k) for k in ("message_id", "sender", "type", "text", "timestamp")}
+
 
 class RecruiterChatDB:
 
@@ -33,7 +69,8 @@ class RecruiterChatDB:
             "creator_user_id": str(creator_user_id),
             "job_role_id": job_role_id,
             "candidates": candidates,
-            "messages": [],
+            "last_message": None,
+            "message_count": 0,
             "participants": [str(p) for p in participants],
             "archived": False,
             "last_ai_summary": None,
@@ -49,9 +86,9 @@ class RecruiterChatDB:
     # Get one chat
     # -----------------------------------------------------
     @staticmethod
-    def get(chat_id: str):
+    def get(chat_id: str, projection=None):
         try:
-            chat = chats_col.find_one({"_id": ObjectId(chat_id)})
+            chat = chats_col.find_one({"_id": ObjectId(chat_id)}, projection)
         except:
             return None
 
@@ -73,24 +110,15 @@ class RecruiterChatDB:
         metadata: dict = None,
         sender_role: str = None,
     ):
-        if metadata is None:
-            metadata = {}
-
-        msg = {
-            "message_id": str(ObjectId()),
-            "sender": str(sender),
-            "sender_role": sender_role,
-            "type": message_type,      # text/file/ai
-            "text": text,
-            "metadata": metadata,
-            "timestamp": datetime.utcnow(),
-        }
-
+        RecruiterChatDB.migrate(chat_id)
+        msg = RecruiterMessageDB.add_message(
+            chat_id, sender, text, message_type=message_type, metadata=metadata, sender_role=sender_role
+        )
         chats_col.update_one(
             {"_id": ObjectId(chat_id)},
             {
-                "$push": {"messages": msg},
-                "$set": {"updated_at": datetime.utcnow()}
+                "$set": {"last_message": _summary(msg), "updated_at": datetime.utcnow()},
+                "$inc": {"message_count": 1}
             }
         )
 
@@ -100,11 +128,12 @@ class RecruiterChatDB:
     # List chats for a recruiter
     # -----------------------------------------------------
     @staticmethod
-    def list_for_user(user_id: str):
+    def list_for_user(user_id: str, projection=None):
         uid = str(user_id)
 
         cursor = chats_col.find(
-            {"$or": [{"creator_user_id": uid}, {"participants": uid}]}
+            {"$or": [{"creator_user_id": uid}, {"participants": uid}]},
+            projection
         ).sort("updated_at", -1)
 
         chats = []
@@ -134,7 +163,8 @@ class RecruiterChatDB:
             "title": "General Assistant",
             "creator_user_id": str(recruiter_id),
             "job_role_id": None,
-            "messages": [],
+            "last_message": None,
+            "message_count": 0,
             "participants": [str(recruiter_id)],
             "archived": False,
             "last_ai_summary": None,
@@ -147,18 +177,56 @@ class RecruiterChatDB:
         return doc
 
     # -----------------------------------------------------
-    # Contextual Chat Summary Helper
+    # Paged message history, oldest first
     # -----------------------------------------------------
     @staticmethod
-    def format_chat_history(chat_id: str):
-        chat = chats_col.find_one({"_id": ObjectId(chat_id)})
-        if not chat:
-            return ""
+    def history(chat_id: str, limit: int = 50, before: str = None):
+        """(messages, next_before); see RecruiterMessageDB.page."""
+        RecruiterChatDB.migrate(chat_id)
+        return RecruiterMessageDB.page(chat_id, limit, before)
 
+    # -----------------------------------------------------
+    # Contextual Chat Summary Helper
+    # -----------------------------------------------------
+    @staticmethod
+    def format_chat_history(chat_id: str, limit: int = None):
+        """The last `limit` (CHAT_HISTORY_K) messages as prompt text."""
+        RecruiterChatDB.migrate(chat_id)
         history = ""
-        for m in chat.get("messages", []):
-            sender = "Recruiter" if m.get("sender_role") != "ai" else "Assistant"
+        for m in RecruiterMessageDB.get_messages(chat_id, limit or CHAT_HISTORY_K):
+            is_ai = m.get("type") == "assistant" or m.get("sender_role") == "ai"
+            sender = "Assistant" if is_ai else "Recruiter"
             history += f"{sender}: {m.get('text')}\n"
 
         return history
 
+    # -----------------------------------------------------
+    # Move a legacy chat's embedded messages to recruiter_messages
+    # -----------------------------------------------------
+    @staticmethod
+    def migrate(chat_id: str, force: bool = False):
+        """Number of messages moved; a no-op for chats created since the split."""
+        if not (CHAT_LEGACY_READS or force):
+            return 0
+        try:
+            oid = ObjectId(chat_id)
+        except Exception:
+            return 0
+        chat = chats_col.find_one({"_id": oid, "messages": {"$exists": True}}, {"messages": 1})
+        if not chat:
+            return 0
+        messages = chat.get("messages") or []
+        RecruiterMessageDB.import_messages(chat_id, messages)
+        update = {
+            "$unset": {"messages": ""},
+            "$set": {"message_count": len(messages)},
+        }
+        if messages:
+            update["$set"]["last_message"] = _summary(messages[-1])
+        chats_col.update_one({"_id": oid, "messages": {"$exists": True}}, update)
+        return len(messages)
+
+    @staticmethod
+    def unmigrated(limit: int = 200):
+        return [str(c["_id"]) for c in chats_col.find({"messages": {"$exists": True}}, {"_id": 1}).limit(limit)]
+
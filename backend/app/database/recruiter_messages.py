@@ -1,32 +1,95 @@
 from datetime import datetime
 from bson import ObjectId
+from pymongo import UpdateOne
 from app.database.connection import db
+from .indexes import declare_index, declare_query
+
+messages_col = db.recruiter_messages
+
+# _id breaks timestamp ties so paging never skips or repeats a message
+declare_index("recruiter_messages", [("chat_id", 1), ("timestamp", 1), ("_id", 1)])
+declare_query(
+    "recruiter_messages.history", "recruiter_messages", {"chat_id": "c"}, sort=[("timestamp", -1), ("_id", -1)]
+)
+declare_query(
+    "recruiter_messages.history_page", "recruiter_messages",
+    {"chat_id": "c", "$or": [
+        {"timestamp": {"$lt": datetime(2000, 1, 1)}},
+        {"timestamp": datetime(2000, 1, 1), "_id": {"$lt": ObjectId("0" * 24)}},
+    ]},
+    sort=[("timestamp", -1), ("_id", -1)],
+)
+
+
+def _public(doc: dict) -> dict:
+    doc["message_id"] = str(doc.pop("_id"))
+    return doc
+
 
 class RecruiterMessageDB:
 
     @staticmethod
-    def add_message(chat_id, sender, text):
+    def add_message(chat_id, sender, text, message_type="text", metadata=None, sender_role=None):
         doc = {
-            "chat_id": chat_id,
-            "sender": sender,  # "recruiter" or "ai"
+            "_id": ObjectId(),
+            "chat_id": str(chat_id),
+            "sender": str(sender),
+            "sender_role": sender_role,
+            "type": message_type,  # user/assistant/text/file
             "text": text,
+            "metadata": metadata or {},
             "timestamp": datetime.utcnow()
         }
-        db.recruiter_messages.insert_one(doc)
+        messages_col.insert_one(doc)
+        return _public(doc)
 
     @staticmethod
     def get_messages(chat_id, limit=20):
-        return list(
-            db.recruiter_messages
-              .find({"chat_id": chat_id})
-              .sort("timestamp", -1)
-              .limit(limit)
-        )[::-1]  # reverse to chronological order
+        """The last `limit` messages, oldest first."""
+        cur = messages_col.find({"chat_id": str(chat_id)}).sort([("timestamp", -1), ("_id", -1)]).limit(limit)
+        return [_public(m) for m in cur][::-1]  # reverse to chronological order
+
+    @staticmethod
+    def page(chat_id, limit=50, before=None):
+        """
+        (messages oldest first, next_before): `limit` messages older than
+        the message_id `before` (newest ones when None). next_before pages
+        further back and is None at the start of the chat.
+        """
+        query = {"chat_id": str(chat_id)}
+        if before:
+            if not ObjectId.is_valid(before):
+                raise ValueError("Invalid message cursor")
+            anchor = messages_col.find_one({"_id": ObjectId(before), "chat_id": str(chat_id)}, {"timestamp": 1})
+            if not anchor:
+                raise ValueError("Invalid message cursor")
+            query["$or"] = [
+                {"timestamp": {"$lt": anchor["timestamp"]}},
+                {"timestamp": anchor["timestamp"], "_id": {"$lt": anchor["_id"]}},
+            ]
+        # one extra row tells whether an older page exists
+        cur = messages_col.find(query).sort([("timestamp", -1), ("_id", -1)]).limit(limit + 1)
+        rows = [_public(m) for m in cur]
+        next_before = rows[limit - 1]["message_id"] if len(rows) > limit else None
+        return rows[:limit][::-1], next_before
 
     @staticmethod
     def get_full_chat(chat_id):
-        return list(
-            db.recruiter_messages
-              .find({"chat_id": chat_id})
-              .sort("timestamp", 1)
-        )
+        return [_public(m) for m in messages_col.find({"chat_id": str(chat_id)}).sort([("timestamp", 1), ("_id", 1)])]
+
+    @staticmethod
+    def import_messages(chat_id, messages: list):
+        """Copy messages embedded in a legacy chat document; upserts make a rerun a no-op."""
+        ops = []
+        for m in messages:
+            doc = {k: v for k, v in m.items() if k != "message_id"}
+            doc["chat_id"] = str(chat_id)
+            mid = m.get("message_id")
+            if mid and ObjectId.is_valid(mid):
+                key = {"_id": ObjectId(mid)}
+            else:
+                key = {"chat_id": doc["chat_id"], "timestamp": m.get("timestamp"), "sender": m.get("sender")}
+            ops.append(UpdateOne(key, {"$setOnInsert": doc}, upsert=True))
+        if ops:
+            messages_col.bulk_write(ops, ordered=False)
+        return len(ops)
@@ -0,0 +1,28 @@
+# app/database/role_catalog.py
+
+from .connection import db
+import datetime
+
+role_catalog_col = db.role_catalog
+
+
+class RoleCatalogDB:
+    """LLM-generated skills for roles missing from the static catalog, keyed by normalized name."""
+
+    @staticmethod
+    def list_all():
+        return list(role_catalog_col.find({}, {"title": 1, "required_skills": 1, "preferred_skills": 1}))
+
+    @staticmethod
+    def put(key: str, title: str, required_skills: list, preferred_skills: list, source: str = "llm"):
+        role_catalog_col.update_one(
+            {"_id": key},
+            {"$set": {
+                "title": title,
+                "required_skills": required_skills,
+                "preferred_skills": preferred_skills,
+                "source": source,
+                "updated_at": datetime.datetime.utcnow(),
+            }},
+            upsert=True
+        )
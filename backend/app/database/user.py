@@ -1,10 +1,17 @@
 from .connection import db
+from .indexes import declare_index, declare_query
 from bson.objectid import ObjectId
 import datetime
 from typing import Optional
 
 users_col = db.users
 
+# everything but the secrets; for reads whose result can reach a response
+USER_PUBLIC_PROJECTION = {"hashed_password": 0, "verification_code": 0}
+
+declare_index("users", "email")
+declare_query("users.by_email", "users", {"email": "a@b.c"})
+
 def create_user_doc(email: str, hashed_password: str, role: str, name: Optional[str]=None, linked_id: Optional[str]=None):
     doc = {
         "email": email.lower(),
@@ -25,9 +32,9 @@ def get_user_by_email(email: str):
     r["_id"] = str(r["_id"])
     return r
 
-def get_user_by_id(user_id: str):
+def get_user_by_id(user_id: str, projection=None):
     try:
-        r = users_col.find_one({"_id": ObjectId(user_id)})
+        r = users_col.find_one({"_id": ObjectId(user_id)}, projection)
         if not r:
             return None
         r["_id"] = str(r["_id"])
@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
@@ -15,8 +16,13 @@ from .routers import (
     recruiter_router,
     candidate_router,
     feedback_router,
+    batch_job_router,
 )
 from .auth import auth
+from .ai.batch_jobs import resume_unfinished_jobs
+from .ai.extraction_service import start_extraction_service, stop_extraction_service
+from .ai.llm_gateway import stop_llm_gateway
+from .database.indexes import provision_indexes
 
 app = FastAPI()
 
@@ -41,6 +47,34 @@ app.include_router(interview_router.router)
 app.include_router(recruiter_router.router)
 app.include_router(candidate_router.router)
 app.include_router(feedback_router.router)
+app.include_router(batch_job_router.router)
+
+
+@app.on_event("startup")
+async def create_indexes():
+    # first, so the hooks below already query indexed collections
+    await asyncio.to_thread(provision_indexes)
+
+
+@app.on_event("startup")
+async def start_extraction():
+    # before resuming batch jobs, so they extract on the pool too
+    start_extraction_service()
+
+
+@app.on_event("startup")
+async def resume_batch_jobs():
+    await resume_unfinished_jobs()
+
+
+@app.on_event("shutdown")
+async def stop_extraction():
+    stop_extraction_service()
+
+
+@app.on_event("shutdown")
+async def stop_llm():
+    stop_llm_gateway()
 
 
 
@@ -1,15 +1,19 @@
 from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
 from typing import List, Optional
-import os
-from tempfile import NamedTemporaryFile
+import asyncio
 
 from ..auth.auth import require_role
 from ..ai.self_analysis import run_self_analysis
+from ..ai.fused_analysis import analyze_mode
 from ..ai.batch_processing import process_batch
 from ..ai.duplicate_detector import check_duplicate
 from ..database.candidate import CandidateDB
 from ..database.job_description import JobRoleDB
-from ..ai.resume_parser import extract_text
+from ..ai.resume_parser import extract_text_async
+from ..ai.llm_cache import cache_stats
+from ..ai.extraction_service import extraction_stats
+from ..ai.llm_gateway import llm_stats
+from ..ai.upload_spool import read_upload, spooled_many
 
 router = APIRouter(prefix="/api/ai", tags=["ai"])
 
@@ -22,25 +26,17 @@ async def api_self_analysis(
 ):
 
     jd_text = None
-    tmp_path = None
 
     if jd_file:
-        with NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            tmp.write(await jd_file.read())
-            tmp_path = tmp.name
-
-        try:
-            jd_text = extract_text(tmp_path)
-        finally:
-            try:
-                os.remove(tmp_path)
-            except:
-                pass
-
-    res = run_self_analysis(
+        up = await read_upload(jd_file)
+        # this endpoint has always treated JD uploads as PDF
+        jd_text = await extract_text_async(up.data, ".pdf")
+
+    res = await run_self_analysis(
         user_id=current_user["_id"],
         jd_text=jd_text,
         target_role=target_role,
+        mode=analyze_mode("self_analysis"),
     )
 
     if "error" in res:
@@ -63,6 +59,8 @@ async def api_self_analysis(
             "recommendations": feedback.get("recommendations", []),
         },
         "learning_path": res.get("learning_path"),
+        "analysis_mode": res.get("analysis_mode"),
+        "latency_ms": res.get("latency_ms"),
         "timestamp": res.get("timestamp"),
     }
 
@@ -73,47 +71,29 @@ async def api_batch_process(
     job_role_id: Optional[str] = Form(None),
     recruiter_id: Optional[str] = Form(None),
 ):
-    paths = []
-
-    try:
-        for file in files:
-            with NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                tmp.write(await file.read())
-                paths.append(tmp.name)
-
+    async with spooled_many(files, suffix=".pdf") as ups:
         job_role = JobRoleDB.get(job_role_id) if job_role_id else None
-        results = process_batch(paths, job_role=job_role, recruiter_id=recruiter_id)
+        results = await process_batch(
+            [up.path for up in ups],
+            job_role=job_role,
+            recruiter_id=recruiter_id,
+            file_hashes=[up.file_hash for up in ups],
+        )
 
-        return {"ok": True, "results": results}
-
-    finally:
-        for p in paths:
-            try:
-                os.remove(p)
-            except:
-                pass
+    return {"ok": True, "results": results}
 
 @router.post("/detect_duplicate")
 async def api_detect_duplicate(file: UploadFile = File(...)):
 
-    with NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-        tmp.write(await file.read())
-        path = tmp.name
-
-    def db_check_fn(hash_val, return_texts=False):
+    def db_check_fn(hash_val, lsh_bands=None):
         if hash_val:
             return CandidateDB.find_by_hash(hash_val)
-        if return_texts:
-            return CandidateDB.find_texts()
+        if lsh_bands:
+            return CandidateDB.find_by_lsh_bands(lsh_bands)
         return None
 
-    try:
-        return check_duplicate(path, db_check_fn)
-    finally:
-        try:
-            os.remove(path)
-        except:
-            pass
+    up = await read_upload(file)
+    return await asyncio.to_thread(check_duplicate, up.data, db_check_fn, up.file_hash, ".pdf")
 
 @router.post("/learning_path")
 async def api_learning_path(
@@ -121,7 +101,22 @@ async def api_learning_path(
     candidate_skills: List[str] = Form(...),
     target_role: Optional[str] = Form(None),
 ):
-    from ..ai.learning_path import generate_learning_path
+    from ..ai.learning_path import generate_learning_path_async
+
+    res = await generate_learning_path_async(skill_gaps, candidate_skills, target_role)
+    return {"ok": True, "learning_path": res}
+
+
+@router.get("/cache/stats")
+async def api_cache_stats(current_user=Depends(require_role("recruiter"))):
+    return {"ok": True, "caches": cache_stats()}
+
+
+@router.get("/extraction/stats")
+async def api_extraction_stats(current_user=Depends(require_role("recruiter"))):
+    return {"ok": True, "extraction": extraction_stats()}
+
 
-    res = generate_learning_path(skill_gaps, candidate_skills, target_role)
-    return {"ok": True, "learning_path": res}
\ No newline at end of file
+@router.get("/llm/stats")
+async def api_llm_stats(current_user=Depends(require_role("recruiter"))):
+    return {"ok": True, "llm": llm_stats()}
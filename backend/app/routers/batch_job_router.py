@@ -0,0 +1,54 @@
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+
+from ..auth.auth import require_role, get_current_user
+from ..ai.batch_jobs import submit_job, job_progress, stream_results
+from ..database.batch_job import BatchJobDB
+from ..database.jobrole import JobRoleDB
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+def _get_owned_job(job_id: str, current_user: dict, with_results: bool = False):
+    job = BatchJobDB.get(job_id, with_results=with_results)
+    if not job or (job.get("recruiter_id") and job["recruiter_id"] != current_user["_id"]):
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return job
+
+
+@router.post("/shortlist")
+async def submit_shortlist_job(
+    files: List[UploadFile] = File(...),
+    job_role_id: str = Form(...),
+    max_in_flight: Optional[int] = Form(None),
+    current_user=Depends(require_role("recruiter"))
+):
+    if not JobRoleDB.get(job_role_id, projection=["_id"]):
+        raise HTTPException(status_code=404, detail="Job role not found")
+
+    job = await submit_job("shortlist", files, job_role_id, current_user["_id"], max_in_flight)
+    return {"ok": True, "job_id": job["_id"], "status": job["status"], "total": job["total"]}
+
+
+@router.post("/batch_process")
+async def submit_process_job(
+    files: List[UploadFile] = File(...),
+    job_role_id: Optional[str] = Form(None),
+    max_in_flight: Optional[int] = Form(None),
+    current_user=Depends(require_role("recruiter"))
+):
+    job = await submit_job("process", files, job_role_id, current_user["_id"], max_in_flight)
+    return {"ok": True, "job_id": job["_id"], "status": job["status"], "total": job["total"]}
+
+
+@router.get("/{job_id}")
+def get_job_progress(job_id: str, current_user=Depends(get_current_user)):
+    job = _get_owned_job(job_id, current_user)
+    return {"ok": True, "job": job_progress(job)}
+
+
+@router.get("/{job_id}/results")
+def get_job_results(job_id: str, current_user=Depends(get_current_user)):
+    _get_owned_job(job_id, current_user)
+    return StreamingResponse(stream_results(job_id), media_type="application/x-ndjson")
@@ -6,7 +6,7 @@ router = APIRouter(prefix="/candidate", tags=["candidate"])
 
 @router.get("/feedback")
 def get_candidate_feedback(current_user = Depends(require_role("candidate"))):
-    candidate = CandidateDB.get(current_user["_id"])
+    candidate = CandidateDB.get(current_user["_id"], projection=["feedback"])
     if not candidate:
         raise HTTPException(404, "Candidate not found")
 
@@ -29,7 +29,7 @@ def get_candidate_feedback(current_user = Depends(require_role("candidate"))):
 
 @router.get("/feedback")
 def get_candidate_feedback(current_user = Depends(require_role("candidate"))):
-    cand = CandidateDB.get(current_user["_id"])
+    cand = CandidateDB.get(current_user["_id"], projection=["final_feedback"])
     return {
         "ok": True,
         "feedback": cand.get("final_feedback", [])
@@ -11,7 +11,8 @@ router = APIRouter(prefix="/interview", tags=["interview"])
 def list_interview_sessions(
     current_user = Depends(require_role("candidate"))
 ):
-    sessions = InterviewChatDB.list_for_candidate(current_user["_id"])
+    # the list shows each session's latest message; GET /interview/{session_id} has the full log
+    sessions = InterviewChatDB.list_for_candidate(current_user["_id"], {"messages": {"$slice": -1}})
     return {"ok": True, "sessions": sessions}
 
 
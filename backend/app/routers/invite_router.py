@@ -14,7 +14,7 @@ def send_invite(
     current_user=Depends(require_role("recruiter"))
 ):
   
-    candidate = CandidateDB.get(candidate_id)
+    candidate = CandidateDB.get(candidate_id, projection=["_id"])
     if not candidate:
         raise HTTPException(404, "Candidate not found")
 
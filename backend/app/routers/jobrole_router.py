@@ -1,13 +1,13 @@
 from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
 from typing import Optional, List
 from pydantic import BaseModel
-import os
-import tempfile
 
 from ..auth.auth import require_role, get_current_user
-from ..ai.jd_parser import parse_jd
+from ..ai.jd_parser import parse_jd_async
+from ..ai.upload_spool import read_upload
 from ..database.jobrole import JobRoleDB
 from ..database.recruiter import RecruiterDB
+from ..database.candidate_analysis import CandidateAnalysisDB
 
 router = APIRouter(prefix="/jobrole", tags=["jobrole"])
 
@@ -30,25 +30,11 @@ async def create_jobrole(
     recruiter_profile = RecruiterDB.get_by_user_id(current_user["_id"])
     company_name = recruiter_profile.get("company_name") if recruiter_profile else None
 
-    jd_input: str
-
     if jd_file:
-        suffix = os.path.splitext(jd_file.filename)[1]
-        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-        tmp_path = tmp.name
-        tmp.write(await jd_file.read())
-        tmp.close()
-        jd_input = tmp_path
+        up = await read_upload(jd_file)
+        parsed = await parse_jd_async(up.data)
     else:
-        jd_input = jd_text
-
-    parsed = parse_jd(jd_input)
-
-    if jd_file:
-        try:
-            os.remove(jd_input)
-        except Exception:
-            pass
+        parsed = await parse_jd_async(jd_text)
 
     job_doc = {
         "title": title,
@@ -81,24 +67,32 @@ async def parse_jd_endpoint(
         )
 
     if jd_file:
-        suffix = os.path.splitext(jd_file.filename)[1]
-        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-        tmp_path = tmp.name
-        tmp.write(await jd_file.read())
-        tmp.close()
-        jd_input = tmp_path
+        up = await read_upload(jd_file)
+        parsed = await parse_jd_async(up.data)
     else:
-        jd_input = jd_text
+        parsed = await parse_jd_async(jd_text)
 
-    parsed = parse_jd(jd_input)
+    return {"ok": True, "parsed": parsed}
 
-    if jd_file:
-        try:
-            os.remove(jd_input)
-        except Exception:
-            pass
 
-    return {"ok": True, "parsed": parsed}
+@router.get("/{job_role_id}/ranking")
+def get_ranking(
+    job_role_id: str,
+    limit: int = 20,
+    min_score: Optional[float] = None,
+    cursor: Optional[str] = None,
+    current_user = Depends(require_role("recruiter"))
+):
+    """Top candidates for a job role by match then ATS score; pass next_cursor back for the next page."""
+    limit = max(1, min(limit, 100))
+    try:
+        rows, next_cursor = CandidateAnalysisDB.top_n(
+            job_role_id, limit, min_score=min_score, cursor=cursor,
+            fields=("semantic", "skill_gaps", "timestamp"),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"ok": True, "count": len(rows), "candidates": rows, "next_cursor": next_cursor}
 
 
 @router.get("/get/{job_role_id}")
@@ -125,7 +119,7 @@ def update_jobrole(
     payload: JobRoleUpdate,
     current_user = Depends(require_role("recruiter")),
 ):
-    job = JobRoleDB.get(job_role_id)
+    job = JobRoleDB.get(job_role_id, projection=["recruiter_id"])
     if not job:
         raise HTTPException(status_code=404, detail="Job role not found")
 
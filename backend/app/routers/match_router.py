@@ -1,40 +1,33 @@
-import os
 import json
+import asyncio
 import datetime
-import tempfile
 from typing import List, Optional, Literal
 
 from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
 
-import google.generativeai as genai
-
 from ..auth.auth import require_role, get_current_user
 from ..database.candidate import CandidateDB, candidates_col
 from ..database.jobrole import JobRoleDB
 from ..database.invite import InviteDB
 from ..database.recruiter_chat import RecruiterChatDB
-from ..database.feedback import FeedbackDB
 
-from ..ai.resume_parser import parse_resume
-from ..ai.match_score import compute_match_score
+from ..ai.resume_parser import extract_text_async, parse_resume_with_ai_async
+from ..ai.match_score import compute_match_score_async, deterministic_score
 from ..ai.ats_scoring import compute_ats_score
-from ..ai.semantic_fit import explain_semantic_fit
+from ..ai.semantic_fit import explain_semantic_fit_async
+from ..ai.fused_analysis import analyze_mode, analyze_resume_for_job
+from ..ai.fanout import Timings, run_branch
+from ..ai.upload_spool import read_upload
+from ..ai.resume_pipeline import run_shortlist_pipeline, known_file, new_candidate_doc
 
 router = APIRouter(prefix="/match", tags=["match"])
 
-_GENAI_KEY = os.getenv("GEMINI_API_KEY")
-if _GENAI_KEY:
-    try:
-        genai.configure(api_key=_GENAI_KEY)
-    except Exception:
-        _GENAI_KEY = None
-
 
 def _get_or_create_shortlist_chat(recruiter_id: str, job_role: dict):
     job_role_id = job_role.get("_id")
     job_title = job_role.get("title", "Job Role")
 
-    chats = RecruiterChatDB.list_for_user(recruiter_id) or []
+    chats = RecruiterChatDB.list_for_user(recruiter_id, {"job_role_id": 1}) or []
     for c in chats:
         if c.get("job_role_id") == job_role_id:
             return c
@@ -54,45 +47,71 @@ async def score_single(
     job_role_id: str = Form(...),
     current_user=Depends(require_role("recruiter"))
 ):
+    timings = Timings()
     job = JobRoleDB.get(job_role_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job role not found")
 
-    suffix = os.path.splitext(file.filename)[1]
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-    tmp_path = tmp.name
-    tmp.write(await file.read())
-    tmp.close()
-
-    parsed = parse_resume(tmp_path)
+    up = await read_upload(file)
+    # same file scored before: reuse its candidate and parse, no extraction/parse call
+    known = known_file(up.file_hash)
+    if known:
+        parsed, text = known[1], known[1].get("raw_text", "")
+    else:
+        with timings.track("extract"):
+            parsed, text = None, await extract_text_async(up.data, up.filename)
+
+    mode = analyze_mode("score_single")
+    fused = None
+    if mode == "fused" and text.strip():
+        fused = await run_branch(timings, "fused_analysis", analyze_resume_for_job(text, job, parsed))
+    if fused is None:
+        mode = "multi"
+
+    if parsed is None:
+        if fused:
+            parsed = fused["parsed"]
+        elif text.strip():
+            with timings.track("parse"):
+                parsed = await parse_resume_with_ai_async(text)
+        else:
+            parsed = {"error": "Could not extract text from file.", "raw_text": ""}
 
-    try:
-        os.remove(tmp_path)
-    except Exception:
-        pass
+    if known:
+        candidate_id = known[0]
+    else:
+        if not parsed.get("email"):
+            raise HTTPException(status_code=400, detail="Resume must include an email address")
 
-    if not parsed.get("email"):
-        raise HTTPException(status_code=400, detail="Resume must include an email address")
+        email = parsed["email"].lower()
 
-    email = parsed["email"].lower()
+        existing = CandidateDB.find_by_email(email)
+        if existing:
+            candidate_id = existing["_id"]
+        else:
+            created = CandidateDB.insert_candidate_doc(new_candidate_doc(email, parsed, up.file_hash))
+            candidate_id = created["_id"]
 
-    existing = CandidateDB.find_by_email(email)
-    if existing:
-        candidate_id = existing["_id"]
+    if fused:
+        match_result, semantic = fused["match"], fused["semantic"]
     else:
-        created = CandidateDB.insert_candidate_doc({
-            "email": email,
-            "name": parsed.get("name"),
-            "skills": parsed.get("skills", []),
-            "projects": parsed.get("projects", []),
-            "parsed_text": parsed.get("raw_text", "") or parsed.get("parsed_text", ""),
-            "experience_years": parsed.get("experience_years", 0),
-            "analysis": [],
-            "linked_user_id": None
-        })
-        candidate_id = created["_id"]
-
-    match_result = compute_match_score(parsed, job)
+        # independent calls: score and semantic fit run side by side
+        # (compute_match_score_async may fill job["experience_level"], so semantic fit gets a copy)
+        match_result, semantic = await asyncio.gather(
+            run_branch(
+                timings, "match_score", compute_match_score_async(parsed, job),
+                fallback=lambda: deterministic_score(parsed, job),
+            ),
+            run_branch(
+                timings, "semantic_fit", explain_semantic_fit_async(parsed, dict(job)),
+                fallback=lambda: {
+                    "fit_summary": "semantic analysis failed",
+                    "strengths": [],
+                    "weaknesses": [],
+                    "reasoning_score": 0
+                },
+            ),
+        )
     match_score = match_result.get("score", 0)
 
     ats = compute_ats_score(
@@ -100,21 +119,12 @@ async def score_single(
         job.get("required_skills", []) or job.get("parsed", {}).get("required_skills", [])
     )
 
-    try:
-        semantic = explain_semantic_fit(parsed, job)
-    except Exception:
-        semantic = {
-            "fit_summary": "semantic analysis failed",
-            "strengths": [],
-            "weaknesses": [],
-            "reasoning_score": 0
-        }
-
     analysis = {
         "job_role_id": job_role_id,
         "match_score": match_score,
         "match_components": match_result.get("components"),
         "match_method": match_result.get("method"),
+        "analysis_mode": mode,
         "ats_score": ats,
         "semantic": semantic,
         "skill_gaps": [
@@ -132,7 +142,8 @@ async def score_single(
     return {
         "ok": True,
         "candidate_id": candidate_id,
-        "analysis": analysis
+        "analysis": analysis,
+        "latency_ms": timings.report(),
     }
 
 
@@ -140,96 +151,25 @@ async def score_single(
 async def shortlist_batch(
     files: List[UploadFile] = File(...),
     job_role_id: str = Form(...),
+    max_in_flight: Optional[int] = Form(None),
     current_user=Depends(require_role("recruiter"))
 ):
     job = JobRoleDB.get(job_role_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job role not found")
 
-    shortlisted = []
-    rejected = []
     invite_links = []
 
     chat = _get_or_create_shortlist_chat(current_user["_id"], job)
     chat_id = chat["_id"]
 
-    for file in files:
-        suffix = os.path.splitext(file.filename)[1]
-        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-        tmp_path = tmp.name
-        tmp.write(await file.read())
-        tmp.close()
-
-        parsed = parse_resume(tmp_path)
-
-        try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
-
-        if not parsed.get("email"):
-            rejected.append({
-                "candidate_id": None,
-                "email": None,
-                "name": parsed.get("name"),
-                "match_score": 0,
-                "ats_score": 0,
-                "feedback": "Email not detected in resume. Unable to process candidate."
-            })
-            continue
-
-        email = parsed["email"].lower()
-
-        existing = CandidateDB.find_by_email(email)
-        if existing:
-            candidate_id = existing["_id"]
-        else:
-            new_cand = CandidateDB.insert_candidate_doc({
-                "email": email,
-                "name": parsed.get("name"),
-                "skills": parsed.get("skills", []),
-                "projects": parsed.get("projects", []),
-                "parsed_text": parsed.get("raw_text", "") or parsed.get("parsed_text", ""),
-                "experience_years": parsed.get("experience_years", 0),
-                "analysis": [],
-                "linked_user_id": None
-            })
-            candidate_id = new_cand["_id"]
-
-        match_result = compute_match_score(parsed, job)
-        match_score = match_result.get("score", 0)
-
-        ats = compute_ats_score(
-            parsed.get("parsed_text") or parsed.get("raw_text", ""),
-            job.get("required_skills", []) or job.get("parsed", {}).get("required_skills", [])
-        )
-
-        CandidateDB.add_submission(candidate_id, job_role_id, current_user["_id"])
-
-        if match_score >= 45:
-            shortlisted.append({
-                "candidate_id": candidate_id,
-                "email": email,
-                "name": parsed.get("name"),
-                "match_score": match_score,
-                "ats_score": ats
-            })
-        else:
-            feedback = "We could not progress your application further for this role."
-            FeedbackDB.create_draft(
-                candidate_id=candidate_id,
-                recruiter_id=current_user["_id"],
-                job_role_id=job_role_id,
-                feedback_text=feedback
-            )
-            rejected.append({
-                "candidate_id": candidate_id,
-                "email": email,
-                "name": parsed.get("name"),
-                "match_score": match_score,
-                "ats_score": ats,
-                "feedback": feedback
-            })
+    shortlisted, rejected = await run_shortlist_pipeline(
+        files,
+        job,
+        job_role_id,
+        current_user["_id"],
+        max_in_flight=max_in_flight,
+    )
 
     return {
         "ok": True,
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from ..auth.auth import require_role
 from ..database.candidate import CandidateDB
-from ..ai.resume_parser import parse_resume
-import os
-import tempfile
+from ..ai.resume_parser import parse_resume_async
+from ..ai.upload_spool import read_upload
+from ..ai.resume_pipeline import known_file
 
 router = APIRouter(prefix="/api/profile", tags=["profile"])
 
@@ -17,7 +17,7 @@ async def get_profile(current_user = Depends(require_role("candidate"))):
     if not linked_id:
         return {"ok": True, "profile": None, "message": "No candidate profile linked."}
     
-    candidate = CandidateDB.get(linked_id)
+    candidate = CandidateDB.get(linked_id, with_analyses=True)
     if not candidate:
         return {"ok": True, "profile": None, "message": "Candidate profile not found."}
     
@@ -33,22 +33,14 @@ async def update_resume(
     if not linked_id:
         raise HTTPException(status_code=400, detail="User has no linked candidate profile.")
 
-    ext = os.path.splitext(file.filename)[1] or ".txt"
-    with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
-        tmp.write(await file.read())
-        temp_path = tmp.name
-
-    parsed = parse_resume(temp_path)
-
-    try:
-        os.remove(temp_path)
-    except Exception:
-        pass
+    up = await read_upload(file)
+    known = known_file(up.file_hash)
+    parsed = known[1] if known else await parse_resume_async(up.data, up.filename)
 
     if not parsed or "error" in parsed:
         raise HTTPException(status_code=400, detail="Resume parsing failed")
 
-    updated_candidate = CandidateDB.update_resume(linked_id, parsed)
+    updated_candidate = CandidateDB.update_resume(linked_id, parsed, up.file_hash)
 
     return {
         "ok": True,
@@ -1,19 +1,23 @@
-import os
 import datetime
-import google.generativeai as genai
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 
 from ..auth.auth import require_role
-from ..database.recruiter_chat import RecruiterChatDB
+from ..database.recruiter_chat import RecruiterChatDB, CHAT_LIST_PROJECTION
 from ..database.jobrole import JobRoleDB
 from ..database.candidate import CandidateDB
+from ..ai.llm_gateway import generate_text_sync
+from ..ai.prompt_builder import fit_prompt, compact
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
-if os.getenv("GEMINI_API_KEY"):
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+CHAT_MODEL = "gemini-2.5-pro"
+# job fields the contextual prompt uses
+CONTEXT_JOB_FIELDS = [
+    "title", "required_skills", "preferred_skills", "responsibilities",
+    "experience_min", "parsed.experience_level",
+]
 
 class ChatMessage(BaseModel):
     message: str
@@ -21,14 +25,13 @@ class ChatMessage(BaseModel):
 @router.get("/list")
 def list_chats(current_user=Depends(require_role("recruiter"))):
     recruiter_id = current_user["_id"]
-    chats = RecruiterChatDB.list_for_user(recruiter_id)
+    chats = RecruiterChatDB.list_for_user(recruiter_id, CHAT_LIST_PROJECTION)
 
     formatted = []
 
     for c in chats:
-        last_message = None
-        if c.get("messages"):
-            last_message = c["messages"][-1]["text"]
+        last = c.get("last_message") or (c.get("messages") or [None])[-1]
+        last_message = last["text"] if last else None
 
         formatted.append({
             "chat_id": str(c["_id"]),
@@ -36,6 +39,7 @@ def list_chats(current_user=Depends(require_role("recruiter"))):
             "type": c.get("type"),
             "job_role_id": c.get("job_role_id"),
             "last_message": last_message,
+            "message_count": c.get("message_count"),
             "updated_at": c.get("updated_at"),
             "created_at": c.get("created_at")
         })
@@ -48,6 +52,27 @@ def list_chats(current_user=Depends(require_role("recruiter"))):
         "chats": formatted
     }
 
+@router.get("/{chat_id}/messages")
+def chat_messages(
+    chat_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    before: str = None,
+    current_user=Depends(require_role("recruiter"))
+):
+    """Newest `limit` messages (oldest first); pass next_before as `before` for older ones."""
+    chat = RecruiterChatDB.get(chat_id, projection=["creator_user_id", "participants"])
+    uid = str(current_user["_id"])
+    if not chat or (chat.get("creator_user_id") != uid and uid not in chat.get("participants", [])):
+        raise HTTPException(404, "Chat not found")
+
+    try:
+        messages, next_before = RecruiterChatDB.history(chat_id, limit, before)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    return {"ok": True, "chat_id": chat_id, "messages": messages, "next_before": next_before}
+
+
 @router.post("/general")
 def general_chat(
     body: ChatMessage,
@@ -87,11 +112,13 @@ Be concise, helpful, and professional.
 """
 
     try:
-        model = genai.GenerativeModel("gemini-2.5-pro")
-        response = model.generate_content(
-            system_prompt + "\n\n" + history + f"\nRecruiter: {msg}"
+        llm_input = fit_prompt(
+            "general_chat",
+            lambda history: system_prompt + "\n\n" + history + f"\nRecruiter: {msg}",
+            {"history": history},
+            keep_tail=("history",),
         )
-        answer = response.text.strip()
+        answer = generate_text_sync(llm_input, CHAT_MODEL)
     except Exception as e:
         answer = f"I'm having trouble responding right now. ({e})"
 
@@ -116,7 +143,7 @@ def contextual_chat(
     recruiter_id = current_user["_id"]
     msg = body.message.strip()
 
-    chat = RecruiterChatDB.get(chat_id)
+    chat = RecruiterChatDB.get(chat_id, projection=["job_role_id"])
     if not chat:
         raise HTTPException(404, "Chat not found")
 
@@ -124,7 +151,7 @@ def contextual_chat(
     if not job_role_id:
         raise HTTPException(400, "This chat is not a contextual shortlist chat.")
 
-    job = JobRoleDB.get(job_role_id)
+    job = JobRoleDB.get(job_role_id, projection=CONTEXT_JOB_FIELDS)
     if not job:
         raise HTTPException(404, "Job role not found")
 
@@ -151,7 +178,7 @@ RESPONSIBILITIES: {job.get("responsibilities")}
 EXPERIENCE: {job.get("experience_min") or job.get("parsed", {}).get("experience_level")}
 
 CANDIDATE ANALYSIS DATA:
-{json.dumps(analyses, indent=2)}
+{compact(analyses)}
 
 Your tasks:
 - Explain why a candidate was shortlisted or rejected
@@ -171,10 +198,15 @@ Be precise, structured, and recruiter-friendly.
 """
 
     try:
-        model = genai.GenerativeModel("gemini-2.5-pro")
-        llm_input = system_prompt + "\n\n" + history + f"\nRecruiter: {msg}"
-        response = model.generate_content(llm_input)
-        answer = response.text.strip()
+        llm_input = fit_prompt(
+            "contextual_chat",
+            lambda history: system_prompt + "\n\n" + history + f"\nRecruiter: {msg}",
+            {"history": history},
+            parts=(compact(analyses),),
+            baseline=(analyses, history),
+            keep_tail=("history",),
+        )
+        answer = generate_text_sync(llm_input, CHAT_MODEL)
     except Exception as e:
         answer = f"I'm having trouble responding contextually right now. ({e})"
 
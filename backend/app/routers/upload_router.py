@@ -1,12 +1,13 @@
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
 from datetime import datetime
 import os
-import tempfile
 
 from ..auth.auth import require_role, get_current_user
 from ..database.candidate import CandidateDB
 from ..database.recruiter import RecruiterDB
-from ..ai.resume_parser import parse_resume
+from ..ai.resume_parser import parse_resume_async
+from ..ai.upload_spool import read_upload, spool_upload
+from ..ai.resume_pipeline import known_file
 
 router = APIRouter(prefix="/upload", tags=["upload"])
 
@@ -20,22 +21,14 @@ async def candidate_upload_resume(
     if not candidate_id:
         raise HTTPException(status_code=400, detail="Candidate profile not linked to user.")
 
-    ext = os.path.splitext(file.filename)[1] or ".pdf"
-    with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
-        tmp.write(await file.read())
-        temp_path = tmp.name
-
-    parsed = parse_resume(temp_path)
-
-    try:
-        os.remove(temp_path)
-    except Exception:
-        pass
+    up = await read_upload(file)
+    known = known_file(up.file_hash)
+    parsed = known[1] if known else await parse_resume_async(up.data, up.filename)
 
     if not parsed or "error" in parsed:
         raise HTTPException(status_code=400, detail="Resume parsing failed.")
 
-    CandidateDB.update_parsed_resume(candidate_id, parsed)
+    CandidateDB.update_parsed_resume(candidate_id, parsed, up.file_hash)
 
     return {
         "ok": True,
@@ -53,17 +46,8 @@ async def recruiter_upload_resume(
     if not recruiter_id:
         raise HTTPException(status_code=400, detail="Recruiter profile not linked to user.")
 
-    ext = os.path.splitext(file.filename)[1] or ".pdf"
-    with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
-        tmp.write(await file.read())
-        temp_path = tmp.name
-
-    parsed = parse_resume(temp_path)
-
-    try:
-        os.remove(temp_path)
-    except Exception:
-        pass
+    up = await read_upload(file)
+    parsed = await parse_resume_async(up.data, up.filename)
 
     if not parsed or "error" in parsed:
         raise HTTPException(status_code=400, detail="Resume parsing failed.")
@@ -82,13 +66,11 @@ async def upload_temp_file(
     file: UploadFile = File(...),
     current_user=Depends(get_current_user)
 ):
-    ext = os.path.splitext(file.filename)[1] or ".tmp"
-    with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
-        tmp.write(await file.read())
-        temp_path = tmp.name
+    # kept on disk for a later request, so not removed here
+    up = await spool_upload(file, suffix=os.path.splitext(file.filename)[1] or ".tmp")
 
     return {
         "ok": True,
-        "file_path": temp_path,
+        "file_path": up.path,
         "message": "File uploaded temporarily."
     }
@@ -0,0 +1,80 @@
+"""
+Per-turn chat reads as a conversation grows: the legacy layout (messages
+embedded in the chat document, the whole array loaded and concatenated
+each turn) vs recruiter_messages (the last CHAT_HISTORY_K messages read
+through the (chat_id, timestamp) index, last_message on the chat).
+
+Seeds one chat per size in both layouts into the configured MongoDB and
+removes them afterwards.
+
+Run from backend/:
+    python -m benchmarks.bench_chat_history [max_messages] [repeats]
+"""
+import os
+import sys
+import time
+import datetime
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+
+from bson.objectid import ObjectId
+
+from app.database.indexes import ensure_indexes
+from app.database.recruiter_chat import RecruiterChatDB, CHAT_LIST_PROJECTION, chats_col
+from app.database.recruiter_messages import messages_col
+
+TEXT = "Compare the top three candidates for this role on system design and API experience. " * 4
+
+
+def seed(owner, n):
+    start = datetime.datetime.utcnow() - datetime.timedelta(seconds=n)
+    msgs = [{
+        "message_id": str(ObjectId()), "sender": owner, "type": "user" if i % 2 == 0 else "assistant",
+        "text": TEXT, "metadata": {}, "timestamp": start + datetime.timedelta(seconds=i),
+    } for i in range(n)]
+    legacy_id = chats_col.insert_one({"creator_user_id": owner, "title": f"legacy {n}", "messages": msgs}).inserted_id
+    chat_id = chats_col.insert_one({
+        "creator_user_id": owner, "title": f"split {n}", "last_message": msgs[-1], "message_count": n,
+    }).inserted_id
+    messages_col.insert_many([
+        {**{k: v for k, v in m.items() if k != "message_id"}, "chat_id": str(chat_id)} for m in msgs
+    ])
+    return legacy_id, str(chat_id)
+
+
+def legacy_history(chat_id):
+    chat = chats_col.find_one({"_id": chat_id})
+    return "".join(f"{m['type']}: {m['text']}\n" for m in chat.get("messages", []))
+
+
+def timed(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main(max_messages=5000, repeats=5):
+    ensure_indexes("recruiter_messages")
+    owner = f"bench-{ObjectId()}"
+    sizes = [n for n in (10, 100, 1000, 5000, 20000) if n <= max_messages]
+    try:
+        print(f"{'messages':>9} {'legacy turn ms':>15} {'split turn ms':>14} {'legacy list ms':>15} {'split list ms':>14}")
+        for n in sizes:
+            legacy_id, chat_id = seed(owner, n)
+            legacy_turn = timed(lambda: legacy_history(legacy_id), repeats)
+            split_turn = timed(lambda: RecruiterChatDB.format_chat_history(chat_id), repeats)
+            legacy_list = timed(lambda: list(chats_col.find({"_id": legacy_id})), repeats)
+            split_list = timed(lambda: list(chats_col.find({"_id": ObjectId(chat_id)}, CHAT_LIST_PROJECTION)), repeats)
+            print(f"{n:9} {legacy_turn:15.2f} {split_turn:14.2f} {legacy_list:15.2f} {split_list:14.2f}")
+    finally:
+        ids = [str(c["_id"]) for c in chats_col.find({"creator_user_id": owner}, {"_id": 1})]
+        messages_col.delete_many({"chat_id": {"$in": ids}})
+        chats_col.delete_many({"creator_user_id": owner})
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
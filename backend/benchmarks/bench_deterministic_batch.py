@@ -0,0 +1,74 @@
+"""
+Compare deterministic_score (one candidate at a time) with
+deterministic_score_batch on synthetic candidates.
+
+Run from backend/:
+    python -m benchmarks.bench_deterministic_batch [n_candidates]
+"""
+import os
+import sys
+import time
+import random
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+
+from app.ai.match_score import deterministic_score, deterministic_score_batch
+
+SKILLS = [
+    "Python", "SQL", "Pandas", "NumPy", "Docker", "Kubernetes", "AWS", "React",
+    "Node.js", "FastAPI", "TensorFlow", "PyTorch", "Java", "Go", "Redis",
+    "MongoDB", "Terraform", "Linux", "Git", "Spark", "Airflow", "Tableau",
+]
+WORDS = "built designed deployed pipeline service api model dashboard data platform scalable team".split()
+
+
+def make_job(responsibilities=True):
+    return {
+        "title": "Backend Developer",
+        "required_skills": ["Python", "FastAPI", "SQL", "Docker", "AWS", "Redis"],
+        "preferred_skills": ["Kubernetes", "Terraform", "MongoDB", "Go"],
+        "responsibilities": [
+            "Design and build REST APIs",
+            "Deploy services on AWS with Docker",
+            "Maintain data pipelines",
+        ] if responsibilities else [],
+        "experience_level": "3-5 years",
+    }
+
+
+def make_candidates(n, seed=7):
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(n):
+        skills = rnd.sample(SKILLS, rnd.randint(2, 10))
+        text_terms = rnd.sample(SKILLS, rnd.randint(3, 12)) + rnd.choices(WORDS, k=300)
+        rnd.shuffle(text_terms)
+        out.append({
+            "skills": skills,
+            "projects": [" ".join(rnd.choices(WORDS, k=6)) for _ in range(rnd.randint(0, 3))],
+            "experience_years": rnd.choice([0, 1, 2, 3, 4, 6, 8, 2.5]),
+            "parsed_text": " ".join(text_terms),
+        })
+    return out
+
+
+def run(n, responsibilities):
+    job = make_job(responsibilities)
+    cands = make_candidates(n)
+
+    t0 = time.perf_counter()
+    single = [deterministic_score(c, job) for c in cands]
+    t1 = time.perf_counter()
+    batch = deterministic_score_batch(cands, job)
+    t2 = time.perf_counter()
+
+    assert single == batch, "batch scorer diverged from deterministic_score"
+    label = "with responsibilities" if responsibilities else "skills/text/experience only"
+    print(f"{n} candidates, {label}: per-candidate {t1 - t0:.3f}s, batch {t2 - t1:.3f}s, "
+          f"speedup {(t1 - t0) / max(t2 - t1, 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    run(n, responsibilities=False)
+    run(n, responsibilities=True)
@@ -0,0 +1,120 @@
+"""
+Near-duplicate lookup: MinHash/LSH band index vs the legacy scan that
+compares the upload against the first 200 stored texts with SequenceMatcher.
+
+Queries are half near-duplicates (a few percent of words replaced) of a
+random stored resume and half unrelated resumes. Recall is the share of
+near-duplicates whose source is found; false positives count unrelated
+queries flagged as duplicates.
+
+Run from backend/:
+    python -m benchmarks.bench_duplicate_lsh [n_docs] [n_queries]
+"""
+import os
+import sys
+import time
+import random
+from collections import defaultdict
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+
+from app.ai.minhash import minhash_signature, lsh_bands
+from app.ai.duplicate_detector import is_similar_text, best_near_duplicate
+
+LEGACY_SCAN_LIMIT = 200
+LEGACY_QUERIES = 20
+
+
+def make_vocab(rnd, size=3000):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rnd.choice(letters) for _ in range(rnd.randint(3, 9))) for _ in range(size)]
+
+
+def make_doc(rnd, vocab, words=350):
+    return " ".join(rnd.choice(vocab) for _ in range(words))
+
+
+def perturb(rnd, vocab, text, rate):
+    tokens = text.split()
+    for i in range(len(tokens)):
+        if rnd.random() < rate:
+            tokens[i] = rnd.choice(vocab)
+    return " ".join(tokens)
+
+
+def build_index(docs):
+    sigs, bands = [], defaultdict(list)
+    for i, d in enumerate(docs):
+        sig = minhash_signature(d)
+        sigs.append(sig)
+        for b in lsh_bands(sig):
+            bands[b].append(i)
+    return sigs, bands
+
+
+def lsh_lookup(text, sigs, bands):
+    sig = minhash_signature(text)
+    ids = set()
+    for b in lsh_bands(sig):
+        ids.update(bands.get(b, ()))
+    best, sim = best_near_duplicate(sig, [{"_id": i, "minhash": sigs[i]} for i in ids])
+    return (best["_id"] if best else None), len(ids)
+
+
+def legacy_lookup(text, docs):
+    for i, d in enumerate(docs[:LEGACY_SCAN_LIMIT]):
+        if is_similar_text(text, d):
+            return i
+    return None
+
+
+def run(n, q, rate=0.03, seed=11):
+    rnd = random.Random(seed)
+    vocab = make_vocab(rnd)
+    docs = [make_doc(rnd, vocab) for _ in range(n)]
+
+    sources = [rnd.randrange(n) for _ in range(q)]
+    dups = [perturb(rnd, vocab, docs[s], rate) for s in sources]
+    fresh = [make_doc(rnd, vocab) for _ in range(q)]
+
+    t = time.perf_counter()
+    sigs, bands = build_index(docs)
+    t_build = time.perf_counter() - t
+
+    t = time.perf_counter()
+    hits, scanned = 0, 0
+    for s, text in zip(sources, dups):
+        found, c = lsh_lookup(text, sigs, bands)
+        hits += found == s
+        scanned += c
+    false_pos = 0
+    for text in fresh:
+        found, c = lsh_lookup(text, sigs, bands)
+        false_pos += found is not None
+        scanned += c
+    t_lsh = (time.perf_counter() - t) / (2 * q)
+
+    # legacy: the first-200 scan (what ran in production) on a subsample
+    lq = min(q, LEGACY_QUERIES)
+    t = time.perf_counter()
+    legacy_hits = sum(legacy_lookup(dups[i], docs) == sources[i] for i in range(lq))
+    t_legacy = (time.perf_counter() - t) / lq
+
+    # full scan with the same comparison: per-pair cost x n, and its recall
+    # measured directly against the true source
+    t = time.perf_counter()
+    full_hits = sum(is_similar_text(dups[i], docs[sources[i]]) for i in range(lq))
+    t_pair = (time.perf_counter() - t) / lq
+
+    print(f"docs={n} queries={2 * q} edit_rate={rate}")
+    print(f"  lsh index build      : {t_build:8.2f} s ({t_build / n * 1e6:.0f} us/doc)")
+    print(f"  lsh lookup           : {t_lsh * 1000:8.2f} ms/query  recall={hits / q:.3f}  "
+          f"false_pos={false_pos}/{q}  avg_candidates={scanned / (2 * q):.1f}")
+    print(f"  legacy first-{LEGACY_SCAN_LIMIT} scan : {t_legacy * 1000:8.2f} ms/query  recall={legacy_hits / lq:.3f}")
+    print(f"  legacy full scan     : {t_pair * n:8.2f} s/query (extrapolated)  recall={full_hits / lq:.3f}")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    q = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    run(n, q)
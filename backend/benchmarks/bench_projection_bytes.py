@@ -0,0 +1,137 @@
+"""
+Bytes each endpoint's DB read pulls from MongoDB: the full document (what
+the read used to fetch) vs the projection the route asks for now.
+
+Seeds one recruiter, one candidate (with a long resume text and legacy
+embedded arrays), one job role, a few recruiter chats and interview
+sessions of n_messages messages each into the configured MongoDB, and
+removes them afterwards. Sizes are the BSON size of what the driver
+returns; times are the best of `repeats`.
+
+Run from backend/:
+    python -m benchmarks.bench_projection_bytes [n_messages] [repeats]
+"""
+import os
+import sys
+import time
+import random
+import datetime
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+
+import bson
+
+from app.database.connection import db
+from app.database.user import USER_PUBLIC_PROJECTION, get_user_by_id
+from app.database.candidate import CandidateDB
+from app.database.jobrole import JobRoleDB
+from app.database.recruiter_chat import RecruiterChatDB, CHAT_LIST_PROJECTION
+from app.database.interview_chat import InterviewChatDB
+from app.routers.recruiter_chat_router import CONTEXT_JOB_FIELDS
+
+WORDS = "python sql react docker kubernetes pipeline model api data cloud design team".split()
+N_CHATS = 5
+
+
+def text(rnd, n):
+    return " ".join(rnd.choice(WORDS) for _ in range(n))
+
+
+def messages(rnd, n):
+    now = datetime.datetime.utcnow()
+    return [
+        {"sender": "u", "sender_role": rnd.choice(["recruiter", "ai"]), "type": "text",
+         "text": text(rnd, 80), "metadata": {}, "timestamp": now}
+        for _ in range(n)
+    ]
+
+
+def seed(rnd, n_messages):
+    now = datetime.datetime.utcnow()
+    uid = db.users.insert_one({
+        "email": f"bench-{rnd.random()}@x.io", "role": "recruiter", "name": "Bench",
+        "hashed_password": "$2b$12$" + "x" * 53, "verification_code": "123456", "created_at": now,
+    }).inserted_id
+    recruiter_id = str(uid)
+    cid = db.candidates.insert_one({
+        "email": f"cand-{rnd.random()}@x.io", "name": "Candidate", "skills": WORDS,
+        "parsed_text": text(rnd, 1500), "experience_years": 3,
+        "feedback": text(rnd, 40), "final_feedback": text(rnd, 40),
+        "analysis": [{"job_role_id": f"j{i}", "match_score": 50, "reasoning": text(rnd, 120)} for i in range(20)],
+        "submission_history": [{"job_role_id": f"j{i}", "timestamp": now} for i in range(20)],
+    }).inserted_id
+    jid = db.job_roles.insert_one({
+        "title": "Backend Developer", "recruiter_id": recruiter_id,
+        "required_skills": WORDS[:6], "preferred_skills": WORDS[6:],
+        "responsibilities": [text(rnd, 20) for _ in range(8)], "experience_min": 2,
+        "description": text(rnd, 800),
+        "parsed": {"experience_level": "mid", "raw": text(rnd, 800), "responsibilities": [text(rnd, 20)] * 8},
+    }).inserted_id
+    chat_ids = db.recruiter_chats.insert_many([{
+        "chat_type": "contextual", "title": f"Shortlisting {i}", "creator_user_id": recruiter_id,
+        "job_role_id": str(jid), "participants": [recruiter_id], "candidates": [],
+        "messages": messages(rnd, n_messages), "created_at": now, "updated_at": now,
+    } for i in range(N_CHATS)]).inserted_ids
+    db.interview_chats.insert_many([{
+        "candidate_id": str(cid), "target_role": "Backend Developer",
+        "messages": messages(rnd, n_messages), "created_at": now,
+    } for _ in range(N_CHATS)])
+    return recruiter_id, str(cid), str(jid), str(chat_ids[0])
+
+
+def size(out):
+    docs = out if isinstance(out, list) else [out]
+    return sum(len(bson.encode(d)) for d in docs if d)
+
+
+def timed(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, out
+
+
+def main(n_messages=200, repeats=5):
+    rnd = random.Random(7)
+    recruiter_id, cid, jid, chat_id = seed(rnd, n_messages)
+    cases = [
+        # endpoint, read before, read now
+        ("auth: current user", lambda: get_user_by_id(recruiter_id),
+         lambda: get_user_by_id(recruiter_id, USER_PUBLIC_PROJECTION)),
+        ("GET /chat/list", lambda: RecruiterChatDB.list_for_user(recruiter_id),
+         lambda: RecruiterChatDB.list_for_user(recruiter_id, CHAT_LIST_PROJECTION)),
+        ("match: shortlist chat lookup", lambda: RecruiterChatDB.list_for_user(recruiter_id),
+         lambda: RecruiterChatDB.list_for_user(recruiter_id, {"job_role_id": 1})),
+        ("POST /chat/contextual: chat", lambda: RecruiterChatDB.get(chat_id),
+         lambda: RecruiterChatDB.get(chat_id, projection=["job_role_id"])),
+        ("POST /chat/contextual: job", lambda: JobRoleDB.get(jid),
+         lambda: JobRoleDB.get(jid, projection=CONTEXT_JOB_FIELDS)),
+        ("PUT /jobrole: ownership", lambda: JobRoleDB.get(jid),
+         lambda: JobRoleDB.get(jid, projection=["recruiter_id"])),
+        ("GET /interview/list", lambda: InterviewChatDB.list_for_candidate(cid),
+         lambda: InterviewChatDB.list_for_candidate(cid, {"messages": {"$slice": -1}})),
+        ("GET /candidate/feedback", lambda: CandidateDB.get(cid),
+         lambda: CandidateDB.get(cid, projection=["feedback"])),
+        ("invite: candidate exists", lambda: CandidateDB.get(cid),
+         lambda: CandidateDB.get(cid, projection=["_id"])),
+    ]
+    try:
+        print(f"{'endpoint':32} {'full B':>10} {'lean B':>10} {'saved':>7} {'full ms':>8} {'lean ms':>8}")
+        for name, full, lean in cases:
+            full_ms, full_out = timed(full, repeats)
+            lean_ms, lean_out = timed(lean, repeats)
+            a, b = size(full_out), size(lean_out)
+            print(f"{name:32} {a:10} {b:10} {1 - b / a:7.1%} {full_ms:8.2f} {lean_ms:8.2f}")
+    finally:
+        db.users.delete_one({"_id": bson.ObjectId(recruiter_id)})
+        db.candidates.delete_one({"_id": bson.ObjectId(cid)})
+        db.job_roles.delete_one({"_id": bson.ObjectId(jid)})
+        db.recruiter_chats.delete_many({"creator_user_id": recruiter_id})
+        db.interview_chats.delete_many({"candidate_id": cid})
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
@@ -0,0 +1,119 @@
+"""
+Top-N ranking for one job role: the indexed candidate_analyses aggregation
+vs the legacy path (find every candidate with an embedded analysis for the
+role, pick the entry with next(...) and sort the whole list in Python).
+
+Seeds n_candidates analyses for a throwaway job role id into the
+configured MongoDB, in candidate_analyses and in a scratch collection
+holding the legacy embedded shape; both are removed afterwards. Also
+reports the winning plan of the first and a deep page.
+
+Run from backend/:
+    python -m benchmarks.bench_ranking [n_candidates] [top_n] [repeats]
+"""
+import os
+import sys
+import time
+import uuid
+import random
+import datetime
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+
+from bson.objectid import ObjectId
+
+from app.database.connection import db
+from app.database.indexes import ensure_indexes, explain_query
+from app.database.candidate_analysis import CandidateAnalysisDB, RANK_SORT, analyses_col, _after
+
+BATCH = 5000
+
+
+def seed(job_role_id, n, rnd):
+    legacy_col = db[f"bench_ranking_{job_role_id}"]
+    now = datetime.datetime.utcnow()
+    analyses, legacy = [], []
+    for i in range(n):
+        cid = ObjectId()
+        match, ats = rnd.randint(0, 100), rnd.randint(0, 100)
+        analyses.append({
+            "candidate_id": str(cid), "job_role_id": job_role_id, "current": True,
+            "match_score": match, "ats_score": ats, "timestamp": now,
+        })
+        # legacy docs carry a few analyses for other roles too
+        others = [{"job_role_id": f"other-{k}", "match_score": 50, "ats_score": 50} for k in range(rnd.randint(0, 3))]
+        legacy.append({"_id": cid, "analysis": others + [{"job_role_id": job_role_id, "match_score": match, "ats_score": ats}]})
+        if len(analyses) == BATCH:
+            analyses_col.insert_many(analyses)
+            legacy_col.insert_many(legacy)
+            analyses, legacy = [], []
+    if analyses:
+        analyses_col.insert_many(analyses)
+        legacy_col.insert_many(legacy)
+    legacy_col.create_index("analysis.job_role_id")
+    return legacy_col
+
+
+def legacy_top_n(legacy_col, job_role_id, n):
+    ranking = []
+    for r in legacy_col.find({"analysis.job_role_id": job_role_id}, {"analysis": 1}):
+        entry = next((a for a in r.get("analysis", []) if a.get("job_role_id") == job_role_id), None)
+        if entry:
+            ranking.append({
+                "candidate_id": str(r["_id"]),
+                "match_score": entry.get("match_score", 0),
+                "ats_score": entry.get("ats_score", 0),
+            })
+    return sorted(ranking, key=lambda x: (x["match_score"], x["ats_score"]), reverse=True)[:n]
+
+
+def timed(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, out
+
+
+def main(n=50000, top=20, repeats=5):
+    ensure_indexes("candidate_analyses")
+    rnd = random.Random(7)
+    job_role_id = f"bench-{uuid.uuid4().hex[:8]}"
+    started = time.perf_counter()
+    legacy_col = seed(job_role_id, n, rnd)
+    print(f"seeded {n} candidates in {time.perf_counter() - started:.1f}s")
+
+    try:
+        legacy_ms, legacy_rows = timed(lambda: legacy_top_n(legacy_col, job_role_id, top), repeats)
+        first_ms, (rows, cursor) = timed(
+            lambda: CandidateAnalysisDB.top_n(job_role_id, top, fields=()), repeats
+        )
+        same = [(r["match_score"], r["ats_score"]) for r in rows] == \
+               [(r["match_score"], r["ats_score"]) for r in legacy_rows]
+        print(f"legacy top {top}:        {legacy_ms:8.1f} ms")
+        print(f"indexed top {top}:       {first_ms:8.1f} ms   (same scores as legacy: {same})")
+
+        # walk 10 pages deep, then time the next one
+        for _ in range(10):
+            rows, cursor = CandidateAnalysisDB.top_n(job_role_id, top, cursor=cursor, fields=())
+        deep_ms, _ = timed(lambda: CandidateAnalysisDB.top_n(job_role_id, top, cursor=cursor, fields=()), repeats)
+        print(f"indexed page 12:         {deep_ms:8.1f} ms")
+
+        thr_ms, (rows, _) = timed(
+            lambda: CandidateAnalysisDB.top_n(job_role_id, top, min_score=90, fields=()), repeats
+        )
+        print(f"indexed top {top} >= 90:  {thr_ms:8.1f} ms   ({len(rows)} rows)")
+
+        base = {"job_role_id": job_role_id, "current": True}
+        for name, query in (("first page", base), ("deep page", {**base, **_after(cursor)})):
+            plan = explain_query("candidate_analyses", query, RANK_SORT)
+            print(f"plan {name}: {' > '.join(plan['stages'])}  collscan={plan['collscan']}")
+    finally:
+        analyses_col.delete_many({"job_role_id": job_role_id})
+        legacy_col.drop()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:4]]
+    main(*args)
@@ -0,0 +1,29 @@
+"""
+Compute minhash/lsh_bands for candidates stored before near-duplicate
+fingerprints were written at ingest.
+
+Run from backend/:
+    python -m scripts.backfill_minhash [batch_size]
+"""
+import sys
+
+from app.database.candidate import CandidateDB
+
+
+def backfill(batch_size: int = 1000):
+    total = 0
+    while True:
+        rows = CandidateDB.missing_fingerprints(batch_size)
+        if not rows:
+            break
+        items = [
+            (r["_id"], r.get("parsed_text") or (r.get("parsed") or {}).get("raw_text") or "")
+            for r in rows
+        ]
+        total += CandidateDB.set_fingerprints(items)
+        print(f"backfilled {total} candidates")
+    return total
+
+
+if __name__ == "__main__":
+    backfill(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
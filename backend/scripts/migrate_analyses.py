@@ -0,0 +1,37 @@
+"""
+Move analyses and history arrays embedded in candidate documents
+(analysis, submission_history, feedback_history, manual_shortlists) into
+the candidate_analyses / candidate_history collections. Safe to rerun.
+Once it reports nothing left, set ANALYSIS_LEGACY_READS=0.
+
+Run from backend/:
+    python -m scripts.migrate_analyses [batch_size]
+"""
+import sys
+
+from app.database.indexes import ensure_indexes
+from app.database.candidate_analysis import CandidateAnalysisDB
+
+
+def migrate(batch_size: int = 200):
+    ensure_indexes("candidate_analyses")
+    ensure_indexes("candidate_history")
+    candidates = analyses = events = 0
+    while True:
+        rows = CandidateAnalysisDB.unmigrated(batch_size)
+        if not rows:
+            break
+        for r in rows:
+            a, e = CandidateAnalysisDB.migrate(r)
+            candidates += 1
+            analyses += a
+            events += e
+        print(f"migrated {candidates} candidates ({analyses} analyses, {events} history events)")
+    fixed = CandidateAnalysisDB.fill_missing_scores()
+    if fixed:
+        print(f"defaulted {fixed} missing scores to 0")
+    return candidates
+
+
+if __name__ == "__main__":
+    migrate(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
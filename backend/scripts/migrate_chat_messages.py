@@ -0,0 +1,30 @@
+"""
+Move messages embedded in recruiter_chats documents into the
+recruiter_messages collection and fill in last_message / message_count.
+Safe to rerun. Once it reports nothing left, set CHAT_LEGACY_READS=0.
+
+Run from backend/:
+    python -m scripts.migrate_chat_messages [batch_size]
+"""
+import sys
+
+from app.database.indexes import ensure_indexes
+from app.database.recruiter_chat import RecruiterChatDB
+
+
+def migrate(batch_size: int = 200):
+    ensure_indexes("recruiter_messages")
+    chats = messages = 0
+    while True:
+        ids = RecruiterChatDB.unmigrated(batch_size)
+        if not ids:
+            break
+        for chat_id in ids:
+            messages += RecruiterChatDB.migrate(chat_id, force=True)
+            chats += 1
+        print(f"migrated {chats} chats ({messages} messages)")
+    return chats
+
+
+if __name__ == "__main__":
+    migrate(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
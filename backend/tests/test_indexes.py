@@ -0,0 +1,32 @@
+"""
+Every hot query declared in the index registry must be served by an index.
+
+Runs against the MongoDB in MONGO_URL (default mongodb://localhost:27017)
+and is skipped when no server answers. Run from backend/:
+    python -m pytest tests/test_indexes.py
+"""
+import os
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+
+
+def _server_reachable() -> bool:
+    try:
+        MongoClient(os.environ["MONGO_URL"], serverSelectionTimeoutMS=2000).admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+
+
+pytestmark = pytest.mark.skipif(not _server_reachable(), reason="no MongoDB server at MONGO_URL")
+
+
+def test_hot_queries_use_indexes():
+    from app.database.indexes import apply_indexes, assert_no_collscan
+
+    apply_indexes()
+    assert_no_collscan()